@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send, User, Bot, Loader2, ArrowLeft, Paperclip, Mic, MicOff, Volume2, VolumeX, Video, VideoOff, Camera, AlertTriangle, StopCircle, CheckCircle, TrendingUp, Award } from 'lucide-react';
 import { useNavigate, useLocation } from 'react-router-dom';
-import api from '../services/api';
+import api, { streamChat } from '../services/api';
 import VideoPreview from '../components/VideoPreview';
 import useSpeech from '../hooks/useSpeech';
 
@@ -28,6 +28,9 @@ const ChatInterview = () => {
 
     useEffect(() => { console.log("ChatInterview Component Mounted"); }, []);
 
+    // Issued by the server on the first chat turn and sent back on every later one
+    const conversationIdRef = useRef(null);
+
     const messagesEndRef = useRef(null);
     const fileInputRef = useRef(null);
     const { isListening, isSpeaking, transcript, startListening, stopListening, speak, hasSupport } = useSpeech();
@@ -67,6 +70,28 @@ const ChatInterview = () => {
         wasListeningRef.current = isListening;
     }, [isListening]);
 
+    // Streams the interviewer's reply into the chat as it is generated and
+    // resolves with the full text. A reply cut off by an error is removed
+    // before the error is rethrown, so half an answer never stays on screen.
+    const streamReply = async (apiMessages) => {
+        let started = false;
+        try {
+            const { response, conversationId } = await streamChat(apiMessages, (token) => {
+                const first = !started;
+                started = true;
+                setMessages(prev => first
+                    ? [...prev, { role: 'assistant', content: token }]
+                    : [...prev.slice(0, -1), { ...prev[prev.length - 1], content: prev[prev.length - 1].content + token }]
+                );
+            }, conversationIdRef.current);
+            conversationIdRef.current = conversationId;
+            return response;
+        } catch (error) {
+            if (started) setMessages(prev => prev.slice(0, -1));
+            throw error;
+        }
+    };
+
     const handleSendVoice = async (text) => {
         if (!text.trim() || isLoading) return;
 
@@ -81,13 +106,13 @@ const ChatInterview = () => {
                 content: m.content
             }));
 
-            const response = await api.post('/interview/chat', { messages: apiMessages });
-            if (!response.data) throw new Error("Empty response");
-            const aiMessage = { role: 'assistant', content: response.data.response || "I apologize, I received an empty response." };
-            setMessages(prev => [...prev, aiMessage]);
+            const reply = await streamReply(apiMessages);
+            if (!reply) {
+                setMessages(prev => [...prev, { role: 'assistant', content: "I apologize, I received an empty response." }]);
+            }
 
             // Auto-speak the response in Real mode
-            speak(response.data.response);
+            speak(reply);
         } catch (error) {
             console.error("Chat Error:", error);
             setMessages(prev => [...prev, { role: 'assistant', content: "I'm having trouble connecting right now." }]);
@@ -115,7 +140,11 @@ const ChatInterview = () => {
             const contextMessage = { role: 'user', content: res.data.context };
             const updatedMessages = [...messages, contextMessage];
 
-            const aiRes = await api.post('/interview/chat', { messages: updatedMessages });
+            const aiRes = await api.post('/interview/chat', {
+                messages: updatedMessages,
+                conversation_id: conversationIdRef.current
+            });
+            conversationIdRef.current = aiRes.data.conversation_id;
 
             setMessages(prev => [
                 ...prev.slice(0, -1),
@@ -160,7 +189,11 @@ const ChatInterview = () => {
             const contextMessage = { role: 'user', content: res.data.context };
             const updatedMessages = [...messages, contextMessage];
 
-            const aiRes = await api.post('/interview/chat', { messages: updatedMessages });
+            const aiRes = await api.post('/interview/chat', {
+                messages: updatedMessages,
+                conversation_id: conversationIdRef.current
+            });
+            conversationIdRef.current = aiRes.data.conversation_id;
 
             setMessages(prev => [
                 ...prev.slice(0, -1),
@@ -208,15 +241,10 @@ const ChatInterview = () => {
                 content: m.content
             }));
 
-            const response = await api.post('/interview/chat', {
-                messages: apiMessages
-            });
-
-            const aiMessage = { role: 'assistant', content: response.data.response };
-            setMessages(prev => [...prev, aiMessage]);
+            const reply = await streamReply(apiMessages);
 
             if (isVoiceMode) {
-                speak(response.data.response);
+                speak(reply);
             }
 
         } catch (error) {
@@ -256,7 +284,8 @@ const ChatInterview = () => {
         stopListening();
 
         try {
-            const response = await api.post('/interview/analyze', {
+            // The analysis runs as a background job; poll until it finishes
+            const submitted = await api.post('/interview/analyze/jobs', {
                 conversation: messages,
                 behavioral_alerts: behaviorAlerts,
                 job_role: config?.jobRole || 'Software Developer',
@@ -264,8 +293,15 @@ const ChatInterview = () => {
                 user_name: config?.userName || 'Candidate'
             });
 
-            if (response.data.success) {
-                setAnalysisData(response.data.analysis);
+            let job = submitted.data;
+            for (let attempt = 0; attempt < 120 && (job.status === 'queued' || job.status === 'running'); attempt++) {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                const response = await api.get(`/interview/analyze/jobs/${submitted.data.job_id}`);
+                job = response.data;
+            }
+
+            if (job.success && job.status === 'done') {
+                setAnalysisData(job.analysis);
                 setShowResults(true);
             } else {
                 alert("Failed to analyze interview. Please try again.");
@@ -2,10 +2,12 @@ import React, { useState } from 'react';
 import Editor from "@monaco-editor/react";
 import { ArrowLeft, Play, Code, RefreshCw, Wand2, Loader2, CheckCircle, AlertTriangle, Lightbulb } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
+import { useUser } from '@clerk/clerk-react';
 import api from '../services/api';
 
 const MockCoding = () => {
     const navigate = useNavigate();
+    const { user } = useUser();
 
     // Configuration State
     const [language, setLanguage] = useState('python');
@@ -42,7 +44,8 @@ const MockCoding = () => {
             const response = await api.post('/interview/coding/problem', {
                 language,
                 topic,
-                difficulty
+                difficulty,
+                user_id: user?.id
             });
             if (!response.data) throw new Error("Empty response");
             setProblem(response.data);
@@ -63,9 +66,13 @@ const MockCoding = () => {
             const response = await api.post('/interview/coding/review', {
                 code,
                 problem_description: problem.description,
-                language
+                language,
+                problem_id: problem.id
             });
             setReview(response.data);
+            if (response.data.style_review_id) {
+                pollStyleReview(response.data.style_review_id);
+            }
         } catch (error) {
             console.error("Error reviewing code:", error);
             alert("Failed to review code. Please try again.");
@@ -74,6 +81,26 @@ const MockCoding = () => {
         }
     };
 
+    // The test verdict comes back immediately; style feedback follows
+    const pollStyleReview = async (reviewId, attempt = 0) => {
+        try {
+            const response = await api.get(`/interview/coding/review/${reviewId}/style`);
+            const style = response.data;
+            if (style.status === 'pending' && attempt < 20) {
+                setTimeout(() => pollStyleReview(reviewId, attempt + 1), 1500);
+                return;
+            }
+            setReview(prev => prev && prev.style_review_id === reviewId ? {
+                ...prev,
+                style_status: style.status,
+                style_feedback: style.feedback,
+                optimization_tips: style.optimization_tips || prev.optimization_tips
+            } : prev);
+        } catch (error) {
+            console.error("Error fetching style review:", error);
+        }
+    };
+
     return (
         <div className="flex flex-col h-screen bg-gray-50">
             {/* Header */}
@@ -172,6 +199,29 @@ const MockCoding = () => {
 
                                     <p className="text-gray-700 mb-4">{review.feedback}</p>
 
+                                    {review.tests && review.tests.results.length > 0 && (
+                                        <div className="flex flex-wrap gap-2 mb-4">
+                                            {review.tests.results.map((result, i) => (
+                                                <span
+                                                    key={i}
+                                                    title={result.error || `${result.time_ms} ms`}
+                                                    className={`px-2 py-1 rounded text-xs font-medium ${result.passed ? 'bg-green-100 text-green-700' : 'bg-red-100 text-red-700'}`}
+                                                >
+                                                    Test {i + 1}
+                                                </span>
+                                            ))}
+                                        </div>
+                                    )}
+
+                                    {review.style_status === 'pending' && (
+                                        <p className="text-sm text-gray-500 mb-4 flex items-center gap-2">
+                                            <Loader2 className="w-4 h-4 animate-spin" /> Waiting for style feedback...
+                                        </p>
+                                    )}
+                                    {review.style_feedback && (
+                                        <p className="text-gray-700 mb-4">{review.style_feedback}</p>
+                                    )}
+
                                     {review.bugs && review.bugs.length > 0 && (
                                         <div className="mb-4">
                                             <h4 className="font-semibold text-gray-900 mb-2">Bugs & Issues:</h4>
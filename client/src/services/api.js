@@ -16,4 +16,49 @@ api.interceptors.request.use(async (config) => {
 });
 */
 
+// Streams a chat reply from /interview/chat/stream (Server-Sent Events).
+// onToken is called with each piece of text as it arrives. Resolves with
+// { response, conversationId }; pass conversationId back on the next turn.
+export async function streamChat(messages, onToken, conversationId = null) {
+    const response = await fetch('/api/interview/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ messages, conversation_id: conversationId }),
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Chat stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+            const dataLine = event.split('\n').find((line) => line.startsWith('data: '));
+            if (!dataLine) continue;
+            const payload = JSON.parse(dataLine.slice(6));
+            if (event.startsWith('event: done')) {
+                return {
+                    response: payload.response ?? fullText,
+                    conversationId: payload.conversation_id ?? conversationId,
+                };
+            }
+            if (event.startsWith('event: error')) {
+                throw new Error(payload.error);
+            }
+            fullText += payload.token;
+            onToken?.(payload.token);
+        }
+    }
+    throw new Error('Chat stream ended without a done event');
+}
+
 export default api;
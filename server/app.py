@@ -1,10 +1,12 @@
 import os
 import sys
+import time
+import signal
 
 # Add the current directory (server/) to sys.path to resolve 'services' imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, g, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -13,17 +15,74 @@ load_dotenv()
 
 from routes.interview import interview_bp
 from routes.user import user_bp
+from services.ai_engine import rotate_api_keys, get_engine
+from services.question_bank import question_bank, QUESTION_BANK_PREWARM
+from services.problem_pool import problem_pool, PROBLEM_POOL_PREWARM
+from services.metrics import metrics, METRICS_ENABLED
+from services.uploads import SpooledRequest, UPLOAD_MAX_BYTES
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Oversized bodies are refused from Content-Length (or once the stream passes
+# the limit) before they are read; large uploads are spooled to disk
+app.request_class = SpooledRequest
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES
+
 app.register_blueprint(interview_bp, url_prefix='/api/interview')
 app.register_blueprint(user_bp, url_prefix='/api/user')
 
+# Rotate LLM API keys without a restart: update .env, then `kill -HUP <pid>`
+if hasattr(signal, "SIGHUP"):
+    signal.signal(signal.SIGHUP, lambda signum, frame: rotate_api_keys())
+
+# Fill question pools for common roles in the background
+if question_bank and QUESTION_BANK_PREWARM:
+    get_engine()
+    question_bank.prewarm()
+
+# Same for coding problem pools
+if problem_pool and PROBLEM_POOL_PREWARM:
+    get_engine()
+    problem_pool.prewarm()
+
+@app.errorhandler(413)
+def handle_too_large(e):
+    return jsonify({"error": f"Upload too large (limit {UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"}), 413
+
 @app.route('/')
 def health_check():
     return jsonify({"status": "healthy", "service": "AI Interview Coach API"})
 
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+
+@app.before_request
+def reject_oversized_body():
+    # Refuse from the header alone, before any of the body is read
+    if request.content_length is not None and request.content_length > UPLOAD_MAX_BYTES:
+        return handle_too_large(None)
+
+@app.after_request
+def record_request_timing(response):
+    if not METRICS_ENABLED or "request_start" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe("http_request_duration_seconds", elapsed, method=request.method, endpoint=endpoint)
+    metrics.inc("http_requests_total", method=request.method, endpoint=endpoint, status=response.status_code)
+    # Shows the OCR / LLM / DB breakdown in the browser's network panel
+    response.headers["Server-Timing"] = metrics.server_timing(elapsed)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     import traceback
@@ -0,0 +1,151 @@
+# Deterministic inputs shared by the load test and the microbenchmarks
+import io
+import os
+import json
+import random
+
+SKILLS = [
+    "Python", "Flask", "Django", "FastAPI", "React", "TypeScript", "SQL", "MySQL",
+    "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "GCP", "Terraform", "Kafka"
+]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimised", "Automated", "Shipped", "Scaled"]
+NOUNS = [
+    "payment service", "search pipeline", "CI workflow", "data warehouse",
+    "recommendation API", "auth gateway", "analytics dashboard", "mobile backend"
+]
+
+
+def resume_text(pages=1, seed=7):
+    """Returns resume-like text with section headings, one block per page."""
+    rng = random.Random(seed)
+    blocks = []
+    for page in range(pages):
+        lines = []
+        if page == 0:
+            lines += ["Jordan Avery", "jordan.avery@example.com | +1 555 0100", "", "Summary",
+                      "Backend engineer with eight years of experience building web services.", ""]
+        lines.append("Experience")
+        for job in range(4):
+            lines.append(f"Senior Engineer, Company {page * 4 + job} ({2012 + job} - {2014 + job})")
+            for _ in range(5):
+                lines.append(
+                    f"- {rng.choice(VERBS)} the {rng.choice(NOUNS)} using "
+                    f"{rng.choice(SKILLS)} and {rng.choice(SKILLS)}, cutting latency by {rng.randint(10, 80)}%"
+                )
+            lines.append("")
+        lines += ["Projects", f"- Open-source {rng.choice(NOUNS)} with {rng.randint(50, 900)} stars", ""]
+        if page == pages - 1:
+            lines += ["Education", "B.S. Computer Science, State University", "",
+                      "Skills", ", ".join(rng.sample(SKILLS, 10))]
+        blocks.append("\n".join(lines))
+    return blocks
+
+
+def resume_pdf_bytes(pages=1, seed=7):
+    """Renders resume_text() into a PDF with one page per block."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+    for block in resume_text(pages, seed):
+        y = height - 50
+        for line in block.splitlines():
+            pdf.drawString(40, y, line[:110])
+            y -= 14
+            if y < 40:
+                break
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def ocr_json(pages=1, seed=7):
+    return {"pages": [{"page_no": i + 1, "text": text} for i, text in enumerate(resume_text(pages, seed))]}
+
+
+def conversation(turns=20, seed=7):
+    """Alternating interviewer/candidate messages, like /analyze receives."""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(turns):
+        if i % 2 == 0:
+            messages.append({"role": "assistant", "content": f"Can you describe how you {rng.choice(VERBS).lower()} the {rng.choice(NOUNS)}?"})
+        else:
+            messages.append({"role": "user", "content": " ".join(
+                f"I used {rng.choice(SKILLS)} to improve the {rng.choice(NOUNS)}." for _ in range(rng.randint(3, 8))
+            )})
+    return messages
+
+
+def report_data(questions=5, answer_words=400, seed=7):
+    """Payload for /report and generate_interview_report with long answers."""
+    rng = random.Random(seed)
+    words = [w for skill in SKILLS for w in (skill, "service", "latency", "team", "design")]
+    return {
+        "user_name": "Jordan Avery",
+        "job_role": "Backend Engineer",
+        "category": "Technical",
+        "difficulty": "Medium",
+        "avg_score": 7.2,
+        "qualified": True,
+        "questions": [f"Question {i + 1}: describe a {rng.choice(NOUNS)} you built." for i in range(questions)],
+        "answers": {i: " ".join(rng.choice(words) for _ in range(answer_words)) for i in range(questions)},
+        "scores": [rng.randint(4, 10) for _ in range(questions)],
+        "feedback_list": ["Good structure, add metrics. " * 5 for _ in range(questions)],
+        "ideal_answers_list": ["State the situation, your action and the result. " * 5 for _ in range(questions)]
+    }
+
+
+def llm_responses():
+    """Raw model outputs in the shapes _clean_and_parse_json has to handle."""
+    analysis = {
+        "ats_score": 78,
+        "summary": "Backend engineer with strong Python and distributed systems experience.",
+        "strengths": [f"{skill} in production" for skill in SKILLS[:8]],
+        "weaknesses": ["Limited frontend testing", "Few public talks"],
+        "missing_skills": SKILLS[8:12],
+        "suggested_roles": ["Backend Engineer", "Platform Engineer", "SRE"]
+    }
+    evaluation = {
+        "feedback": "Clear structure; add a concrete example and measurable impact. " * 4,
+        "score": 7,
+        "ideal_answer": "State the situation, the action you took and the measurable result. " * 6,
+        "qualified": True
+    }
+    questions = {"questions": [f"Question {i}: how would you scale the {noun}?" for i, noun in enumerate(NOUNS)]}
+    return {
+        "plain_small": json.dumps(evaluation),
+        "fenced": "```json\n" + json.dumps(analysis, indent=2) + "\n```",
+        "fenced_no_lang": "```\n" + json.dumps(questions, indent=2) + "\n```",
+        "plain_large": json.dumps({"items": [analysis] * 40}, indent=2),
+        "prose_wrapped": "Here is the evaluation you asked for:\n" + json.dumps(evaluation) + "\nLet me know if you need more.",
+        "single_quotes": str(evaluation),
+        "truncated": json.dumps(analysis, indent=2)[:-60]
+    }
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# name -> (builder, write as binary)
+DATA_FILES = {
+    "resume_2_pages.pdf": (lambda: resume_pdf_bytes(pages=2, seed=11), True),
+    "resume_12_pages.pdf": (lambda: resume_pdf_bytes(pages=12, seed=12), True),
+    "resume_12_pages.json": (lambda: json.dumps(ocr_json(pages=12, seed=12), indent=1), False),
+    "llm_responses.json": (lambda: json.dumps(llm_responses(), indent=1), False),
+    "conversation_200_turns.json": (lambda: json.dumps(conversation(turns=200, seed=13), indent=1), False),
+    "report_long_answers.json": (lambda: json.dumps(report_data(questions=10, answer_words=600, seed=14), indent=1), False)
+}
+
+
+def write_data_files(directory=DATA_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name, (build, binary) in DATA_FILES.items():
+        with open(os.path.join(directory, name), "wb" if binary else "w") as f:
+            f.write(build())
+        print(f"wrote {name}")
+
+
+if __name__ == "__main__":
+    write_data_files()
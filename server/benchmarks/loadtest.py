@@ -0,0 +1,422 @@
+"""
+End-to-end load test for the Flask API.
+
+Boots the app on a local port with the offline stub LLM backend, then runs
+concurrent virtual users through a realistic mix of sessions:
+
+  interview  /start -> /answer x5 or /answers/batch -> /report -> /save -> /api/user/stats + history
+  chat       /chat/resume -> /chat or /chat/stream x6
+  resume     /resume/analyze
+  analysis   /analyze/jobs -> poll /analyze/jobs/<id>
+  coding     /coding/problem -> /coding/review -> poll /coding/review/<id>/style
+
+Reports throughput and p50/p95/p99 latency per endpoint plus CPU, memory and
+thread usage, and compares the run with a saved baseline.
+
+Usage (from server/):
+    python -m benchmarks.loadtest --users 20 --duration 60
+    python -m benchmarks.loadtest --save-baseline
+
+/save and /api/user/* need MySQL: point MYSQL_* at a local throwaway
+database (tables are created on start). Without one those endpoints are
+reported as errors and excluded from the regression check with --skip-db.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import tempfile
+import resource
+import argparse
+import threading
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app (and its services) are imported
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("STUB_LATENCY_MS", "200")
+
+from werkzeug.serving import make_server
+
+from benchmarks import fixtures
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "loadtest.json")
+DB_ENDPOINTS = {"POST /api/interview/save", "GET /api/user/stats", "GET /api/user/history"}
+SCENARIOS = {"interview": 0.35, "chat": 0.25, "resume": 0.15, "analysis": 0.1, "coding": 0.15}
+POLL_INTERVAL = 0.25
+POLL_ATTEMPTS = 120
+
+# Passes the stub problem's hidden tests (pair sum by index)
+PAIR_SUM_SOLUTION = """def solution(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+"""
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Client:
+    """One keep-alive HTTP connection per virtual user."""
+
+    def __init__(self, host, port, recorder):
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+        self.recorder = recorder
+
+    def request(self, method, path, body=None, headers=None, name=None):
+        endpoint = f"{method} {name or path}"
+        start = time.perf_counter()
+        ok = False
+        data = None
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            raw = response.read()
+            ok = response.status < 400
+            if raw and response.getheader("Content-Type", "").startswith("application/json"):
+                data = json.loads(raw)
+        except Exception:
+            self.conn.close()
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+        return data
+
+    def post_json(self, path, payload, name=None):
+        return self.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"}, name)
+
+    def post_stream(self, path, payload):
+        """POSTs to a Server-Sent Events endpoint; returns the `done` event's data."""
+        endpoint = f"POST {path}"
+        start = time.perf_counter()
+        done = None
+        try:
+            self.conn.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"})
+            response = self.conn.getresponse()
+            raw = response.read().decode("utf-8")
+            for event in raw.split("\n\n"):
+                if event.startswith("event: done"):
+                    done = json.loads(event.split("data: ", 1)[1])
+        except Exception:
+            self.conn.close()
+        self.recorder.record(endpoint, time.perf_counter() - start, done is not None)
+        return done
+
+    def poll(self, path, name, finished):
+        """GETs path until finished(data) is true or the attempts run out."""
+        for _ in range(POLL_ATTEMPTS):
+            data = self.request("GET", path, name=name) or {}
+            if finished(data):
+                return data
+            time.sleep(POLL_INTERVAL)
+        return None
+
+    def post_file(self, path, field, filename, content, form=None):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for key, value in (form or {}).items():
+            parts.append(
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"{key}\"\r\n\r\n{value}\r\n".encode()
+            )
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n".encode() + content + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode())
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        return self.request("POST", path, b"".join(parts), headers)
+
+
+def interview_session(client, rng, resumes, skip_db):
+    start = client.post_file(
+        "/api/interview/start", "resume_file", "resume.pdf", rng.choice(resumes),
+        {"job_role": "Backend Engineer", "category": "Technical", "difficulty": "Medium"}
+    ) or {}
+    questions = start.get("questions") or [f"Question {i}" for i in range(5)]
+
+    scores, feedback, ideal = [], [], []
+    answers = {
+        i: " ".join(rng.choice(fixtures.SKILLS) for _ in range(rng.randint(20, 80)))
+        for i in range(len(questions[:5]))
+    }
+    if rng.random() < 0.5:
+        results = [
+            client.post_json("/api/interview/answer", {
+                "question": question, "answer": answers[i], "job_role": "Backend Engineer"
+            }) or {}
+            for i, question in enumerate(questions[:5])
+        ]
+    else:
+        batch = client.post_json("/api/interview/answers/batch", {
+            "job_role": "Backend Engineer",
+            "items": [{"question": q, "answer": answers[i]} for i, q in enumerate(questions[:5])]
+        }) or {}
+        results = [entry.get("result") or {} for entry in batch.get("results", [])]
+    for result in results:
+        scores.append(result.get("score", 0))
+        feedback.append(result.get("feedback", ""))
+        ideal.append(result.get("ideal_answer", ""))
+
+    report = {
+        "user_name": start.get("user_name", "Candidate"), "job_role": "Backend Engineer",
+        "category": "Technical", "difficulty": "Medium",
+        "avg_score": sum(scores) / max(1, len(scores)), "qualified": True,
+        "questions": questions[:5], "answers": answers, "scores": scores,
+        "feedback_list": feedback, "ideal_answers_list": ideal
+    }
+    client.post_json("/api/interview/report", report)
+
+    if not skip_db:
+        user_id = f"loadtest-{rng.randint(1, 50)}"
+        client.post_json("/api/interview/save", {
+            **report, "user_id": user_id, "email": f"{user_id}@example.com", "name": "Load Test"
+        })
+        client.request("GET", f"/api/user/stats/{user_id}", name="/api/user/stats")
+        client.request("GET", f"/api/user/history/{user_id}", name="/api/user/history")
+
+
+def chat_session(client, rng, resumes, skip_db):
+    context = client.post_file(
+        "/api/interview/chat/resume", "resume", "resume.pdf", rng.choice(resumes),
+        {"job_role": "Backend Engineer", "difficulty": "Medium"}
+    ) or {}
+    conversation_id = None
+    stream = rng.random() < 0.5
+    messages = [{"role": "user", "content": context.get("context", "Let's start.")}]
+    for _ in range(6):
+        payload = {"messages": messages, "conversation_id": conversation_id}
+        if stream:
+            reply = client.post_stream("/api/interview/chat/stream", payload) or {}
+        else:
+            reply = client.post_json("/api/interview/chat", payload) or {}
+        conversation_id = reply.get("conversation_id", conversation_id)
+        messages.append({"role": "assistant", "content": reply.get("response", "")})
+        messages.append({"role": "user", "content": " ".join(rng.choice(fixtures.SKILLS) for _ in range(30))})
+
+
+def resume_session(client, rng, resumes, skip_db):
+    client.post_file("/api/interview/resume/analyze", "resume", "resume.pdf", rng.choice(resumes))
+
+
+def analysis_session(client, rng, resumes, skip_db):
+    submitted = client.post_json("/api/interview/analyze/jobs", {
+        "conversation": fixtures.conversation(turns=rng.choice((10, 20, 40)), seed=rng.randint(1, 10 ** 6)),
+        "behavioral_alerts": [], "job_role": "Backend Engineer", "difficulty": "Medium", "user_name": "Jordan"
+    }) or {}
+    if submitted.get("job_id"):
+        client.poll(
+            f"/api/interview/analyze/jobs/{submitted['job_id']}", "/api/interview/analyze/jobs/<id>",
+            lambda data: data.get("status") not in ("queued", "running")
+        )
+
+
+def coding_session(client, rng, resumes, skip_db):
+    problem = client.post_json("/api/interview/coding/problem", {
+        "language": "Python", "topic": rng.choice(["Arrays", "Hashing", "Strings"]), "difficulty": "Easy",
+        "user_id": f"loadtest-{rng.randint(1, 50)}"
+    }) or {}
+    review = client.post_json("/api/interview/coding/review", {
+        "code": PAIR_SUM_SOLUTION, "problem_description": problem.get("description", "Pair sum"),
+        "language": "python", "problem_id": problem.get("id")
+    }) or {}
+    if review.get("style_review_id"):
+        client.poll(
+            f"/api/interview/coding/review/{review['style_review_id']}/style",
+            "/api/interview/coding/review/<id>/style",
+            lambda data: data.get("status") != "pending"
+        )
+
+
+SESSION_FUNCS = {
+    "interview": interview_session, "chat": chat_session, "resume": resume_session,
+    "analysis": analysis_session, "coding": coding_session
+}
+
+
+def virtual_user(index, host, port, recorder, deadline, resumes, skip_db, seed):
+    rng = random.Random(seed * 1000 + index)
+    client = Client(host, port, recorder)
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[n] for n in names]
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        SESSION_FUNCS[scenario](client, rng, resumes, skip_db)
+
+
+def sample_threads(stop, peak):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        time.sleep(0.2)
+
+
+def run(users, duration, skip_db, seed):
+    import app as server_app
+
+    # Per-request access logs would dominate the output and the CPU profile
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, server_app.app, threaded=True)
+    host, port = server.server_address[:2]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # A few distinct resumes so both repeat-upload reuse and cold paths are exercised
+    resumes = [fixtures.resume_pdf_bytes(pages=p, seed=s) for p, s in ((1, 1), (2, 2), (3, 3), (1, 4))]
+
+    recorder = Recorder()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    peak_threads = [threading.active_count()]
+    stop = threading.Event()
+    threading.Thread(target=sample_threads, args=(stop, peak_threads), daemon=True).start()
+
+    started = time.monotonic()
+    deadline = started + duration
+    workers = [
+        threading.Thread(target=virtual_user, args=(i, host, port, recorder, deadline, resumes, skip_db, seed))
+        for i in range(users)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    server.shutdown()
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(endpoint, 0),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p95_ms": round(percentile(samples, 95) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1)
+        }
+
+    total = sum(e["requests"] for e in endpoints.values())
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    return {
+        "config": {"users": users, "duration_s": duration, "skip_db": skip_db, "seed": seed,
+                   "stub_latency_ms": float(os.environ.get("STUB_LATENCY_MS", 0))},
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "resources": {
+            "cpu_seconds": round(cpu, 2),
+            "cpu_utilisation": round(cpu / elapsed, 2),
+            # ru_maxrss is KiB on Linux
+            "max_rss_mb": round(usage_after.ru_maxrss / 1024, 1),
+            "peak_threads": peak_threads[0]
+        },
+        "endpoints": endpoints
+    }
+
+
+def compare(result, baseline, tolerance, skip_db):
+    """Returns a list of human-readable regressions against the baseline."""
+    regressions = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(
+            f"overall throughput {result['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps"
+        )
+    for endpoint, stats in result["endpoints"].items():
+        if skip_db and endpoint in DB_ENDPOINTS:
+            continue
+        base = baseline["endpoints"].get(endpoint)
+        if not base:
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint} p95 {stats['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        base_error_rate = base["errors"] / max(1, base["requests"])
+        if stats["errors"] / max(1, stats["requests"]) > base_error_rate + 0.01:
+            regressions.append(f"{endpoint} error rate rose to {stats['errors']}/{stats['requests']}")
+    return regressions
+
+
+def print_report(result):
+    print(f"\n{'endpoint':<40}{'reqs':>7}{'errs':>6}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<40}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>8}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+    print(f"\nTotal: {result['total_requests']} requests, {result['total_errors']} errors, "
+          f"{result['throughput_rps']} rps over {result['elapsed_s']}s")
+    print(f"Resources: {json.dumps(result['resources'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI Interview Coach API")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-db", action="store_true", help="skip /save and /api/user/* (no MySQL)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--output", help="also write the JSON result here")
+    args = parser.parse_args()
+
+    # Every run starts from empty pools and never writes into the real data
+    # files; set here rather than at import, which PDF worker processes repeat
+    with tempfile.TemporaryDirectory(prefix="loadtest-data-") as data_dir:
+        os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(data_dir, "question_bank.json"))
+        os.environ.setdefault("PROBLEM_POOL_PATH", os.path.join(data_dir, "problem_pool.json"))
+        result = run(args.users, args.duration, args.skip_db, args.seed)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != result["config"]:
+        print(f"Warning: baseline was recorded with {baseline.get('config')}")
+
+    regressions = compare(result, baseline, args.tolerance, args.skip_db)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
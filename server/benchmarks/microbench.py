@@ -0,0 +1,207 @@
+"""
+Microbenchmarks for the pure-Python hot paths.
+
+Every case runs on the checked-in inputs in benchmarks/data (regenerate them
+with `python -m benchmarks.fixtures`). Timing follows timeit: the loop count
+is calibrated so each repeat lasts at least --min-time, the GC is disabled
+while timing, and the median of the repeats is the headline number. Memory is
+measured separately with tracemalloc on a single call (peak allocated during
+the call, and what is still allocated after it returns).
+
+Usage (from server/):
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --filter chunk --save-baseline
+    python -m benchmarks.microbench --compare
+"""
+import os
+import io
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The engine must never reach a real provider from a benchmark
+os.environ.setdefault("LLM_PROVIDER", "stub")
+
+from benchmarks.fixtures import DATA_DIR
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "microbench.json")
+
+
+def _read(name, binary=False):
+    with open(os.path.join(DATA_DIR, name), "rb" if binary else "r") as f:
+        return f.read() if binary else json.loads(f.read())
+
+
+def build_cases():
+    """Returns {name: zero-argument callable}. Inputs are prepared up front."""
+    from services.chunker import chunk_text, extract_text_from_json
+    from services.resume_parser import _extract_text_from_pdf
+    from services.pdf_generator import generate_interview_report
+    from services.ai_engine import AIEngine
+
+    engine = AIEngine()
+    ocr_json = _read("resume_12_pages.json")
+    text = extract_text_from_json(ocr_json)
+    pdf_small = _read("resume_2_pages.pdf", binary=True)
+    pdf_large = _read("resume_12_pages.pdf", binary=True)
+    conversation = _read("conversation_200_turns.json")
+    report = _read("report_long_answers.json")
+    # JSON turns the answer indices into strings; the generator looks them up by int
+    report["answers"] = {int(k): v for k, v in report["answers"].items()}
+
+    cases = {
+        "extract_text_from_json[12 pages]": lambda: extract_text_from_json(ocr_json),
+        "chunk_text[12 pages]": lambda: chunk_text(text),
+        "chunk_text[120 pages]": lambda: chunk_text(text * 10),
+        "extract_text_from_pdf[2 pages]": lambda: _extract_text_from_pdf(io.BytesIO(pdf_small)),
+        "extract_text_from_pdf[12 pages]": lambda: _extract_text_from_pdf(io.BytesIO(pdf_large)),
+        "generate_interview_report[10 x 600 words]": lambda: generate_interview_report(report),
+        "build_transcript[200 turns]": lambda: engine.build_transcript(conversation, "Jordan"),
+        "build_transcript[2000 turns]": lambda: engine.build_transcript(conversation * 10, "Jordan")
+    }
+    for name, raw in _read("llm_responses.json").items():
+        cases[f"clean_and_parse_json[{name}]"] = lambda raw=raw: engine._clean_and_parse_json(raw)
+    return cases
+
+
+def time_case(fn, repeat, min_time):
+    fn()  # warm caches and lazy imports
+
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2
+
+    per_call = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            per_call.append((time.perf_counter() - start) / loops)
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+        "min_us": round(min(per_call) * 1e6, 2),
+        "stdev_us": round(statistics.stdev(per_call) * 1e6, 2) if len(per_call) > 1 else 0.0
+    }
+
+
+def measure_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": round((peak - before) / 1024, 1), "retained_kib": round((after - before) / 1024, 1)}
+
+
+def run(cases, repeat, min_time):
+    results = {}
+    for name, fn in cases.items():
+        results[name] = {**time_case(fn, repeat, min_time), **measure_memory(fn)}
+        stats = results[name]
+        print(f"{name:<50}{stats['median_us']:>14.1f}{stats['stdev_us']:>12.1f}{stats['peak_kib']:>12.1f}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if stats["median_us"] > base["median_us"] * (1 + tolerance):
+            regressions.append(f"{name}: {stats['median_us']} us vs baseline {base['median_us']} us")
+        # Ignore tiny absolute changes in peak memory
+        if stats["peak_kib"] > base["peak_kib"] * (1 + tolerance) + 16:
+            regressions.append(f"{name}: peak {stats['peak_kib']} KiB vs baseline {base['peak_kib']} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the server's hot paths")
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repeat")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="exit non-zero if slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--output", help="also write the JSON result here")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    if args.filter:
+        cases = {name: fn for name, fn in cases.items() if args.filter in name}
+
+    print(f"{'case':<50}{'median (us)':>14}{'stdev':>12}{'peak KiB':>12}")
+    result = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": run(cases, args.repeat, args.min_time)
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f).get("cases", {})
+        # Filtered runs only replace the cases they measured
+        result["cases"] = {**previous, **result["cases"]}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("No baseline yet; run with --save-baseline to create one.")
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("python") != result["python"]:
+            print(f"Warning: baseline was recorded on Python {baseline.get('python')}")
+        regressions = compare(result["cases"], baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,82 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 import uuid
 import io
+import os
+import json
+import hashlib
 
-from services.resume_parser import extract_text
-from services.chunker import extract_text_from_json, chunk_text
-from services.temp_store import save_ocr, get_ocr
-from services.ai_engine import AIEngine
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from services.resume_parser import iter_pages, inspect_upload
+from services.chunker import extract_text_from_json, iter_chunks
+from services.temp_store import save_ocr, get_ocr, resume_store
+from services.ai_engine import get_engine, DEFAULT_QUESTIONS
 from services.database import Database
 from services.pdf_generator import generate_interview_report
+from services.pipeline import Pipeline
+from services.llm_cache import llm_cache
+from services.provider_router import provider_router
+from services.scheduler import llm_scheduler
+from services.conversation import conversation_context
+from services.metrics import metrics
+from services.question_bank import question_bank
+from services.answer_cache import answer_cache
+from services.problem_pool import problem_pool
+from services.sandbox import code_sandbox
+from services.jobs import job_queue, QueueFull
+from services.uploads import UploadRejected, UPLOAD_MAX_BYTES
 
 interview_bp = Blueprint('interview', __name__)
 
+START_STAGE_TIMEOUT = float(os.getenv("START_STAGE_TIMEOUT", 60))
+ANSWER_BATCH_MAX_ITEMS = int(os.getenv("ANSWER_BATCH_MAX_ITEMS", 20))
+
+
+def _upload_error(e):
+    # Werkzeug raises RequestEntityTooLarge as soon as the form is touched
+    if isinstance(e, RequestEntityTooLarge):
+        return jsonify({"error": f"Upload too large (limit {UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"}), 413
+    return jsonify({"error": str(e)}), e.status
+
+
+def _load_resume(file):
+    """
+    OCRs and chunks an uploaded resume, reusing earlier results when the same
+    bytes were seen recently. Returns (fingerprint, resume) where resume holds
+    ocr_json, full_text, chunks and anything else cached for that file.
+    Raises UploadRejected for files that are too large or not a resume type.
+    """
+    fingerprint = inspect_upload(file)
+
+    resume = resume_store.get(fingerprint)
+    if resume and "chunks" in resume:
+        print(f"DEBUG: Resume cache hit {fingerprint[:12]}")
+    else:
+        # Pages are chunked as they come off the parser rather than after the last one
+        pages = []
+
+        def collect(page_iter):
+            for page in page_iter:
+                pages.append(page)
+                yield page
+
+        chunks = list(iter_chunks(collect(iter_pages(file))))
+        ocr_json = {"pages": pages}
+        resume = {"ocr_json": ocr_json, "chunks": chunks}
+        # Failed extractions are not remembered so a retry can succeed
+        if ocr_json.get("pages"):
+            resume_store.update(fingerprint, **resume)
+
+    resume["full_text"] = extract_text_from_json(resume["ocr_json"])
+    return fingerprint, resume
+
+
+def _remember_analysis(fingerprint, analysis, failed=False):
+    # Only keep real analyses; fallbacks should be retried next time
+    if failed or not isinstance(analysis, dict) or not analysis.get("ats_score"):
+        return
+    resume_store.update(fingerprint, resume_analysis=analysis)
+
 
 # ==========================================================
 # START INTERVIEW (UPDATED WITH TEMP STORE + CHUNKING)
@@ -23,6 +89,8 @@ def start_interview():
         job_role = request.form.get('job_role')
         category = request.form.get('category', 'Technical')
         difficulty = request.form.get('difficulty', 'Medium')
+        # Skip the question bank and tailor every question to this resume
+        personalized = request.form.get('personalized', 'false').lower() == 'true'
 
         if not job_role:
             return jsonify({"error": "Job role is required"}), 400
@@ -32,36 +100,68 @@ def start_interview():
 
         file = request.files['resume_file']
 
-        # ✅ STEP 1 — OCR → JSON
-        ocr_json = extract_text(file)
+        # ✅ STEP 1 — OCR → JSON + chunks (reused for repeat uploads)
+        fingerprint, resume = _load_resume(file)
+        full_text = resume["full_text"]
+        chunks = resume["chunks"]
 
         # ✅ STEP 2 — Save to Temporary Store
-        save_ocr(session_id, ocr_json)
+        save_ocr(session_id, resume["ocr_json"])
 
-        # ✅ STEP 3 — Extract + Chunk
-        full_text = extract_text_from_json(ocr_json)
-        chunks = chunk_text(full_text)
         print("DEBUG: Total words:", len(full_text.split()))
         print("DEBUG: Number of chunks:", len(chunks))
-        print("DEBUG: First chunk preview:", chunks[0][:200])
-
-        ai = AIEngine()
-
-        # ✅ STEP 4 — Deep Resume Analysis (Chunk-Based)
-        resume_analysis = ai.analyze_resume_from_chunks(chunks)
-
-        # ✅ STEP 5 — Generate Interview Questions (using text)
-        questions = ai.generate_questions(full_text, job_role, category, difficulty)
+        if chunks:
+            print("DEBUG: First chunk preview:", chunks[0][:200])
+
+        ai = get_engine()
+
+        # ✅ STEP 4 — Resume analysis, questions and name only need the
+        # resume text, so they run side by side
+        pipeline = Pipeline(label="Start interview")
+        pipeline.add(
+            "resume_analysis",
+            lambda: resume.get("resume_analysis") or ai.analyze_resume_from_chunks(chunks),
+            timeout=START_STAGE_TIMEOUT,
+            default={
+                "ats_score": 0,
+                "summary": "Could not complete resume analysis.",
+                "strengths": [],
+                "weaknesses": [],
+                "missing_skills": [],
+                "suggested_roles": []
+            }
+        )
+        pipeline.add(
+            "questions",
+            lambda: ai.generate_questions(full_text, job_role, category, difficulty, personalized),
+            timeout=START_STAGE_TIMEOUT,
+            default=list(DEFAULT_QUESTIONS)
+        )
+        pipeline.add(
+            "user_name",
+            lambda: resume.get("user_name") or ai.extract_name(full_text),
+            timeout=START_STAGE_TIMEOUT,
+            default="Candidate"
+        )
+        stages = pipeline.run()
+        print("DEBUG: Start interview stage timings (ms):", stages.timings)
 
-        user_name = ai.extract_name(full_text)
+        if resume["ocr_json"].get("pages"):
+            _remember_analysis(fingerprint, stages["resume_analysis"], "resume_analysis" in stages.errors)
+            if "user_name" not in stages.errors:
+                resume_store.update(fingerprint, user_name=stages["user_name"])
 
         return jsonify({
             "session_id": session_id,
-            "questions": questions,
-            "user_name": user_name,
-            "resume_analysis": resume_analysis
+            "questions": stages["questions"],
+            "user_name": stages["user_name"],
+            "resume_analysis": stages["resume_analysis"],
+            "stage_timings_ms": stages.timings,
+            "degraded_stages": sorted(stages.errors)
         })
 
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return _upload_error(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -80,7 +180,7 @@ def submit_answer():
         if not all([question, answer, job_role]):
             return jsonify({"error": "Missing required fields"}), 400
 
-        ai = AIEngine()
+        ai = get_engine()
         result = ai.evaluate_answer(question, answer, job_role)
 
         return jsonify(result)
@@ -89,6 +189,40 @@ def submit_answer():
         return jsonify({"error": str(e)}), 500
 
 
+@interview_bp.route('/answers/batch', methods=['POST'])
+def submit_answers_batch():
+    try:
+        data = request.json or {}
+        job_role = data.get('job_role')
+        items = data.get('items')
+
+        if not job_role or not isinstance(items, list) or not items:
+            return jsonify({"error": "job_role and a non-empty items list are required"}), 400
+
+        if len(items) > ANSWER_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {ANSWER_BATCH_MAX_ITEMS} items per batch"}), 400
+
+        results = [None] * len(items)
+        valid = []
+        for i, item in enumerate(items):
+            if isinstance(item, dict) and item.get('question') and item.get('answer'):
+                valid.append(i)
+            else:
+                results[i] = {"ok": False, "result": None, "error": "Missing question or answer"}
+
+        ai = get_engine()
+        evaluated = ai.evaluate_answers([items[i] for i in valid], job_role)
+        for i, entry in zip(valid, evaluated):
+            results[i] = entry
+
+        return jsonify({
+            "results": [{"index": i, **entry} for i, entry in enumerate(results)]
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ==========================================================
 # SAVE SESSION 
 # ==========================================================
@@ -188,16 +322,51 @@ def chat():
     try:
         data = request.json
         messages = data.get('messages', [])
+        # Handed out on the first turn; the client echoes it so the rolling summary is found again
+        conversation_id = data.get('conversation_id') or uuid.uuid4().hex
         
-        ai = AIEngine()
-        response = ai.chat(messages)
+        ai = get_engine()
+        response = ai.chat(messages, conversation_id)
         
-        return jsonify({"response": response})
+        return jsonify({"response": response, "conversation_id": conversation_id})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@interview_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same request body as /chat, but the reply is streamed back as
+    Server-Sent Events: one `data: {"token": ...}` event per piece of text,
+    then a `done` event carrying the full response and the conversation_id
+    to send with the next turn. If the reply breaks off an `error` event is
+    sent instead of `done`.
+    """
+    data = request.json or {}
+    messages = data.get('messages', [])
+    conversation_id = data.get('conversation_id') or uuid.uuid4().hex
+    ai = get_engine()
+
+    def generate():
+        parts = []
+        try:
+            for token in ai.chat_stream(messages, conversation_id):
+                parts.append(token)
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            print(f"Chat Stream Error: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps({'response': ''.join(parts), 'conversation_id': conversation_id})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @interview_bp.route('/chat/resume', methods=['POST'])
 def chat_resume_upload():
     try:
@@ -208,45 +377,47 @@ def chat_resume_upload():
         job_role = request.form.get('job_role', 'Software Developer')
         difficulty = request.form.get('difficulty', 'Medium')
         
-        # OCR
-        ocr_json = extract_text(file)
-        full_text = extract_text_from_json(ocr_json)
+        # OCR (reused for repeat uploads)
+        _, resume = _load_resume(file)
+        full_text = resume["full_text"]
         
-        ai = AIEngine()
+        ai = get_engine()
         context = ai.analyze_resume_for_chat(full_text, job_role, difficulty)
         
         return jsonify({"context": context})
         
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return _upload_error(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _analyze_session(data):
+    conversation = data.get('conversation', [])
+    behavioral_alerts = data.get('behavioral_alerts', [])
+    job_role = data.get('job_role', 'Software Developer')
+    difficulty = data.get('difficulty', 'Medium')
+    user_name = data.get('user_name', 'Candidate')
+    
+    ai = get_engine()
+    analysis = ai.analyze_interview(
+        conversation, 
+        behavioral_alerts, 
+        job_role, 
+        difficulty, 
+        user_name
+    )
+    
+    # Check if we got an error dictionary back
+    if not analysis or analysis.get("verdict") == "ERROR":
+        raise RuntimeError((analysis or {}).get("detailed_feedback", "Failed to analyze interview."))
+    return analysis
+
+
 @interview_bp.route('/analyze', methods=['POST'])
 def analyze_interview_session():
     try:
-        data = request.json
-        conversation = data.get('conversation', [])
-        behavioral_alerts = data.get('behavioral_alerts', [])
-        job_role = data.get('job_role', 'Software Developer')
-        difficulty = data.get('difficulty', 'Medium')
-        user_name = data.get('user_name', 'Candidate')
-        
-        ai = AIEngine()
-        analysis = ai.analyze_interview(
-            conversation, 
-            behavioral_alerts, 
-            job_role, 
-            difficulty, 
-            user_name
-        )
-        
-        # Check if we got an error dictionary back
-        if not analysis or analysis.get("verdict") == "ERROR":
-            return jsonify({
-                "success": False, 
-                "error": analysis.get("detailed_feedback", "Failed to analyze interview.")
-            }), 500
-            
+        analysis = _analyze_session(request.json)
         return jsonify({
             "success": True,
             "analysis": analysis
@@ -255,6 +426,36 @@ def analyze_interview_session():
     except Exception as e:
         print(f"Error in /analyze: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+@interview_bp.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Same input as /analyze; returns a job id to poll instead of blocking on the analysis."""
+    data = request.json or {}
+    # Resubmitting the same transcript (retry, double click) reuses the job
+    key = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    try:
+        job_id = job_queue.submit("interview_analysis", _analyze_session, data, key=key)
+    except QueueFull:
+        response = jsonify({"success": False, "error": "Too many analyses in progress, please retry shortly."})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+
+@interview_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+
+    if job["status"] == "done":
+        return jsonify({"success": True, "status": "done", "analysis": job["result"]})
+    if job["status"] == "failed":
+        return jsonify({"success": False, "status": "failed", "error": job["error"]})
+    return jsonify({"success": True, "status": job["status"], "position": job.get("position")})
+
+
 # ==========================================================
 # RESUME ANALYSIS 
 # ==========================================================
@@ -266,14 +467,10 @@ def analyze_resume():
 
         file = request.files['resume']
 
-        # STEP 1 — OCR → JSON
-        ocr_json = extract_text(file)
-
-        # STEP 2 — Extract text from JSON
-        full_text = extract_text_from_json(ocr_json)
-
-        # STEP 3 — Chunk text
-        chunks = chunk_text(full_text)
+        # STEP 1-3 — OCR → JSON → text → chunks (reused for repeat uploads)
+        fingerprint, resume = _load_resume(file)
+        full_text = resume["full_text"]
+        chunks = resume["chunks"]
 
         print("DEBUG: Resume Analyze - Total words:", len(full_text.split()))
         print("DEBUG: Resume Analyze - Number of chunks:", len(chunks))
@@ -291,10 +488,14 @@ def analyze_resume():
             })
 
 
-        ai = AIEngine()
+        ai = get_engine()
 
         # STEP 4 — Analyze using chunk-based method
-        analysis = ai.analyze_resume_from_chunks(chunks)
+        analysis = resume.get("resume_analysis")
+        if not analysis:
+            analysis = ai.analyze_resume_from_chunks(chunks)
+            if resume["ocr_json"].get("pages"):
+                _remember_analysis(fingerprint, analysis)
 
        # return jsonify(analysis)
         
@@ -305,6 +506,8 @@ def analyze_resume():
 })
 
 
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return _upload_error(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -319,9 +522,11 @@ def generate_problem():
         language = data.get('language', 'Python')
         topic = data.get('topic', 'Arrays')
         difficulty = data.get('difficulty', 'Easy')
+        # Lets the pool avoid repeats for this user; anonymous callers fall back to their address
+        user_id = data.get('user_id') or request.remote_addr
         
-        ai = AIEngine()
-        problem = ai.generate_coding_problem(language, topic, difficulty)
+        ai = get_engine()
+        problem = ai.generate_coding_problem(language, topic, difficulty, user_id)
         
         return jsonify(problem)
         
@@ -336,15 +541,133 @@ def review_code():
         code = data.get('code')
         problem_description = data.get('problem_description')
         language = data.get('language')
+        # Problems served from the pool carry an id; their hidden tests run locally
+        problem_id = data.get('problem_id')
         
         if not all([code, problem_description, language]):
             return jsonify({"error": "Missing required fields"}), 400
             
-        ai = AIEngine()
-        review = ai.review_code(code, problem_description, language)
+        ai = get_engine()
+        review = ai.review_code(code, problem_description, language, problem_id)
         
         return jsonify(review)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+
+
+@interview_bp.route('/coding/review/<review_id>/style', methods=['GET'])
+def review_style(review_id):
+    result = get_engine().style_review(review_id)
+    if result is None:
+        return jsonify({"error": "Unknown or expired review"}), 404
+    return jsonify(result)
+
+
+# ==========================================================
+# LLM STATUS
+# ==========================================================
+@interview_bp.route('/llm/status', methods=['GET'])
+def llm_status():
+    return jsonify({
+        "router": provider_router.snapshot(),
+        "scheduler": llm_scheduler.stats(),
+        "cache": llm_cache.stats() if llm_cache else {"enabled": False},
+        "resume_store": resume_store.stats(),
+        "conversations": conversation_context.stats(),
+        "question_bank": question_bank.stats() if question_bank else {"enabled": False},
+        "answer_cache": answer_cache.stats() if answer_cache else {"enabled": False},
+        "problem_pool": problem_pool.stats() if problem_pool else {"enabled": False},
+        "sandbox": code_sandbox.stats() if code_sandbox else {"enabled": False},
+        "jobs": job_queue.stats()
+    })
+
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _service_samples():
+    """Exports the stats kept by the LLM services on each /metrics scrape."""
+    if llm_cache:
+        cache = llm_cache.stats()
+        yield ("llm_cache_entries", "gauge", "Responses held in the in-memory LLM cache", {}, cache["entries"])
+        for call_type, counts in cache["by_call_type"].items():
+            for event, value in counts.items():
+                yield ("llm_cache_events_total", "counter", "LLM cache lookups and stores by outcome",
+                       {"call_type": call_type, "event": event}, value)
+
+    for name, provider in provider_router.snapshot()["providers"].items():
+        labels = {"provider": name}
+        yield ("llm_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half open, 2 open)",
+               labels, BREAKER_STATES.get(provider["state"]))
+        yield ("llm_error_rate", "gauge", "Provider error rate over the rolling window", labels, provider["error_rate"])
+        for quantile, key in (("0.5", "p50_latency_s"), ("0.95", "p95_latency_s")):
+            yield ("llm_latency_seconds", "gauge", "Provider latency over the rolling window",
+                   {**labels, "quantile": quantile}, provider[key])
+        for decision, value in provider["decisions"].items():
+            yield ("llm_routing_decisions_total", "counter", "Provider router decisions and outcomes",
+                   {**labels, "decision": decision}, value)
+
+    for name, state in llm_scheduler.stats().items():
+        labels = {"provider": name}
+        for priority, depth in state["queue_depth_by_priority"].items():
+            yield ("llm_queue_depth", "gauge", "Calls waiting for provider capacity",
+                   {**labels, "priority": priority}, depth)
+        for priority, counts in state["by_priority"].items():
+            for outcome in ("admitted", "timeouts"):
+                yield ("llm_queue_admissions_total", "counter", "Scheduler admissions and queue timeouts",
+                       {**labels, "priority": priority, "outcome": outcome}, counts[outcome])
+            yield ("llm_queue_wait_seconds_total", "counter", "Total time admitted calls spent queued",
+                   {**labels, "priority": priority}, counts["total_wait_s"])
+        yield ("llm_requests_available", "gauge", "Request budget left in the rate-limit bucket",
+               labels, state["requests_available"])
+        yield ("llm_tokens_available", "gauge", "Token budget left in the rate-limit bucket",
+               labels, state["tokens_available"])
+
+    if question_bank:
+        bank = question_bank.stats()
+        for outcome in ("hits", "misses"):
+            yield ("question_bank_lookups_total", "counter", "Interview starts served from (or missing) the question bank",
+                   {"outcome": outcome}, bank[outcome])
+        yield ("question_bank_questions", "gauge", "Questions held in the question bank", {}, bank["questions"])
+        yield ("question_bank_refill_queue", "gauge", "Question bank keys waiting for a refill", {}, bank["refill_queue"])
+
+    if answer_cache:
+        answers = answer_cache.stats()
+        for outcome in ("hits", "misses", "skipped_short"):
+            yield ("answer_cache_lookups_total", "counter", "Near-duplicate answer cache lookups by outcome",
+                   {"outcome": outcome}, answers[outcome])
+        yield ("answer_cache_answers", "gauge", "Evaluated answers held for near-duplicate reuse", {}, answers["answers"])
+        yield ("answer_cache_evictions_total", "counter", "Answers evicted from the near-duplicate cache",
+               {}, answers["evictions"])
+
+    if problem_pool:
+        problems = problem_pool.stats()
+        for outcome in ("hits", "misses"):
+            yield ("problem_pool_lookups_total", "counter", "Coding problems served from (or missing) the problem pool",
+                   {"outcome": outcome}, problems[outcome])
+        yield ("problem_pool_problems", "gauge", "Coding problems held in the problem pool", {}, problems["problems"])
+        yield ("problem_pool_growth_queue", "gauge", "Problem pool keys waiting to grow", {}, problems["growth_queue"])
+        yield ("problem_pool_rejected_total", "counter", "Generated problems rejected for too few verified tests",
+               {}, problems["rejected"])
+
+    if code_sandbox:
+        runs = code_sandbox.stats()
+        for outcome in ("passed", "failed", "timeouts", "errors", "busy", "unavailable"):
+            yield ("sandbox_submissions_total", "counter", "Code submissions run against hidden tests, by outcome",
+                   {"outcome": outcome}, runs[outcome])
+
+    jobs = job_queue.stats()
+    for outcome in ("done", "failed", "rejected", "deduplicated"):
+        yield ("jobs_total", "counter", "Background jobs by outcome", {"outcome": outcome}, jobs[outcome])
+    yield ("jobs_queued", "gauge", "Background jobs waiting for a worker", {}, jobs["queued"])
+    yield ("jobs_running", "gauge", "Background jobs being worked on", {}, jobs["running"])
+
+    store = resume_store.stats()
+    yield ("resume_store_entries", "gauge", "Resumes held for repeat uploads", {}, store["entries"])
+    yield ("resume_store_bytes", "gauge", "Approximate size of the resume store", {}, store["bytes"])
+    yield ("chat_conversations", "gauge", "Conversations with server-side summary state", {},
+           conversation_context.stats()["conversations"])
+
+
+metrics.register_collector(_service_samples)
@@ -1,11 +1,39 @@
 import os
-import json
-from google import genai
-from groq import Groq
+import time
+import threading
+import uuid
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+from services.concurrency import map_bounded
+from services.llm_cache import llm_cache, make_key
+from services.conversation import conversation_context
+from services.provider_router import provider_router, retry_after_seconds
+from services.metrics import metrics
+from services.json_repair import extract_json, SCHEMAS, SCORED_CALL_TYPES
+from services.question_bank import question_bank
+from services.problem_pool import problem_pool, public_view, problem_id as make_problem_id
+from services.sandbox import code_sandbox
+from services.answer_cache import answer_cache
+from services.scheduler import (
+    llm_scheduler, QueueTimeout, estimate_request_tokens, estimate_stream_tokens, priority_for
+)
+from services.providers import (
+    GroqProvider, GeminiProvider, StubProvider, LLM_PROVIDER, GROQ_MODEL, GEMINI_MODEL
+)
+
 load_dotenv()
 
+CHUNK_ANALYSIS_CONCURRENCY = int(os.getenv("CHUNK_ANALYSIS_CONCURRENCY", 4))
+CHUNK_ANALYSIS_TIMEOUT = float(os.getenv("CHUNK_ANALYSIS_TIMEOUT", 30))
+ANSWER_BATCH_CONCURRENCY = int(os.getenv("ANSWER_BATCH_CONCURRENCY", 4))
+ANSWER_EVAL_TIMEOUT = float(os.getenv("ANSWER_EVAL_TIMEOUT", 30))
+INTERVIEW_SEGMENT_CHARS = int(os.getenv("INTERVIEW_SEGMENT_CHARS", 6000))  # longer transcripts are map-reduced
+INTERVIEW_SEGMENT_CONCURRENCY = int(os.getenv("INTERVIEW_SEGMENT_CONCURRENCY", 4))
+INTERVIEW_SEGMENT_TIMEOUT = float(os.getenv("INTERVIEW_SEGMENT_TIMEOUT", 30))
+OCR_RESERVED_TOKENS = 1000  # scheduler reservation per OCR call
+STYLE_REVIEWS_KEPT = int(os.getenv("STYLE_REVIEWS_KEPT", 500))  # finished/pending style reviews held for polling
+
 SYSTEM_PROMPT = """
 You are an expert Technical Interviewer and Career Coach.
 
@@ -19,77 +47,192 @@ Your primary goal is to conduct a professional interview.
 Stay in character as a professional interviewer. Be encouraging but rigorous.
 """
 
+CHAT_ERROR_MESSAGE = "I apologize, but I am encountering technical difficulties. Please try again."
+
+DEFAULT_QUESTIONS = [
+    "Tell me about yourself and your experience.",
+    "What do you consider your greatest strength?",
+    "Describe a challenging project you worked on.",
+    "Why do you want to work in this role?",
+    "Where do you see yourself in 5 years?"
+]
+
+
+def _evaluation_fallback():
+    return {
+        "feedback": "Could not evaluate answer at this time.",
+        "score": 0,
+        "ideal_answer": "N/A",
+        "qualified": False
+    }
+
+
 class AIEngine:
-    def __init__(self):
-        self.groq_api_key = os.getenv("GROQ_API_KEY")
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
+    """
+    Runs every LLM-backed feature of the app on top of a set of providers
+    (Groq and Gemini, or the offline stub when LLM_PROVIDER=stub).
+    Provider clients are created lazily on first use and keep their HTTP
+    connections alive, so one instance should be shared across requests
+    through get_engine().
+    """
 
-        self.groq_client = None
-        if self.groq_api_key:
-            try:
-                self.groq_client = Groq(api_key=self.groq_api_key)
-            except Exception as e:
-                print(f"Groq Init Error: {e}")
+    def __init__(self, groq_api_key=None, gemini_api_key=None, provider_mode=None):
+        self._lock = threading.Lock()
+        self.groq_api_key = groq_api_key or os.getenv("GROQ_API_KEY")
+        self.gemini_api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
+        self.provider_mode = provider_mode or LLM_PROVIDER
+        self._providers = None
+        self._style_reviews = OrderedDict()
+
+    @property
+    def providers(self):
+        """Configured providers by name, in their default preference order."""
+        if self._providers is None:
+            with self._lock:
+                if self._providers is None:
+                    self._providers = self._build_providers()
+        return self._providers
 
-        self.gemini_client = None
+    def _build_providers(self):
+        if self.provider_mode == "stub":
+            return {"stub": StubProvider()}
+
+        providers = {}
+        if self.groq_api_key:
+            providers["groq"] = GroqProvider(self.groq_api_key, on_usage=self._record_usage)
         if self.gemini_api_key:
+            providers["gemini"] = GeminiProvider(self.gemini_api_key, on_usage=self._record_usage)
+        return providers
+
+    def _record_usage(self, provider, reserved_tokens, used_tokens):
+        llm_scheduler.settle(provider, reserved_tokens, used_tokens)
+        if used_tokens:
+            metrics.inc("llm_tokens_total", used_tokens, provider=provider)
+
+    def _complete(self, provider, call_type, messages, temperature, json_mode, tokens):
+        with metrics.span("llm", provider=provider.name, model=provider.model, call_type=call_type):
             try:
-                self.gemini_client = genai.Client(api_key=self.gemini_api_key)
-            except Exception as e:
-                print(f"Gemini Init Error: {e}")
+                response_text = provider.complete(messages, temperature, json_mode, tokens)
+            except Exception:
+                # A failed call used no quota; hand its reservation back
+                llm_scheduler.settle(provider.name, tokens, 0)
+                raise
+        if json_mode and call_type in SCORED_CALL_TYPES and response_text:
+            # A score rebuilt from a cut-off response is not worth keeping;
+            # failing here lets the router try the next provider
+            if extract_json(response_text, SCHEMAS.get(call_type)).truncated:
+                metrics.inc("llm_json_failures_total", call_type=call_type)
+                raise ValueError(f"{call_type} response was truncated")
+        return response_text
 
-    def _call_gemini(self, prompt, temperature=0.7):
-        """Fallback to Gemini when Groq fails"""
-        if not self.gemini_client:
-            print("Gemini client not available for fallback")
-            return None
-            
-        try:
-            # Gemini doesn't use system prompts the same way, so we prepend it
-            full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
-            
-            response = self.gemini_client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=full_prompt,
-                config=genai.types.GenerateContentConfig(
-                    temperature=temperature
-                )
-            )
-            return response.text
-        except Exception as e:
-            print(f"Gemini Fallback Error: {e}")
-            return None
+    @property
+    def groq_client(self):
+        provider = self.providers.get("groq")
+        return provider.client if provider else None
 
-    def _call_llm(self, messages, temperature=0.7, json_mode=False):
+    @property
+    def gemini_client(self):
+        provider = self.providers.get("gemini")
+        return provider.client if provider else None
+
+    def rotate_keys(self, groq_api_key=None, gemini_api_key=None):
         """
-        Attempts to call Groq first. If it fails (rate limit/error), falls back to Gemini.
-        Returns the string response content.
+        Swaps in new API keys. Providers are rebuilt lazily on the next call;
+        requests already in flight finish on the old clients.
         """
-        # Extract user prompt from messages for Gemini fallback
-        user_prompt = next((m['content'] for m in messages if m['role'] == 'user'), "")
-        
-        # 1. Try Groq
-        if self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    messages=messages,
-                    model="llama-3.3-70b-versatile",
-                    temperature=temperature,
-                    response_format={"type": "json_object"} if json_mode else None
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                print(f"Groq Error (falling back to Gemini): {e}")
-        
-        # 2. Fallback to Gemini
-        return self._call_gemini(user_prompt, temperature)
+        with self._lock:
+            changed = False
+            if groq_api_key and groq_api_key != self.groq_api_key:
+                self.groq_api_key = groq_api_key
+                changed = True
+            if gemini_api_key and gemini_api_key != self.gemini_api_key:
+                self.gemini_api_key = gemini_api_key
+                changed = True
+            if changed:
+                self._providers = None
+
+    def _call_llm(self, messages, temperature=0.7, json_mode=False, call_type="default"):
+        """
+        Serves the response from the LLM cache when possible; otherwise
+        calls the providers and caches the result for the call type's TTL.
+        """
+        if not llm_cache or llm_cache.ttl_for(call_type) <= 0:
+            return self._call_providers(messages, temperature, json_mode, call_type)
+
+        # Stub responses must never be served to (or from) live traffic
+        model = "stub" if self.provider_mode == "stub" else f"{GROQ_MODEL}|{GEMINI_MODEL}"
+        key = make_key(messages, model, temperature, json_mode)
+        cached = llm_cache.get(key, call_type)
+        if cached is not None:
+            return cached
+
+        response_text = self._call_providers(messages, temperature, json_mode, call_type)
+        if response_text and (not json_mode or self._is_valid_json(response_text, call_type)):
+            llm_cache.set(key, response_text, call_type)
+        return response_text
+
+    def _call_providers(self, messages, temperature=0.7, json_mode=False, call_type="default"):
+        """
+        Lets the provider router pick a provider (Groq first, then Gemini by
+        default), skipping providers whose circuit is open. Each attempt is
+        admitted by the scheduler according to the call type's priority.
+        Returns the string response content, or None if every provider failed.
+        """
+        tokens = estimate_request_tokens(messages)
+        metrics.inc("llm_estimated_tokens_total", tokens, call_type=call_type)
+
+        calls = {
+            name: (lambda provider=provider: self._complete(
+                provider, call_type, messages, temperature, json_mode, tokens
+            ))
+            for name, provider in self.providers.items()
+        }
+
+        if not calls:
+            print("No LLM provider configured. Check GROQ_API_KEY / GEMINI_API_KEY.")
+            return None
+        return provider_router.call(calls, tokens=tokens, priority=priority_for(call_type))
 
     # ==========================================================
     # NEW METHOD — CHUNK-BASED RESUME ANALYSIS (SAFE ADDITION)
     # ==========================================================
+    def _analyze_chunk(self, chunk):
+        prompt = f"""
+        Analyze this portion of a resume as an expert Technical Recruiter.
+        
+        Resume Section:
+        {chunk}
+
+        Return JSON:
+        {{
+            "strengths": [],
+            "weaknesses": [],
+            "skills_detected": []
+        }}
+
+        Return ONLY valid JSON.
+        """
+
+        try:
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            
+            response_text = self._call_llm(messages, temperature=0.4, json_mode=True, call_type="chunk_analysis")
+            if response_text:
+                return self._clean_and_parse_json(response_text, "chunk_analysis")
+
+        except Exception as e:
+            print(f"Chunk Analysis Error: {e}")
+
+        return None
+
     def analyze_resume_from_chunks(self, chunks):
         """
         Performs deep resume analysis using chunked resume text.
+        Chunks are analyzed concurrently; the merge call runs once every
+        chunk has finished or been dropped.
         """
 
         if not chunks:
@@ -102,39 +245,14 @@ class AIEngine:
                 "suggested_roles": []
             }
 
-        partial_analyses = []
-
-        for chunk in chunks:
-            prompt = f"""
-            Analyze this portion of a resume as an expert Technical Recruiter.
-            
-            Resume Section:
-            {chunk}
-
-            Return JSON:
-            {{
-                "strengths": [],
-                "weaknesses": [],
-                "skills_detected": []
-            }}
-
-            Return ONLY valid JSON.
-            """
-
-            try:
-                messages = [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ]
-                
-                response_text = self._call_llm(messages, temperature=0.4, json_mode=True)
-                if response_text:
-                    parsed = self._clean_and_parse_json(response_text)
-                    if parsed:
-                        partial_analyses.append(parsed)
-
-            except Exception as e:
-                print(f"Chunk Analysis Error: {e}")
+        analyses = map_bounded(
+            self._analyze_chunk,
+            chunks,
+            max_workers=CHUNK_ANALYSIS_CONCURRENCY,
+            timeout=CHUNK_ANALYSIS_TIMEOUT,
+            label="Chunk analysis"
+        )
+        partial_analyses = [a for a in analyses if a]
 
         combined_strengths = []
         combined_weaknesses = []
@@ -145,9 +263,10 @@ class AIEngine:
             combined_weaknesses.extend(item.get("weaknesses", []))
             combined_skills.extend(item.get("skills_detected", []))
 
-        combined_strengths = list(set(combined_strengths))
-        combined_weaknesses = list(set(combined_weaknesses))
-        combined_skills = list(set(combined_skills))
+        # Dedupe while keeping chunk order so the merge prompt is stable
+        combined_strengths = list(dict.fromkeys(combined_strengths))
+        combined_weaknesses = list(dict.fromkeys(combined_weaknesses))
+        combined_skills = list(dict.fromkeys(combined_skills))
 
         final_prompt = f"""
         Based on these extracted resume insights:
@@ -176,9 +295,9 @@ class AIEngine:
                 {"role": "user", "content": final_prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.4, json_mode=True)
+            response_text = self._call_llm(messages, temperature=0.4, json_mode=True, call_type="resume_merge")
             if response_text:
-                return self._clean_and_parse_json(response_text)
+                return self._clean_and_parse_json(response_text, "resume_merge")
 
         except Exception as e:
             print(f"Final Resume Merge Error: {e}")
@@ -196,7 +315,17 @@ class AIEngine:
     # EXISTING METHODS BELOW (UNCHANGED LOGIC)
     # ==========================================================
 
-    def generate_questions(self, resume_text, job_role, category, difficulty):
+    def generate_questions(self, resume_text, job_role, category, difficulty, personalized=False):
+        """
+        Serves the interview's questions from the question bank when its pool
+        for this role is big enough (re-ranked against the resume), and only
+        otherwise, or when `personalized` is set, asks the LLM synchronously.
+        """
+        if question_bank and not personalized:
+            questions = question_bank.pick(job_role, category, difficulty, resume_text)
+            if questions:
+                return questions
+
         prompt = f"""
         Generate 5 interview questions for a {job_role} position.
         Resume Context: {resume_text[:3000]}
@@ -214,33 +343,84 @@ class AIEngine:
                 {"role": "user", "content": prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.6, json_mode=True)
+            response_text = self._call_llm(messages, temperature=0.6, json_mode=True, call_type="generate_questions")
             if response_text:
-                result = self._clean_and_parse_json(response_text)
-                if result:
-                    # Validate format
-                    if isinstance(result, list):
-                        return result
-                    elif isinstance(result, dict):
-                        # Attempt to find the list in the dict
-                        for key, value in result.items():
-                            if isinstance(value, list):
-                                return value
-                        # If no provided list found, fallback
-                        print(f"Unexpected JSON format: {result}")
+                questions = self._question_list(self._clean_and_parse_json(response_text, "generate_questions"))
+                if questions:
+                    return questions
                         
         except Exception as e:
             print(f"Question Generation Error: {e}")
             
-        return [
-            "Tell me about yourself and your experience.",
-            "What do you consider your greatest strength?",
-            "Describe a challenging project you worked on.",
-            "Why do you want to work in this role?",
-            "Where do you see yourself in 5 years?"
+        return list(DEFAULT_QUESTIONS)
+
+    def generate_bank_questions(self, job_role, category, difficulty, count, existing=()):
+        """Generic (resume-independent) questions used to refill the question bank."""
+        avoid = "\n".join(f"- {q}" for q in list(existing)[-30:])
+        prompt = f"""
+        Generate {count} distinct interview questions for a {job_role} position.
+        Focus on: {category}
+        Difficulty Level: {difficulty}
+        
+        The questions must not depend on any particular candidate's resume.
+        {"Do not repeat or rephrase any of these existing questions:" if avoid else ""}
+        {avoid}
+        
+        Return ONLY a JSON list of strings.
+        """
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
         ]
+        response_text = self._call_llm(messages, temperature=0.9, json_mode=True, call_type="question_bank")
+        if not response_text:
+            raise RuntimeError("no response from any provider")
+        return self._question_list(self._clean_and_parse_json(response_text, "question_bank")) or []
+
+    def _question_list(self, result):
+        if isinstance(result, list):
+            return result
+        if isinstance(result, dict):
+            # Attempt to find the list in the dict
+            for key, value in result.items():
+                if isinstance(value, list):
+                    return value
+            # If no provided list found, fallback
+            print(f"Unexpected JSON format: {result}")
+        return None
 
     def evaluate_answer(self, question, answer, job_role):
+        result = self._evaluate_answer(question, answer, job_role)
+        if result: return result
+        return _evaluation_fallback()
+
+    def evaluate_answers(self, items, job_role):
+        """
+        Evaluates a list of {"question", "answer"} items concurrently.
+        Returns one {"ok", "result", "error"} entry per item, in order; a
+        failed item gets the usual fallback evaluation and an error message.
+        """
+        results = map_bounded(
+            lambda item: self._evaluate_answer(item["question"], item["answer"], job_role),
+            items,
+            max_workers=ANSWER_BATCH_CONCURRENCY,
+            timeout=ANSWER_EVAL_TIMEOUT,
+            label="Answer evaluation"
+        )
+
+        return [
+            {"ok": True, "result": result, "error": None} if result else
+            {"ok": False, "result": _evaluation_fallback(), "error": "Could not evaluate answer at this time."}
+            for result in results
+        ]
+
+    def _evaluate_answer(self, question, answer, job_role):
+        # Near-identical answers to the same question get the same evaluation
+        if answer_cache:
+            cached = answer_cache.lookup(question, answer, job_role)
+            if cached:
+                return cached
+
         prompt = f"""
         You are interviewing a candidate for a {job_role} role.
         
@@ -264,68 +444,171 @@ class AIEngine:
                 {"role": "user", "content": prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.3, json_mode=True)
+            response_text = self._call_llm(messages, temperature=0.3, json_mode=True, call_type="evaluate_answer")
             if response_text:
-                result = self._clean_and_parse_json(response_text)
-                if result: return result
+                parsed = self._extract_json(response_text, "evaluate_answer")
+                if parsed.ok and parsed.value:
+                    if answer_cache:
+                        answer_cache.store(question, answer, job_role, parsed.value, truncated=parsed.truncated)
+                    return parsed.value
                 
         except Exception as e:
             print(f"Answer Evaluation Error: {e}")
             
-        return {
-            "feedback": "Could not evaluate answer at this time.",
-            "score": 0,
-            "ideal_answer": "N/A",
-            "qualified": False
-        }
+        return None
 
     def extract_name(self, text):
         prompt = "Extract the candidate's full name from this resume text. Return ONLY the name as a string. If not found, return 'Candidate'."
         
-        # Try Gemini first for name extraction as it's often better at zero-shot extraction
-        if self.gemini_client:
-            try:
-                response = self.gemini_client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=[prompt, text[:2000]]
-                )
-                return response.text.strip()
-            except Exception as e:
-                print(f"Gemini Name Extraction Error: {e}")
+        messages = [
+            {"role": "system", "content": "You are a precise data extractor."},
+            {"role": "user", "content": f"{prompt}\n\nText: {text[:2000]}"}
+        ]
+        tokens = estimate_request_tokens(messages)
 
-        # Fallback to Groq
-        if self.groq_client:
-            try:
-                chat_completion = self.groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": "You are a precise data extractor."},
-                        {"role": "user", "content": f"{prompt}\n\nText: {text[:1000]}"}
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.1
-                )
-                return chat_completion.choices[0].message.content.strip()
-            except Exception as e:
-                print(f"Groq Name Extraction Error: {e}")
+        # Gemini goes first for name extraction as it's often better at zero-shot extraction
+        calls = {
+            name: (lambda provider=provider: self._complete(provider, "extract_name", messages, 0.1, False, tokens))
+            for name, provider in self.providers.items()
+        }
+        try:
+            name = provider_router.call(calls, tokens=tokens, prefer=["gemini"])
+            if name:
+                return name.strip()
+        except Exception as e:
+            print(f"Name Extraction Error: {e}")
 
         return "Candidate"
 
-    def chat(self, messages):
+    def _with_system_prompt(self, messages):
+        # Ensure system prompt is at the beginning
+        if messages and messages[0]['role'] != 'system':
+            messages.insert(0, {"role": "system", "content": SYSTEM_PROMPT})
+        elif not messages:
+            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        return messages
+
+    def summarize_conversation(self, previous_summary, messages):
+        """Extends a rolling interview summary with newly aged-out turns."""
+        transcript = "\n".join(
+            f"{'Interviewer' if m.get('role') == 'assistant' else 'Candidate' if m.get('role') == 'user' else 'Note'}: {m.get('content', '')}"
+            for m in messages
+        )
+        prompt = f"""
+        Maintain a running summary of an interview conversation.
+
+        Current summary:
+        {previous_summary or "(none yet)"}
+
+        New turns:
+        {transcript}
+
+        Return the updated summary in at most 200 words. Keep the topics
+        covered, questions already asked, notable answers and any hints given.
+        Return ONLY the summary text.
+        """
+
         try:
-            # Ensure system prompt is at the beginning
-            if messages and messages[0]['role'] != 'system':
-                messages.insert(0, {"role": "system", "content": SYSTEM_PROMPT})
-            elif not messages:
-                messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-            if self.groq_client or self.gemini_client:
-                response_text = self._call_llm(messages, temperature=0.5)
+            messages = [
+                {"role": "system", "content": "You are a precise note taker."},
+                {"role": "user", "content": prompt}
+            ]
+            return self._call_llm(messages, temperature=0.2, call_type="chat_summary")
+        except Exception as e:
+            print(f"Conversation Summary Error: {e}")
+            return None
+
+    def chat(self, messages, conversation_id=None):
+        try:
+            messages = self._with_system_prompt(messages)
+            messages = conversation_context.build(messages, self.summarize_conversation, conversation_id)
+
+            if self.providers:
+                response_text = self._call_llm(messages, temperature=0.5, call_type="chat")
                 if response_text: return response_text
                 
         except Exception as e:
             print(f"Chat Error: {e}")
             
-        return "I apologize, but I am encountering technical difficulties. Please try again."
+        return CHAT_ERROR_MESSAGE
+
+    def chat_stream(self, messages, conversation_id=None):
+        """
+        Streaming variant of chat(): yields text pieces as the provider
+        produces them. Providers are tried in the router's order; if one
+        fails before sending anything the next is streamed instead. Once text
+        has been sent we cannot switch providers, so a later failure is
+        raised to the caller rather than passed off as a complete reply.
+        """
+        messages = self._with_system_prompt(messages)
+        messages = conversation_context.build(messages, self.summarize_conversation, conversation_id)
+        plan = provider_router.plan(list(self.providers))
+        tried = set()
+        try:
+            tokens = estimate_request_tokens(messages)
+            for name in plan:
+                try:
+                    llm_scheduler.acquire(name, tokens, priority_for("chat"))
+                except QueueTimeout as e:
+                    # Never reached the provider; the finally below releases its probe
+                    print(f"{name} Stream Skipped: {e}")
+                    continue
+                tried.add(name)
+
+                start = time.monotonic()
+                sent_any = False
+                streamed = []
+                try:
+                    for text in self.providers[name].stream(messages, temperature=0.5):
+                        streamed.append(text)
+                        if not sent_any:
+                            # Time to first token is what the router learns from
+                            provider_router.record_success(name, time.monotonic() - start)
+                            metrics.observe("llm_time_to_first_token_seconds", time.monotonic() - start, provider=name)
+                            sent_any = True
+                        yield text
+                    if sent_any:
+                        return
+                    raise RuntimeError("empty stream")
+                except GeneratorExit:
+                    # Client went away before the first token: no verdict on the provider
+                    if not sent_any:
+                        provider_router.release_probes([name])
+                    raise
+                except Exception as e:
+                    print(f"{name} Stream Error: {e}")
+                    metrics.inc("stage_errors_total", stage="llm_stream", provider=name)
+                    if sent_any:
+                        raise
+                    provider_router.record_failure(name, time.monotonic() - start, retry_after_seconds(e))
+                finally:
+                    # Streams report no usage, so settle on what was actually sent
+                    used = estimate_stream_tokens(messages, "".join(streamed)) if streamed else 0
+                    llm_scheduler.settle(name, tokens, used)
+        finally:
+            provider_router.release_probes(set(plan) - tried)
+
+        yield CHAT_ERROR_MESSAGE
+
+    def ocr_image(self, image_bytes, mime_type):
+        """Extracts text from an image with the first OCR-capable provider."""
+        calls = {
+            name: (lambda provider=provider: self._ocr(provider, image_bytes, mime_type))
+            for name, provider in self.providers.items()
+            if provider.supports_ocr
+        }
+        if not calls:
+            print("No OCR-capable provider configured. Check GEMINI_API_KEY.")
+            return None
+        return provider_router.call(calls, tokens=OCR_RESERVED_TOKENS, priority="standard")
+
+    def _ocr(self, provider, image_bytes, mime_type):
+        with metrics.span("llm", provider=provider.name, model=provider.ocr_model or provider.model, call_type="ocr"):
+            try:
+                return provider.ocr(image_bytes, mime_type)
+            except Exception:
+                llm_scheduler.settle(provider.name, OCR_RESERVED_TOKENS, 0)
+                raise
 
     def analyze_resume_for_chat(self, resume_text, job_role, difficulty):
         prompt = f"""
@@ -343,45 +626,97 @@ class AIEngine:
                 {"role": "user", "content": prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.4)
+            response_text = self._call_llm(messages, temperature=0.4, call_type="resume_chat")
             if response_text: return response_text
         except Exception as e:
             print(f"Chat Resume Analysis Error: {e}")
             
         return "I have reviewed your resume. Let's start the interview."
 
-    def generate_coding_problem(self, language, topic, difficulty):
-        prompt = f"""
-        Generate a {difficulty} coding problem for {language} related to {topic}.
-        
-        Return JSON:
-        {{
-            "title": "Problem Title",
-            "description": "Problem description with examples...",
-            "starter_code": "def solution():\\n    pass" 
-        }}
+    def generate_coding_problem(self, language, topic, difficulty, user_id=None):
         """
-        
+        Serves a problem this user has not seen yet from the problem pool.
+        The LLM is only called synchronously when the pool for this
+        language/topic/difficulty is still empty; the result seeds the pool.
+        A generated problem the pool turns down (too few of its tests hold
+        up) is not served. Hidden tests are stripped; review_code() looks
+        them up by "id".
+        """
+        if problem_pool:
+            # An empty pool is seeded below, not by a background generation too
+            problem = problem_pool.sample(language, topic, difficulty, user_id, grow_if_empty=False)
+            if problem:
+                return public_view(problem)
+
         try:
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response_text = self._call_llm(messages, temperature=0.7, json_mode=True)
-            if response_text:
-                result = self._clean_and_parse_json(response_text)
-                if result: return result
+            problem = self.generate_pool_problem(language, topic, difficulty, call_type="coding_problem")
+            if problem and problem_pool:
+                # A concurrent growth step may have pooled the same problem first
+                problem = (problem_pool.add(language, topic, difficulty, problem)
+                           or problem_pool.sample(language, topic, difficulty, user_id, grow_if_empty=False))
+            elif problem:
+                problem["id"] = make_problem_id(problem)
+            if problem:
+                return public_view(problem)
         except Exception as e:
             print(f"Coding Problem Error: {e}")
-            
+
         return {
             "title": "Error Generation",
             "description": "Could not generate problem.",
             "starter_code": ""
         }
 
-    def review_code(self, code, problem_description, language):
+    def generate_pool_problem(self, language, topic, difficulty, existing_titles=(), call_type="problem_pool"):
+        """One new problem, avoiding `existing_titles`; used to grow the problem pool."""
+        avoid = "\n".join(f"- {t}" for t in list(existing_titles)[-30:])
+        prompt = f"""
+        Generate a {difficulty} coding problem for {language} related to {topic}.
+        {"It must be different from these existing problems:" if avoid else ""}
+        {avoid}
+        
+        Include 5 to 8 hidden test cases covering normal and edge cases. Each
+        test's "input" is the list of positional arguments to the function and
+        "expected" is its return value, both as plain JSON values. Also include
+        a correct reference solution; tests it does not pass are discarded.
+        
+        Return JSON:
+        {{
+            "title": "Problem Title",
+            "description": "Problem description with examples...",
+            "starter_code": "def solution():\\n    pass",
+            "function_name": "solution",
+            "reference_solution": "def solution(nums, target):\\n    ...",
+            "tests": [{{"input": [[1, 2, 3], 4], "expected": [0, 2]}}]
+        }}
+        """
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        temperature = 0.9 if call_type == "problem_pool" else 0.7
+        response_text = self._call_llm(messages, temperature=temperature, json_mode=True, call_type=call_type)
+        if not response_text:
+            raise RuntimeError("no response from any provider")
+        return self._clean_and_parse_json(response_text, "coding_problem")
+
+    def review_code(self, code, problem_description, language, problem_id=None):
+        """
+        Python submissions to pooled problems are run against the problem's
+        hidden tests in the local sandbox, which gives the verdict right
+        away; style feedback from the LLM follows in the background (see
+        style_review()). Anything else is reviewed by the LLM as before.
+        """
+        problem = problem_pool.get(problem_id) if problem_pool and problem_id else None
+        if code_sandbox and problem and problem.get("tests") and code_sandbox.supports(language):
+            tests = code_sandbox.run(code, problem["tests"], problem.get("function_name"))
+            # Busy or unjailable sandboxes fall back to the LLM review below
+            if tests["status"] not in ("busy", "unavailable"):
+                review = self._test_verdict(tests)
+                review["style_review_id"] = self._start_style_review(code, problem_description, language, tests)
+                review["style_status"] = "pending"
+                return review
+
         prompt = f"""
         Review this {language} code for the following problem:
         
@@ -405,9 +740,9 @@ class AIEngine:
                 {"role": "user", "content": prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.2, json_mode=True)
+            response_text = self._call_llm(messages, temperature=0.2, json_mode=True, call_type="review_code")
             if response_text:
-                result = self._clean_and_parse_json(response_text)
+                result = self._clean_and_parse_json(response_text, "review_code")
                 if result: return result
         except Exception as e:
             print(f"Code Review Error: {e}")
@@ -419,19 +754,135 @@ class AIEngine:
             "optimization_tips": []
         }
 
-    def analyze_interview(self, conversation, behavioral_alerts, job_role, difficulty, user_name):
-        dialogue = ""
+    def _test_verdict(self, tests):
+        status = tests["status"]
+        if status == "ok":
+            if tests["all_passed"]:
+                feedback = f"All {tests['total']} hidden tests passed in {tests['duration_ms']:.0f} ms."
+            else:
+                feedback = f"{tests['passed']} of {tests['total']} hidden tests passed."
+        elif status == "compile_error":
+            feedback = f"Your code could not be run: {tests.get('error')}"
+        else:
+            feedback = f"{tests.get('error')}. Look for infinite loops or a more efficient approach."
+
+        bugs = [
+            f"Hidden test {i + 1}: {result.get('error', 'failed')}"
+            for i, result in enumerate(tests["results"]) if not result.get("passed")
+        ]
+        return {
+            "is_correct": tests["all_passed"],
+            "feedback": feedback,
+            "bugs": bugs,
+            "optimization_tips": [],
+            "tests": tests
+        }
+
+    def _start_style_review(self, code, problem_description, language, tests):
+        review_id = uuid.uuid4().hex
+        with self._lock:
+            self._style_reviews[review_id] = {"status": "pending"}
+            while len(self._style_reviews) > STYLE_REVIEWS_KEPT:
+                self._style_reviews.popitem(last=False)
+
+        def run():
+            try:
+                result = {"status": "done", **self.review_style(code, problem_description, language, tests)}
+            except Exception as e:
+                print(f"Style Review Error: {e}")
+                result = {"status": "failed"}
+            with self._lock:
+                if review_id in self._style_reviews:
+                    self._style_reviews[review_id] = result
+
+        threading.Thread(target=run, name="style-review", daemon=True).start()
+        return review_id
+
+    def style_review(self, review_id):
+        """{"status": "pending" | "done" | "failed", ...}, or None for an unknown id."""
+        with self._lock:
+            result = self._style_reviews.get(review_id)
+            return dict(result) if result else None
+
+    def review_style(self, code, problem_description, language, tests=None):
+        """Qualitative feedback only; correctness comes from the sandbox."""
+        checked = f"It passed {tests['passed']} of {tests['total']} hidden tests." if tests else ""
+        prompt = f"""
+        Review this {language} code for style, readability and efficiency only.
+        Its correctness has already been checked against test cases. {checked}
+        
+        Problem: {problem_description}
+        
+        Code:
+        {code}
+        
+        Return JSON:
+        {{
+            "feedback": "Feedback on style and readability...",
+            "optimization_tips": ["tip 1", "tip 2"]
+        }}
+        """
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        response_text = self._call_llm(messages, temperature=0.2, json_mode=True, call_type="review_style")
+        result = self._clean_and_parse_json(response_text, "review_style") if response_text else None
+        if not result:
+            raise RuntimeError("no usable style review")
+        return {"feedback": result["feedback"], "optimization_tips": result["optimization_tips"]}
+
+    def build_transcript(self, conversation, user_name):
+        return "".join(line for line, _ in self._transcript_turns(conversation, user_name))
+
+    def build_transcript_segments(self, conversation, user_name, max_chars=INTERVIEW_SEGMENT_CHARS):
+        """
+        Splits the transcript into segments of about max_chars. Cuts are made
+        before an interviewer turn where possible, so a question stays with
+        its answer; a single longer turn becomes a segment of its own.
+        """
+        segments = []
+        current = []
+        size = 0
+        for line, is_interviewer in self._transcript_turns(conversation, user_name):
+            if current and size + len(line) > max_chars:
+                # Move a trailing interviewer question over to the next segment
+                carry = [current.pop()] if len(current) > 1 and current[-1][1] and not is_interviewer else []
+                segments.append("".join(text for text, _ in current))
+                current, size = carry, sum(len(text) for text, _ in carry)
+            current.append((line, is_interviewer))
+            size += len(line)
+        if current:
+            segments.append("".join(text for text, _ in current))
+        return segments
+
+    def _transcript_turns(self, conversation, user_name):
+        """(line, is_interviewer) per non-system message."""
         for msg in conversation:
             role = msg.get("role", "unknown")
             if role == "system": continue
             speaker = "Interviewer" if role == "assistant" else user_name
-            dialogue += f"{speaker}: {msg.get('content', '')}\n"
+            yield f"{speaker}: {msg.get('content', '')}\n", role == "assistant"
+
+    def analyze_interview(self, conversation, behavioral_alerts, job_role, difficulty, user_name):
+        """
+        Short transcripts are assessed in one prompt. Longer ones are split
+        into segments that are scored concurrently (map), and a compact
+        prompt over the segment scores and notes produces the final
+        assessment (reduce), so prompt size stays bounded however long the
+        interview ran.
+        """
+        segments = self.build_transcript_segments(conversation, user_name)
             
         alerts_text = ""
         if behavioral_alerts:
-            alerts_text = "Behavioral Alerts Detected During Interview:\n"
-            for alert in behavioral_alerts:
-                alerts_text += f"- {alert.get('message', 'Unknown alert')}\n"
+            alerts_text = "Behavioral Alerts Detected During Interview:\n" + "".join(
+                f"- {alert.get('message', 'Unknown alert')}\n" for alert in behavioral_alerts
+            )
+
+        if len(segments) > 1:
+            return self._analyze_segmented(segments, alerts_text, job_role, difficulty, user_name)
+        dialogue = segments[0] if segments else ""
         
         prompt = f"""
         You are an expert Interview Assessor analyzing a {difficulty} level {job_role} interview for a candidate named {user_name}.
@@ -463,14 +914,109 @@ class AIEngine:
                 {"role": "user", "content": prompt}
             ]
             
-            response_text = self._call_llm(messages, temperature=0.3, json_mode=True)
+            response_text = self._call_llm(messages, temperature=0.3, json_mode=True, call_type="interview_analysis")
             if response_text:
-                result = self._clean_and_parse_json(response_text)
+                result = self._clean_and_parse_json(response_text, "interview_analysis")
                 if result: return result
                 
         except Exception as e:
             print(f"Interview Analysis Error: {e}")
             
+        return self._analysis_error()
+
+    def _analyze_segmented(self, segments, alerts_text, job_role, difficulty, user_name):
+        def score(indexed):
+            index, segment = indexed
+            return self._score_segment(segment, index + 1, len(segments), job_role, difficulty, user_name)
+
+        scored = map_bounded(
+            score,
+            enumerate(segments),
+            max_workers=INTERVIEW_SEGMENT_CONCURRENCY,
+            timeout=INTERVIEW_SEGMENT_TIMEOUT,
+            label="Interview segment"
+        )
+        scored = [(i + 1, len(segments[i]), result) for i, result in enumerate(scored) if result]
+        if not scored:
+            return self._analysis_error()
+
+        # One compact line per segment; weights let the reducer favour longer parts
+        total_chars = sum(chars for _, chars, _ in scored)
+        summaries = "\n".join(
+            f"- Segment {number} (weight {chars / total_chars:.2f}): "
+            f"communication {result['communication_score']}, technical {result['technical_score']}, "
+            f"confidence {result['confidence_score']}. Notes: {result['notes']} "
+            f"Strengths: {'; '.join(map(str, result['strengths'][:3]))}. "
+            f"Weaknesses: {'; '.join(map(str, result['weaknesses'][:3]))}."
+            for number, chars, result in scored
+        )
+
+        prompt = f"""
+        You are an expert Interview Assessor analyzing a {difficulty} level {job_role} interview for a candidate named {user_name}.
+        
+        The transcript was too long to read in one pass, so each segment was scored separately (0-100):
+        {summaries}
+        
+        {alerts_text}
+        
+        Combine the segment scores and any behavioral alerts into one evaluation of the candidate's performance.
+        Return ONLY a JSON object with the following structure:
+        {{
+            "overall_score": <number 0-100>,
+            "communication_score": <number 0-100>,
+            "technical_score": <number 0-100>,
+            "confidence_score": <number 0-100>,
+            "body_language_score": <number 0-100>,
+            "verdict": "<short string like 'STRONG HIRE', 'READY', 'NEEDS PRACTICE'>",
+            "detailed_feedback": "<paragraph of detailed feedback>",
+            "strengths": ["strength 1", "strength 2", ...],
+            "areas_for_improvement": ["area 1", "area 2", ...],
+            "recommendations": ["rec 1", "rec 2", ...]
+        }}
+        """
+
+        try:
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            response_text = self._call_llm(messages, temperature=0.3, json_mode=True, call_type="interview_analysis")
+            if response_text:
+                result = self._clean_and_parse_json(response_text, "interview_analysis")
+                if result: return result
+        except Exception as e:
+            print(f"Interview Analysis Error: {e}")
+
+        return self._analysis_error()
+
+    def _score_segment(self, segment, number, count, job_role, difficulty, user_name):
+        prompt = f"""
+        Score this interview segment ({number} of {count}) from a {difficulty} level {job_role} interview with {user_name}.
+        Judge only what happens in this segment.
+        
+        Transcript Segment:
+        {segment}
+        
+        Return ONLY a JSON object:
+        {{
+            "communication_score": <number 0-100>,
+            "technical_score": <number 0-100>,
+            "confidence_score": <number 0-100>,
+            "notes": "<one or two sentences on how the candidate did>",
+            "strengths": ["strength 1", ...],
+            "weaknesses": ["weakness 1", ...]
+        }}
+        """
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        response_text = self._call_llm(messages, temperature=0.3, json_mode=True, call_type="interview_segment")
+        if not response_text:
+            return None
+        return self._clean_and_parse_json(response_text, "interview_segment")
+
+    def _analysis_error(self):
         return {
             "overall_score": 0,
             "communication_score": 0,
@@ -484,17 +1030,55 @@ class AIEngine:
             "recommendations": []
         }
 
-    def _clean_and_parse_json(self, text):
-        try:
-            cleaned = text.strip()
-            if cleaned.startswith("```"):
-                lines = cleaned.splitlines()
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                if lines[-1].startswith("```"):
-                    lines = lines[:-1]
-                cleaned = "\n".join(lines)
-            return json.loads(cleaned)
-        except Exception as e:
-            print(f"JSON Parsing Error: {e} | Text: {text}")
-            return None
+    def _is_valid_json(self, text, call_type=None):
+        # Repaired truncations are usable once but never cached
+        result = extract_json(text, SCHEMAS.get(call_type))
+        return result.ok and not result.truncated
+
+    def _clean_and_parse_json(self, text, call_type=None):
+        """
+        Extracts the JSON value from a model response, repairing it where
+        needed and checking it against the call type's schema. Returns None
+        if nothing usable could be recovered.
+        """
+        result = self._extract_json(text, call_type)
+        return result.value if result.ok else None
+
+    def _extract_json(self, text, call_type=None):
+        result = extract_json(text, SCHEMAS.get(call_type))
+        for repair in result.repairs:
+            metrics.inc("llm_json_repairs_total", call_type=call_type or "default", repair=repair.split(":")[0])
+        if not result.ok:
+            metrics.inc("llm_json_failures_total", call_type=call_type or "default")
+            print(f"JSON Parsing Error ({call_type}): {result.error} | Text: {text}")
+        elif any(repair != "code_fence" for repair in result.repairs):
+            print(f"DEBUG: Repaired {call_type} JSON: {', '.join(result.repairs)}")
+        return result
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Returns the process-wide AIEngine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AIEngine()
+                if question_bank and question_bank.generator is None:
+                    question_bank.generator = _engine.generate_bank_questions
+                if problem_pool and problem_pool.generator is None:
+                    problem_pool.generator = _engine.generate_pool_problem
+    return _engine
+
+
+def rotate_api_keys():
+    """Reloads .env / environment and rotates the shared engine's keys."""
+    load_dotenv(override=True)
+    get_engine().rotate_keys(
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        gemini_api_key=os.getenv("GEMINI_API_KEY")
+    )
+    print("AI engine API keys reloaded")
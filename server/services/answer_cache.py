@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.85))  # estimated Jaccard similarity
+ANSWER_CACHE_MIN_WORDS = int(os.getenv("ANSWER_CACHE_MIN_WORDS", 8))
+ANSWER_CACHE_MAX_QUESTIONS = int(os.getenv("ANSWER_CACHE_MAX_QUESTIONS", 500))
+ANSWER_CACHE_MAX_PER_QUESTION = int(os.getenv("ANSWER_CACHE_MAX_PER_QUESTION", 50))
+ANSWER_CACHE_MAX_AGE = int(os.getenv("ANSWER_CACHE_MAX_AGE", 6 * 3600))
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: near-certain recall at 0.85 similarity
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _permutations(count, seed=1):
+    # Fixed pseudo-random (a, b) pairs so signatures are stable across restarts
+    params = []
+    for i in range(count):
+        digest = hashlib.sha256(f"minhash-{seed}-{i}".encode()).digest()
+        a, b = struct.unpack("<QQ", digest[:16])
+        params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return params
+
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+def normalize(text):
+    return _NON_WORD.sub(" ", (text or "").lower()).split()
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") for g in grams}
+
+
+def minhash(shingle_hashes):
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / len(signature_a)
+
+
+class _QuestionIndex:
+    def __init__(self):
+        self.entries = OrderedDict()  # entry id -> (signature, result, stored_at)
+        self.bands = [{} for _ in range(LSH_BANDS)]  # band -> {band key: set of entry ids}
+
+    @staticmethod
+    def band_keys(signature):
+        return [signature[i * LSH_ROWS:(i + 1) * LSH_ROWS] for i in range(LSH_BANDS)]
+
+    def candidates(self, signature):
+        found = set()
+        for band, key in zip(self.bands, self.band_keys(signature)):
+            found |= band.get(key, set())
+        return found
+
+    def add(self, entry_id, signature, result, now):
+        self.entries[entry_id] = (signature, result, now)
+        for band, key in zip(self.bands, self.band_keys(signature)):
+            band.setdefault(key, set()).add(entry_id)
+
+    def remove(self, entry_id):
+        signature, _, _ = self.entries.pop(entry_id)
+        for band, key in zip(self.bands, self.band_keys(signature)):
+            ids = band.get(key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del band[key]
+
+
+class AnswerCache:
+    """
+    Reuses answer evaluations for near-duplicate answers to the same
+    question.
+
+    Answers are normalized, split into word 3-gram shingles and summarised
+    as MinHash signatures. Each (question, job role) has its own LSH index,
+    so a lookup only compares against answers that share at least one band,
+    and an evaluation is reused when the estimated Jaccard similarity is at
+    or above `threshold`. Memory is bounded by an LRU over questions, an LRU
+    over answers per question, and a maximum age.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, min_words=ANSWER_CACHE_MIN_WORDS,
+                 max_questions=ANSWER_CACHE_MAX_QUESTIONS, max_per_question=ANSWER_CACHE_MAX_PER_QUESTION,
+                 max_age=ANSWER_CACHE_MAX_AGE):
+        self.threshold = threshold
+        self.min_words = min_words
+        self.max_questions = max_questions
+        self.max_per_question = max_per_question
+        self.max_age = max_age
+        self._indexes = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "skipped_short": 0, "stores": 0, "evictions": 0}
+
+    def lookup(self, question, answer, job_role=""):
+        """Returns a copy of a stored evaluation for a near-identical answer, or None."""
+        signature = self._signature(answer)
+        with self._lock:
+            self._stats["lookups"] += 1
+            if signature is None:
+                self._stats["skipped_short"] += 1
+                return None
+
+            key = self._question_key(question, job_role)
+            index = self._indexes.get(key)
+            best, best_id = 0.0, None
+            if index is not None:
+                self._indexes.move_to_end(key)
+                now = time.time()
+                for entry_id in index.candidates(signature):
+                    stored_signature, _, stored_at = index.entries[entry_id]
+                    if now - stored_at > self.max_age:
+                        index.remove(entry_id)
+                        self._stats["evictions"] += 1
+                        continue
+                    score = similarity(signature, stored_signature)
+                    if score > best:
+                        best, best_id = score, entry_id
+
+            if best_id is None or best < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            index.entries.move_to_end(best_id)
+            self._stats["hits"] += 1
+            return dict(index.entries[best_id][1])
+
+    def store(self, question, answer, job_role, result, truncated=False):
+        # An evaluation repaired from a cut-off response is not reused
+        if truncated:
+            return
+        signature = self._signature(answer)
+        if signature is None:
+            return
+        with self._lock:
+            key = self._question_key(question, job_role)
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = _QuestionIndex()
+            self._indexes.move_to_end(key)
+
+            self._next_id += 1
+            index.add(self._next_id, signature, dict(result), time.time())
+            self._stats["stores"] += 1
+
+            while len(index.entries) > self.max_per_question:
+                index.remove(next(iter(index.entries)))
+                self._stats["evictions"] += 1
+            while len(self._indexes) > self.max_questions:
+                _, dropped = self._indexes.popitem(last=False)
+                self._stats["evictions"] += len(dropped.entries)
+
+    def stats(self):
+        with self._lock:
+            answered = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / answered, 3) if answered else 0.0,
+                "questions": len(self._indexes),
+                "answers": sum(len(index.entries) for index in self._indexes.values()),
+                "threshold": self.threshold
+            }
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def _signature(self, answer):
+        words = normalize(answer)
+        if len(words) < self.min_words:
+            return None
+        return minhash(shingles(words))
+
+    def _question_key(self, question, job_role):
+        text = " ".join(normalize(question)) + "\0" + " ".join(normalize(job_role))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+
+answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
@@ -1,9 +1,150 @@
-def extract_text_from_json(ocr_json):
-    return " ".join(page["text"] for page in ocr_json["pages"])
-
-def chunk_text(text, chunk_size=400):
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size):
-        chunks.append(" ".join(words[i:i+chunk_size]))
-    return chunks
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", 1500))  # approximate tokens of resume text per chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 0))  # tail of the previous chunk repeated at the start
+CHARS_PER_TOKEN = 4
+
+SECTION_KEYWORDS = (
+    "experience", "employment", "work history", "education", "skills", "projects",
+    "certifications", "certificates", "summary", "profile", "objective", "achievements",
+    "awards", "publications", "languages", "interests", "volunteering", "activities",
+    "internships", "courses", "training", "references"
+)
+
+# A short line made of a section keyword plus at most two words either side
+# ("WORK EXPERIENCE", "Technical Skills:", "Projects & Research")
+_HEADING = re.compile(
+    r"^[ \t]*(?=[^\n]{1,40}$)(?:[A-Za-z&/]+[ \t]+){0,2}(?:" + "|".join(SECTION_KEYWORDS) +
+    r")(?:[ \t]+[A-Za-z&/]+){0,2}[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+_LINE = re.compile(r"[^\n]*\n?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def extract_text_from_json(ocr_json):
+    return " ".join(page["text"] for page in ocr_json["pages"])
+
+
+def chunk_text(text, token_budget=CHUNK_TOKEN_BUDGET, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    return [text[start:end] for start, end in iter_chunk_spans(text, token_budget, overlap_tokens)]
+
+
+def iter_chunks(pages, token_budget=CHUNK_TOKEN_BUDGET, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Streaming form of chunk_text() over OCR pages, so chunking keeps pace
+    with the parser. After each page, the chunks that can no longer change
+    are yielded: those ending before the last section on the page (which
+    may continue on the next one), less the chunk just before it, which
+    that section's lines could still top up.
+    """
+    parts = []
+    emitted = 0
+    spans = []
+    for page in pages:
+        parts.append(page["text"])
+        text = "\n".join(parts)
+        spans = list(iter_chunk_spans(text, token_budget, overlap_tokens))
+        open_from = _last_section_start(text)
+        final = [span for span in spans if span[1] <= open_from][:-1]
+        for start, end in final[emitted:]:
+            yield text[start:end]
+        emitted = max(emitted, len(final))
+    if parts:
+        text = "\n".join(parts)
+        for start, end in spans[emitted:]:
+            yield text[start:end]
+
+
+def iter_chunk_spans(text, token_budget=CHUNK_TOKEN_BUDGET, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Yields (start, end) offsets of resume chunks. Sections (split on
+    headings such as Experience or Skills) are packed greedily until the
+    next one would take the chunk over token_budget; a section that is too
+    big on its own is packed line by line (or word by word). With
+    overlap_tokens, each chunk starts that far back into the previous one.
+    """
+    budget = max(1, token_budget) * CHARS_PER_TOKEN
+    overlap = max(0, overlap_tokens) * CHARS_PER_TOKEN
+    chunk_start = chunk_end = previous_start = None
+
+    for start, end in _iter_pieces(text, budget):
+        if chunk_start is not None and end - chunk_start > budget:
+            yield _overlap_start(text, chunk_start, previous_start, overlap), chunk_end
+            previous_start, chunk_start = chunk_start, start
+        elif chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+
+    if chunk_start is not None:
+        yield _overlap_start(text, chunk_start, previous_start, overlap), chunk_end
+
+
+def _last_section_start(text):
+    start = 0
+    for match in _HEADING.finditer(text):
+        start = match.start()
+    return start
+
+
+def _iter_sections(text):
+    boundaries = [0, *(m.start() for m in _HEADING.finditer(text)), len(text)]
+    for start, end in zip(boundaries, boundaries[1:]):
+        span = _trim(text, start, end)
+        if span:
+            yield span
+
+
+def _iter_pieces(text, budget):
+    """
+    Sections no larger than budget, whole. Bigger ones come back line by
+    line so their lines can fill the room left in the current chunk.
+    """
+    for start, end in _iter_sections(text):
+        if end - start <= budget:
+            yield start, end
+            continue
+        for line in _LINE.finditer(text, start, end):
+            span = _trim(text, line.start(), line.end())
+            if not span:
+                continue
+            if span[1] - span[0] > budget:
+                # One very long line (OCR output often has no newlines)
+                yield from _split_words(text, *span, budget)
+            else:
+                yield span
+
+
+def _split_words(text, start, end, budget):
+    while end - start > budget:
+        cut = text.rfind(" ", start + 1, start + budget)
+        if cut <= start:
+            cut = start + budget
+        span = _trim(text, start, cut)
+        if span:
+            yield span
+        start = cut
+    span = _trim(text, start, end)
+    if span:
+        yield span
+
+
+def _trim(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def _overlap_start(text, chunk_start, previous_start, overlap):
+    if not overlap or previous_start is None:
+        return chunk_start
+    start = max(previous_start, chunk_start - overlap)
+    # Begin the repeated text on a word boundary
+    space = _WHITESPACE.search(text, start, chunk_start) if start > previous_start else None
+    return space.end() if space else start
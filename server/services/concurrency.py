@@ -0,0 +1,64 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def map_bounded(fn, items, max_workers=4, timeout=None, label="task"):
+    """
+    Runs fn(item) for every item on a bounded thread pool.
+
+    Results come back in the same order as items. An item whose call raises,
+    or that runs longer than `timeout` seconds once started, is dropped and
+    its slot is None. Returns as soon as every item has finished or been
+    dropped; calls that overran keep running in the background and their
+    results are discarded.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    started = {}
+
+    def run(index, item):
+        started[index] = time.monotonic()
+        return fn(item)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    try:
+        # Each call runs in a copy of the caller's context (request metrics etc.)
+        futures = {
+            executor.submit(contextvars.copy_context().run, run, i, item): i
+            for i, item in enumerate(items)
+        }
+        pending = set(futures)
+
+        while pending:
+            wait_for = None
+            if timeout is not None:
+                now = time.monotonic()
+                expiries = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+                wait_for = max(0.0, min(expiries) - now) if expiries else timeout
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"{label} {index + 1} failed: {e}")
+
+            if timeout is not None:
+                now = time.monotonic()
+                expired = {
+                    f for f in pending
+                    if futures[f] in started and now - started[futures[f]] >= timeout
+                }
+                for future in expired:
+                    print(f"{label} {futures[future] + 1} timed out after {timeout}s, dropping")
+                pending -= expired
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
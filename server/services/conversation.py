@@ -0,0 +1,159 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", 8))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", 4))
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", 6000))
+CHAT_CONTEXT_MAX_CONVERSATIONS = int(os.getenv("CHAT_CONTEXT_MAX_CONVERSATIONS", 500))
+CHAT_CONTEXT_MAX_AGE = int(os.getenv("CHAT_CONTEXT_MAX_AGE", 2 * 3600))
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text or "") // 4 + 1
+
+
+def _message_tokens(messages):
+    return sum(estimate_tokens(m.get("content")) + 4 for m in messages)
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ConversationContext:
+    """
+    Keeps chat prompts bounded as an interview grows.
+
+    The leading system prompt and the most recent turns are sent verbatim.
+    Older turns are folded into a rolling summary, which is extended with
+    each batch of newly aged-out turns instead of being rebuilt from the
+    whole history. The final prompt is then trimmed to a token budget.
+
+    Clients send the full history on every turn, so the summary state is
+    kept server-side per conversation, keyed by the `conversation_id` the
+    chat routes hand out. Without one there is nothing safe to key on (every
+    chat opens with the same turns), so only the budget trim applies.
+    """
+
+    def __init__(self, recent_turns=CHAT_RECENT_TURNS, summary_batch=CHAT_SUMMARY_BATCH,
+                 token_budget=CHAT_TOKEN_BUDGET, max_conversations=CHAT_CONTEXT_MAX_CONVERSATIONS,
+                 max_age=CHAT_CONTEXT_MAX_AGE):
+        self.recent_turns = recent_turns
+        self.summary_batch = summary_batch
+        self.token_budget = token_budget
+        self.max_conversations = max_conversations
+        self.max_age = max_age
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, messages, summarize, conversation_id=None):
+        """
+        Returns the messages to send for this turn. `summarize` is called as
+        summarize(previous_summary, new_messages) and returns the updated
+        summary text, or None if it failed.
+        """
+        pinned = messages[:1] if messages and messages[0].get("role") == "system" else []
+        turns = messages[len(pinned):]
+
+        if len(turns) <= self.recent_turns:
+            return self._fit_budget(pinned, None, turns)
+
+        if not conversation_id:
+            return self._fit_budget(pinned, None, turns)
+
+        state = self._state_for(conversation_id)
+        fold_upto = len(turns) - self.recent_turns
+
+        with state["lock"]:
+            # History was edited or replaced; start the summary over
+            if state["folded"] > len(turns) or state["anchor"] != self._anchor(turns, state["folded"]):
+                state["folded"] = 0
+                state["summary"] = None
+                state["anchor"] = None
+                state["version"] += 1
+
+            summary, folded, version = state["summary"], state["folded"], state["version"]
+            pending = turns[folded:fold_upto]
+            # One summarization per conversation at a time; other turns go
+            # ahead with the current summary and a few more verbatim turns
+            if len(pending) < self.summary_batch or state["summarizing"]:
+                return self._fit_budget(pinned, summary, turns[folded:])
+            state["summarizing"] = True
+
+        # The LLM call runs without the lock, so other turns never queue behind it
+        new_summary = None
+        try:
+            new_summary = summarize(summary, pending)
+        finally:
+            with state["lock"]:
+                state["summarizing"] = False
+                # Compare-and-set: only apply if nothing reset the state meanwhile
+                if new_summary and state["version"] == version:
+                    state["summary"] = summary = new_summary.strip()
+                    state["folded"] = folded = fold_upto
+                    state["anchor"] = self._anchor(turns, fold_upto)
+                    state["version"] += 1
+
+        return self._fit_budget(pinned, summary, turns[folded:])
+
+    def stats(self):
+        with self._lock:
+            return {"conversations": len(self._states)}
+
+    def _fit_budget(self, pinned, summary, recent):
+        summary_messages = []
+        if summary:
+            # Never let the summary take more than half of the budget
+            max_chars = self.token_budget * 2
+            summary_messages = [{
+                "role": "system",
+                "content": f"Summary of the earlier interview conversation:\n{summary[:max_chars]}"
+            }]
+
+        recent = list(recent)
+        # Drop the oldest verbatim turns until we fit, keeping the latest turn
+        while len(recent) > 1 and _message_tokens(pinned + summary_messages + recent) > self.token_budget:
+            recent.pop(0)
+
+        return pinned + summary_messages + recent
+
+    def _state_for(self, key):
+        now = time.time()
+        with self._lock:
+            for stale in [k for k, s in self._states.items() if now - s["last_used"] > self.max_age]:
+                del self._states[stale]
+
+            state = self._states.get(key)
+            if state is None:
+                state = {
+                    "lock": threading.Lock(), "folded": 0, "summary": None, "anchor": None,
+                    "version": 0, "summarizing": False
+                }
+                self._states[key] = state
+            state["last_used"] = now
+            self._states.move_to_end(key)
+
+            while len(self._states) > self.max_conversations:
+                self._states.popitem(last=False)
+            return state
+
+    def _anchor(self, turns, folded):
+        # Identifies the last folded turn so edited histories are detected
+        if folded == 0:
+            return None
+        last = turns[folded - 1]
+        return _digest(last.get("role"), last.get("content"))
+
+
+conversation_context = ConversationContext()
@@ -4,6 +4,8 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 
+from services.metrics import metrics
+
 load_dotenv()
 
 class Database:
@@ -84,6 +86,7 @@ class Database:
         finally:
             self.disconnect()
     
+    @metrics.timed("db", op="save_user")
     def save_user(self, user_id, email, name):
         if not self.connect():
             return False
@@ -104,6 +107,7 @@ class Database:
         finally:
             self.disconnect()
     
+    @metrics.timed("db", op="save_session")
     def save_session(self, user_id, job_role, category, difficulty, avg_score, qualified, questions, answers, scores, feedback_list, ideal_answers_list):
         if not self.connect():
             return None
@@ -138,6 +142,7 @@ class Database:
         finally:
             self.disconnect()
     
+    @metrics.timed("db", op="get_user_sessions")
     def get_user_sessions(self, user_id, limit=10):
         if not self.connect():
             return []
@@ -160,6 +165,7 @@ class Database:
         finally:
             self.disconnect()
     
+    @metrics.timed("db", op="get_session_details")
     def get_session_details(self, session_id):
         if not self.connect():
             return None
@@ -195,6 +201,7 @@ class Database:
         finally:
             self.disconnect()
     
+    @metrics.timed("db", op="get_user_analytics")
     def get_user_analytics(self, user_id):
         if not self.connect():
             return None
@@ -0,0 +1,148 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+
+from services.metrics import metrics
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", 100))  # queued jobs before submissions are refused
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))  # seconds a finished job stays retrievable
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Background jobs for long-running requests.
+
+    submit() returns a job id straight away; a fixed pool of worker threads
+    runs jobs first-in first-out and get() reports their status and, once
+    finished, their result or error. Finished jobs are kept for `result_ttl`
+    seconds. Submissions with the same `key` while an earlier one is queued,
+    running or still retained share that job, so a retried request doesn't
+    run the work twice.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_MAX, result_ttl=JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._jobs = OrderedDict()  # job id -> job, in submission order
+        self._keys = {}  # dedup key -> job id
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    def submit(self, kind, fn, *args, key=None, **kwargs):
+        """Queues fn(*args, **kwargs) and returns its job id. Raises QueueFull when the backlog is full."""
+        with self._cond:
+            self._expire()
+            if key is not None and key in self._keys:
+                self._stats["deduplicated"] += 1
+                return self._keys[key]
+            if len(self._queue) >= self.max_queued:
+                self._stats["rejected"] += 1
+                raise QueueFull(f"{len(self._queue)} jobs already queued")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "key": key,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "call": (fn, args, kwargs)
+            }
+            if key is not None:
+                self._keys[key] = job_id
+            self._queue.append(job_id)
+            self._stats["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+            return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job, with "position" while queued, or None if unknown or expired."""
+        with self._cond:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {k: v for k, v in job.items() if k not in ("call", "key")}
+            if job["status"] == "queued":
+                snapshot["position"] = self._queue.index(job_id) + 1
+            return snapshot
+
+    def stats(self):
+        with self._cond:
+            statuses = [job["status"] for job in self._jobs.values()]
+            return {
+                **self._stats,
+                "queued": len(self._queue),
+                "running": statuses.count("running"),
+                "retained": len(self._jobs),
+                "workers": self.workers
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    # Callers must hold self._cond
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"job-worker-{len(self._threads) + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job["key"] is not None and self._keys.get(job["key"]) == job_id:
+                del self._keys[job["key"]]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._jobs[self._queue.popleft()]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                fn, args, kwargs = job.pop("call")
+            metrics.observe("job_queue_wait_seconds", job["started_at"] - job["submitted_at"], kind=job["kind"])
+
+            try:
+                with metrics.span("job", kind=job["kind"]):
+                    result = fn(*args, **kwargs)
+                status, error = "done", None
+            except Exception as e:
+                print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+                result, status, error = None, "failed", str(e)
+
+            with self._cond:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                # A failed job should not be handed to later identical submissions
+                if status == "failed" and job["key"] is not None and self._keys.get(job["key"]) == job["id"]:
+                    del self._keys[job["key"]]
+                self._stats[status] += 1
+
+
+job_queue = JobQueue()
@@ -0,0 +1,406 @@
+import json
+
+NUMBER = (int, float)
+REQUIRED = object()
+
+# Per call type: field -> (accepted types, default). Fields with a default
+# are filled in when missing; REQUIRED fields make the result invalid.
+SCHEMAS = {
+    "chunk_analysis": {
+        "strengths": (list, []),
+        "weaknesses": (list, []),
+        "skills_detected": (list, [])
+    },
+    "resume_merge": {
+        "ats_score": (NUMBER, REQUIRED),
+        "summary": (str, REQUIRED),
+        "strengths": (list, []),
+        "weaknesses": (list, []),
+        "missing_skills": (list, []),
+        "suggested_roles": (list, [])
+    },
+    "evaluate_answer": {
+        "feedback": (str, REQUIRED),
+        "score": (NUMBER, REQUIRED),
+        "ideal_answer": (str, "N/A"),
+        "qualified": (bool, False)
+    },
+    "coding_problem": {
+        "title": (str, REQUIRED),
+        "description": (str, REQUIRED),
+        "starter_code": (str, ""),
+        "function_name": (str, ""),
+        "reference_solution": (str, ""),
+        "tests": (list, [])
+    },
+    "review_style": {
+        "feedback": (str, REQUIRED),
+        "optimization_tips": (list, [])
+    },
+    "review_code": {
+        "is_correct": (bool, False),
+        "feedback": (str, REQUIRED),
+        "bugs": (list, []),
+        "optimization_tips": (list, [])
+    },
+    "interview_segment": {
+        "communication_score": (NUMBER, REQUIRED),
+        "technical_score": (NUMBER, REQUIRED),
+        "confidence_score": (NUMBER, REQUIRED),
+        "notes": (str, ""),
+        "strengths": (list, []),
+        "weaknesses": (list, [])
+    },
+    "interview_analysis": {
+        "overall_score": (NUMBER, REQUIRED),
+        "communication_score": (NUMBER, 0),
+        "technical_score": (NUMBER, 0),
+        "confidence_score": (NUMBER, 0),
+        "body_language_score": (NUMBER, 0),
+        "verdict": (str, REQUIRED),
+        "detailed_feedback": (str, ""),
+        "strengths": (list, []),
+        "areas_for_improvement": (list, []),
+        "recommendations": (list, [])
+    }
+}
+
+# Call types whose result is a score; a response cut short there is treated as
+# a failed call so the next provider gets a chance to give a complete one
+SCORED_CALL_TYPES = {"evaluate_answer", "interview_segment", "interview_analysis", "resume_merge"}
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+JSON_LITERALS = {"true", "false", "null"}
+CLOSERS = {"{": "}", "[": "]"}
+# Candidate start positions tried when prose before the JSON contains braces
+MAX_START_ATTEMPTS = 3
+
+
+class ExtractResult:
+    def __init__(self, value=None, repairs=None, error=None):
+        self.value = value
+        self.repairs = repairs or []
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def truncated(self):
+        return "truncated" in self.repairs
+
+
+def extract_json(text, schema=None):
+    """
+    Pulls the first JSON value out of an LLM response.
+
+    Well-formed responses take the plain json.loads path. Otherwise the text
+    is scanned once from the first "{" or "[" to its balancing bracket,
+    repairing common defects on the way: code fences and surrounding prose,
+    single-quoted strings, Python literals, unquoted keys, comments,
+    trailing commas, raw newlines in strings and output cut off mid-value.
+    With a schema, fields are then type-checked and coerced, and missing
+    optional fields get their defaults. Every change made is listed in
+    ExtractResult.repairs.
+    """
+    if not text or not text.strip():
+        return ExtractResult(error="empty response")
+
+    # Cheap attempts first: as-is, without code fences, then the outermost
+    # bracket pair. Only if all of them fail is the text scanned and repaired.
+    stripped = text.strip()
+    for repair, candidate in (
+        (None, stripped),
+        ("code_fence", _strip_code_fences(stripped)),
+        ("surrounding_text", _outermost(stripped))
+    ):
+        if candidate is None or (repair and candidate == stripped):
+            continue
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        return _validate(value, schema, [repair] if repair else [])
+
+    error = "no JSON object or array found"
+    start = _next_start(text, 0)
+    for _ in range(MAX_START_ATTEMPTS):
+        if start < 0:
+            break
+        repaired, end, repairs = _scan(text, start)
+        if text[:start].strip() or text[end:].strip():
+            repairs.insert(0, "code_fence" if _only_fences(text[:start], text[end:]) else "surrounding_text")
+        try:
+            return _validate(json.loads(repaired), schema, repairs)
+        except ValueError as e:
+            error = f"unrepairable JSON: {e}"
+        start = _next_start(text, start + 1)
+
+    return ExtractResult(error=error)
+
+
+def _strip_code_fences(text):
+    if not text.startswith("```"):
+        return None
+    lines = text.splitlines()[1:]
+    if lines and lines[-1].strip().startswith("```"):
+        lines = lines[:-1]
+    return "\n".join(lines)
+
+
+def _outermost(text):
+    start = _next_start(text, 0)
+    if start < 0:
+        return None
+    end = text.rfind(CLOSERS[text[start]])
+    return text[start:end + 1] if end > start else None
+
+
+def _next_start(text, position):
+    starts = [i for i in (text.find("{", position), text.find("[", position)) if i >= 0]
+    return min(starts) if starts else -1
+
+
+def _only_fences(prefix, suffix):
+    prefix = prefix.strip()
+    suffix = suffix.strip()
+    return prefix.startswith("```") and "\n" not in prefix.strip("`").strip() and suffix in ("", "```")
+
+
+def _scan(text, start):
+    """
+    Single pass from `start` to the end of the first balanced value.
+    Returns (json_text, end_index, repairs).
+    """
+    out = []
+    repairs = []
+    stack = []
+    # For each open object: what comes next ("key", "colon", "value" or "comma")
+    expect = []
+    i = start
+    n = len(text)
+
+    def note(repair):
+        if repair not in repairs:
+            repairs.append(repair)
+
+    def value_done():
+        if stack and stack[-1] == "{":
+            expect[-1] = "comma"
+
+    while i < n:
+        ch = text[i]
+
+        if ch in "\"'":
+            if ch == "'":
+                note("single_quotes")
+            i, string, closed, fixed_controls = _read_string(text, i)
+            if fixed_controls:
+                note("control_characters")
+            out.append(string)
+            if stack and stack[-1] == "{" and expect[-1] == "key":
+                expect[-1] = "colon"
+            else:
+                value_done()
+            if not closed:
+                break
+            continue
+
+        if ch in "{[":
+            # The container is the parent's value, however it ends
+            value_done()
+            stack.append(ch)
+            expect.append("key" if ch == "{" else None)
+            out.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            if _drop_trailing_comma(out):
+                note("trailing_comma")
+            opener = stack.pop()
+            expect.pop()
+            if ch != CLOSERS[opener]:
+                note("mismatched_bracket")
+            out.append(CLOSERS[opener])
+            i += 1
+            if not stack:
+                return "".join(out), i, repairs
+            continue
+        elif ch == ",":
+            out.append(ch)
+            if stack and stack[-1] == "{":
+                expect[-1] = "key"
+        elif ch == ":":
+            out.append(ch)
+            if stack and stack[-1] == "{":
+                expect[-1] = "value"
+        elif ch == "/" and text.startswith("//", i):
+            note("comments")
+            newline = text.find("\n", i)
+            i = n if newline < 0 else newline
+            continue
+        elif ch == "/" and text.startswith("/*", i):
+            note("comments")
+            close = text.find("*/", i + 2)
+            i = n if close < 0 else close + 2
+            continue
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if stack and stack[-1] == "{" and expect[-1] == "key":
+                note("unquoted_keys")
+                out.append(json.dumps(word))
+                expect[-1] = "colon"
+            elif word in PYTHON_LITERALS:
+                note("python_literals")
+                out.append(PYTHON_LITERALS[word])
+                value_done()
+            elif j == n and any(lit.startswith(word) for lit in JSON_LITERALS | set(PYTHON_LITERALS)):
+                # Cut off inside a literal; the truncation repair fills in null
+                pass
+            else:
+                out.append(word)
+                value_done()
+            i = j
+            continue
+        elif ch in "-0123456789":
+            j = i
+            while j < n and text[j] in "+-0123456789.eE":
+                j += 1
+            if j == n and stack:
+                # Cut off inside a number: "1" may have been "10", so the
+                # value is dropped and the truncation repair fills in null
+                i = j
+                continue
+            out.append(text[i:j])
+            value_done()
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # Ran out of input before the value was closed
+    if stack:
+        note("truncated")
+        _drop_trailing_comma(out)
+        while stack:
+            opener = stack.pop()
+            state = expect.pop()
+            if state == "colon":
+                out.append(": null")
+            elif state == "value":
+                out.append(" null")
+            out.append(CLOSERS[opener])
+    return "".join(out), n, repairs
+
+
+def _read_string(text, i):
+    """
+    Reads a string literal starting at text[i] (either quote style) and
+    returns (next_index, json_string, closed, fixed_control_characters).
+    """
+    quote = text[i]
+    chars = ['"']
+    fixed = False
+    i += 1
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\" and i + 1 < n:
+            following = text[i + 1]
+            if quote == "'" and following == "'":
+                chars.append("'")
+            else:
+                chars.append(ch + following)
+            i += 2
+            continue
+        if ch == quote:
+            chars.append('"')
+            return i + 1, "".join(chars), True, fixed
+        if ch == '"':
+            chars.append('\\"')
+        elif ch in "\n\r\t":
+            chars.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch])
+            fixed = True
+        elif ord(ch) < 0x20:
+            chars.append(f"\\u{ord(ch):04x}")
+            fixed = True
+        else:
+            chars.append(ch)
+        i += 1
+    # A dangling backslash cannot end a string
+    if chars[-1].endswith("\\") and not chars[-1].endswith("\\\\"):
+        chars.pop()
+    chars.append('"')
+    return n, "".join(chars), False, fixed
+
+
+def _drop_trailing_comma(out):
+    index = len(out) - 1
+    while index >= 0 and not out[index].strip():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index]
+        return True
+    return False
+
+
+def _validate(value, schema, repairs):
+    if not schema:
+        return ExtractResult(value, repairs)
+    if not isinstance(value, dict):
+        return ExtractResult(value, repairs, error=f"expected an object, got {type(value).__name__}")
+
+    value = dict(value)
+    missing = []
+    for field, (types, default) in schema.items():
+        if field not in value or value[field] is None:
+            if default is REQUIRED:
+                missing.append(field)
+            else:
+                value[field] = list(default) if isinstance(default, list) else default
+                repairs.append(f"default:{field}")
+            continue
+        if isinstance(value[field], types) and not (types is NUMBER and isinstance(value[field], bool)):
+            continue
+        coerced = _coerce(value[field], types)
+        if coerced is None:
+            missing.append(field)
+        else:
+            value[field] = coerced
+            repairs.append(f"coerced:{field}")
+
+    if missing:
+        return ExtractResult(value, repairs, error=f"missing or invalid fields: {', '.join(missing)}")
+    return ExtractResult(value, repairs)
+
+
+def _coerce(value, types):
+    if types is NUMBER and isinstance(value, str):
+        # "7", "7.5" or "7/10"
+        head = value.strip().split("/")[0].strip().rstrip("%")
+        try:
+            number = float(head)
+        except ValueError:
+            return None
+        return int(number) if number.is_integer() else number
+    if types is bool and isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "yes"):
+            return True
+        if lowered in ("false", "no"):
+            return False
+        return None
+    if types is bool and isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if types is list and isinstance(value, (str, dict)):
+        return [value]
+    if types is str and isinstance(value, (int, float)):
+        return str(value)
+    if types is str and isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return "\n".join(value)
+    return None
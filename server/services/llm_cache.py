@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")  # on-disk tier is off unless set
+
+# Seconds a response stays valid, per call type. 0 disables caching, which is
+# what we want for conversational turns and calls that should vary each time.
+CALL_TYPE_TTLS = {
+    "chunk_analysis": 24 * 3600,
+    "resume_merge": 24 * 3600,
+    "resume_chat": 24 * 3600,
+    "evaluate_answer": 6 * 3600,
+    "review_code": 6 * 3600,
+    "review_style": 6 * 3600,
+    "interview_analysis": 3600,
+    "interview_segment": 3600,
+    "generate_questions": 0,
+    "question_bank": 0,
+    "coding_problem": 0,
+    "problem_pool": 0,
+    "chat_summary": 3600,
+    "chat": 0,
+    "default": 0
+}
+
+# Per-type overrides, e.g. LLM_CACHE_TTL_EVALUATE_ANSWER=600
+for _call_type in CALL_TYPE_TTLS:
+    _override = os.getenv(f"LLM_CACHE_TTL_{_call_type.upper()}")
+    if _override is not None:
+        CALL_TYPE_TTLS[_call_type] = int(_override)
+
+
+def make_key(messages, model, temperature, json_mode):
+    payload = json.dumps(
+        {
+            "messages": messages,
+            "model": model,
+            "temperature": temperature,
+            "json_mode": json_mode
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Lookups go to an in-memory LRU first and then, if a directory is
+    configured, to a JSON-file tier on disk that survives restarts.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, cache_dir=LLM_CACHE_DIR, ttls=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.ttls = ttls or CALL_TYPE_TTLS
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def ttl_for(self, call_type):
+        return self.ttls.get(call_type, self.ttls.get("default", 0))
+
+    def get(self, key, call_type="default"):
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._count(call_type, "memory_hits")
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        if entry and entry["expires_at"] > now:
+            with self._lock:
+                self._remember(key, entry["expires_at"], entry["value"])
+                self._count(call_type, "disk_hits")
+            return entry["value"]
+
+        with self._lock:
+            self._count(call_type, "misses")
+        return None
+
+    def set(self, key, value, call_type="default"):
+        ttl = self.ttl_for(call_type)
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._count(call_type, "stores")
+        self._write_disk(key, expires_at, value)
+
+    def stats(self):
+        with self._lock:
+            by_type = {name: dict(counts) for name, counts in self._stats.items()}
+            size = len(self._memory)
+
+        totals = {}
+        for counts in by_type.values():
+            for field, value in counts.items():
+                totals[field] = totals.get(field, 0) + value
+        hits = totals.get("memory_hits", 0) + totals.get("disk_hits", 0)
+        lookups = hits + totals.get("misses", 0)
+
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "disk_enabled": bool(self.cache_dir),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "totals": totals,
+            "by_call_type": by_type
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._stats = {}
+
+    # Callers must hold self._lock
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, call_type, field):
+        counts = self._stats.setdefault(call_type, {})
+        counts[field] = counts.get(field, 0) + 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["expires_at"] <= time.time():
+                os.remove(path)
+                return None
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"LLM Cache Read Error: {e}")
+            return None
+
+    def _write_disk(self, key, expires_at, value):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"LLM Cache Write Error: {e}")
+
+
+llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
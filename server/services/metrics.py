@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; wide enough for both a dict lookup and a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+DESCRIPTIONS = {
+    "stage_duration_seconds": "Time spent in an instrumented stage (ocr, chunking, llm, db, pdf_render, ...)",
+    "stage_errors_total": "Instrumented stages that raised",
+    "llm_tokens_total": "Tokens reported by LLM providers",
+    "llm_estimated_tokens_total": "Prompt plus expected completion tokens reserved per call type",
+    "llm_time_to_first_token_seconds": "Time to the first streamed chat token",
+    "llm_json_repairs_total": "Repairs applied to JSON returned by the model",
+    "llm_json_failures_total": "Model responses with no usable JSON",
+    "job_queue_wait_seconds": "Time background jobs spent queued before a worker picked them up",
+    "http_request_duration_seconds": "Request latency by endpoint",
+    "http_requests_total": "Requests by endpoint and status"
+}
+
+# Spans recorded during the current request, for the Server-Timing header.
+# Worker pools copy the context, so spans from helper threads land here too.
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    In-process counters and histograms, rendered in the Prometheus text
+    format by /metrics.
+
+    Stats that other services already keep (cache, router, scheduler) are
+    not duplicated here; they are read at scrape time by collectors
+    registered with register_collector().
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Times a block as `stage`, for /metrics and the Server-Timing header."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_errors_total", stage=stage, **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_duration_seconds", elapsed, stage=stage, **labels)
+            spans = _request_spans.get()
+            if spans is not None:
+                spans.append((".".join([stage, *map(str, labels.values())]), elapsed))
+
+    def timed(self, stage, **labels):
+        """Decorator form of span()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_collector(self, collector):
+        """
+        `collector()` returns (name, kind, help, labels, value) samples,
+        where kind is "counter" or "gauge". Read on every scrape.
+        """
+        self._collectors.append(collector)
+
+    # ------------------------------------------------------------------
+    # Per-request Server-Timing
+    # ------------------------------------------------------------------
+    def start_request(self):
+        # Worker threads are reused across requests, so always start afresh
+        _request_spans.set([])
+
+    def server_timing(self, total_seconds=None):
+        """Sums this request's spans by name into a Server-Timing value."""
+        spans = _request_spans.get() or []
+        totals = {}
+        for name, elapsed in spans:
+            totals[name] = totals.get(name, 0.0) + elapsed
+        parts = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items()]
+        if total_seconds is not None:
+            parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def render(self):
+        families = {}
+
+        def family(name, kind, help_text=None):
+            if name not in families:
+                families[name] = {"kind": kind, "help": help_text or DESCRIPTIONS.get(name, name), "lines": []}
+            return families[name]["lines"]
+
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: {**v, "buckets": list(v["buckets"])} for k, v in self._histograms.items()}
+
+        for (name, labels), value in sorted(counters.items()):
+            family(name, "counter").append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            lines = family(name, "histogram")
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                bucket_labels = labels + (("le", _format_value(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        for collector in list(self._collectors):
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if value is None:
+                    continue
+                family(name, kind, help_text).append(
+                    f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}"
+                )
+
+        output = []
+        for name, data in families.items():
+            output.append(f"# HELP {name} {data['help']}")
+            output.append(f"# TYPE {name} {data['kind']}")
+            output.extend(data["lines"])
+        return "\n".join(output) + "\n"
+
+
+metrics = Metrics()
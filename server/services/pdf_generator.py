@@ -7,6 +7,9 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY, TA_RIGHT
 from io import BytesIO
 from datetime import datetime
 
+from services.metrics import metrics
+
+@metrics.timed("pdf_render")
 def generate_interview_report(report_data):
     buffer = BytesIO()
     
@@ -0,0 +1,120 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Pipeline:
+    """
+    Small DAG executor for request handlers.
+
+    Stages whose dependencies are satisfied run at the same time on a thread
+    pool. A stage that raises or exceeds its timeout falls back to its
+    default value, and stages depending on it are skipped (also taking their
+    default), so callers always get a partial result. Each stage receives the
+    results of its dependencies as keyword arguments.
+    """
+
+    def __init__(self, label="Pipeline", max_workers=None):
+        self.label = label
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name, fn, deps=(), timeout=None, default=None):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = {
+            "fn": fn,
+            "deps": tuple(deps),
+            "timeout": timeout,
+            "default": default
+        }
+        return self
+
+    def run(self):
+        results = {}
+        errors = {}
+        timings = {}
+        started = {}
+        remaining = dict(self.stages)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self.stages)))
+
+        def execute(name, stage, kwargs):
+            started[name] = time.monotonic()
+            return stage["fn"](**kwargs)
+
+        def finish(name, value=None, error=None):
+            stage = self.stages[name]
+            if error is None:
+                results[name] = value
+            else:
+                results[name] = stage["default"]
+                errors[name] = error
+                print(f"{self.label}: stage '{name}' failed: {error}")
+            if name in started:
+                timings[name] = round((time.monotonic() - started[name]) * 1000, 1)
+
+        try:
+            running = {}
+            while remaining or running:
+                for name, stage in list(remaining.items()):
+                    deps = stage["deps"]
+                    if any(dep in errors for dep in deps):
+                        del remaining[name]
+                        finish(name, error="skipped (dependency failed)")
+                    elif all(dep in results for dep in deps):
+                        del remaining[name]
+                        kwargs = {dep: results[dep] for dep in deps}
+                        # Stages inherit the caller's context (request metrics etc.)
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, execute, name, stage, kwargs)] = name
+
+                if not running:
+                    continue
+
+                wait_for = None
+                now = time.monotonic()
+                expiries = [
+                    started[n] + self.stages[n]["timeout"]
+                    for n in running.values()
+                    if self.stages[n]["timeout"] is not None and n in started
+                ]
+                if expiries:
+                    wait_for = max(0.0, min(expiries) - now)
+                elif any(self.stages[n]["timeout"] is not None for n in running.values()):
+                    wait_for = 0.05
+
+                done, _ = wait(set(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        finish(name, value=future.result())
+                    except Exception as e:
+                        finish(name, error=str(e))
+
+                now = time.monotonic()
+                for future, name in list(running.items()):
+                    timeout = self.stages[name]["timeout"]
+                    if timeout is not None and name in started and now - started[name] >= timeout:
+                        running.pop(future)
+                        finish(name, error=f"timed out after {timeout}s")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return PipelineResult(results, errors, timings)
+
+
+class PipelineResult:
+    def __init__(self, results, errors, timings):
+        self.results = results
+        self.errors = errors
+        self.timings = timings
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    @property
+    def ok(self):
+        return not self.errors
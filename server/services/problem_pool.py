@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from services.sandbox import code_sandbox
+from services.providers import LLM_PROVIDER
+
+load_dotenv()
+
+PROBLEM_POOL_ENABLED = os.getenv("PROBLEM_POOL_ENABLED", "true").lower() == "true"
+# Stub runs keep their own file so their canned problems never reach live users
+PROBLEM_POOL_PATH = os.getenv(
+    "PROBLEM_POOL_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+        "problem_pool.stub.json" if LLM_PROVIDER == "stub" else "problem_pool.json"
+    )
+)
+PROBLEM_POOL_TARGET = int(os.getenv("PROBLEM_POOL_TARGET", 15))  # grow a pool until it holds this many
+PROBLEM_POOL_MAX_SIZE = int(os.getenv("PROBLEM_POOL_MAX_SIZE", 60))  # past this, users cycle through the pool
+PROBLEM_POOL_BATCH = int(os.getenv("PROBLEM_POOL_BATCH", 3))  # generations per growth step
+PROBLEM_POOL_MIN_TESTS = int(os.getenv("PROBLEM_POOL_MIN_TESTS", 3))  # tests that must pass the reference solution
+PROBLEM_POOL_MAX_USERS = int(os.getenv("PROBLEM_POOL_MAX_USERS", 1000))
+# Keys to fill at startup, e.g. "python|Arrays|Easy;javascript|Strings|Medium"
+PROBLEM_POOL_PREWARM = os.getenv("PROBLEM_POOL_PREWARM", "")
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# Stored with a problem but never sent to clients
+HIDDEN_FIELDS = ("tests", "reference_solution", "added")
+
+
+def _normalize(text):
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def pool_key(language, topic, difficulty):
+    return "|".join(_normalize(part) for part in (language, topic, difficulty))
+
+
+def public_view(problem):
+    """The problem as shown to the candidate: hidden tests replaced by their count."""
+    view = {k: v for k, v in problem.items() if k not in HIDDEN_FIELDS}
+    view["test_count"] = len(problem.get("tests") or [])
+    return view
+
+
+def problem_id(problem):
+    digest = hashlib.sha256(
+        f"{_normalize(problem.get('title'))}\0{_normalize(problem.get('description'))}".encode()
+    )
+    return digest.hexdigest()[:16]
+
+
+class ProblemPool:
+    """
+    Persistent pool of generated coding problems per (language, topic,
+    difficulty).
+
+    sample() hands out a random problem the user has not seen yet for that
+    key, cycling once they have seen them all. Problems keep their hidden
+    tests; use public_view() before sending one to a client. Problems are
+    deduplicated by normalized title and by normalized description. Where
+    the sandbox can run the language, a problem's tests are checked against
+    its reference solution when it is added, and tests that fail it are
+    dropped. The LLM is only used to grow pools, on a background worker,
+    whenever a pool is below its target size or a user has worked through
+    most of it, up to max_size.
+    """
+
+    def __init__(self, path=PROBLEM_POOL_PATH, generator=None, target_size=PROBLEM_POOL_TARGET,
+                 batch_size=PROBLEM_POOL_BATCH, max_users=PROBLEM_POOL_MAX_USERS, min_tests=PROBLEM_POOL_MIN_TESTS,
+                 max_size=PROBLEM_POOL_MAX_SIZE, provider=LLM_PROVIDER):
+        self.path = path
+        self.provider = provider
+        self.generator = generator
+        self.target_size = target_size
+        self.batch_size = batch_size
+        self.min_tests = min_tests
+        self.max_size = max_size
+        self.max_users = max_users
+        self._pools = {}
+        self._by_id = {}
+        self._seen = OrderedDict()  # user id -> {pool key: served problem ids, in order}
+        self._stats = {"hits": 0, "misses": 0, "added": 0, "duplicates": 0, "rejected": 0, "growths": 0, "growth_failures": 0}
+        self._queue = []
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._load()
+
+    def sample(self, language, topic, difficulty, user_id=None, grow_if_empty=True):
+        """
+        Returns a copy of an unseen problem, or None if the pool is empty.
+        Pass grow_if_empty=False when the caller seeds an empty pool itself,
+        so the miss does not also queue a background generation.
+        """
+        key = pool_key(language, topic, difficulty)
+        with self._cond:
+            pool = self._pools.get(key, [])
+            if not pool:
+                self._stats["misses"] += 1
+                needs_growth = grow_if_empty
+                problem = None
+            else:
+                self._stats["hits"] += 1
+                seen = self._seen_for(user_id, key)
+                unseen = [p for p in pool if p["id"] not in seen]
+                if not unseen:
+                    # Seen everything: start another cycle, not with the last one served
+                    last = next(reversed(seen), None)
+                    seen.clear()
+                    unseen = [p for p in pool if p["id"] != last] or pool
+                problem = dict(random.choice(unseen))
+                seen[problem["id"]] = True
+                needs_growth = len(pool) < self.target_size or (len(unseen) <= 2 and len(pool) < self.max_size)
+
+        if needs_growth:
+            self.request_growth(language, topic, difficulty)
+        return problem
+
+    def add(self, language, topic, difficulty, problem):
+        """
+        Adds a problem unless the pool is full, its title or description is
+        already pooled or too few of its tests hold up. Returns the stored
+        copy or None.
+        """
+        key = pool_key(language, topic, difficulty)
+        title = _normalize(problem.get("title"))
+        description = _normalize(problem.get("description"))
+        if not title or not description:
+            return None
+        # Malformed tests from the model are dropped rather than failing every submission
+        tests = [t for t in problem.get("tests") or [] if isinstance(t, dict) and "input" in t and "expected" in t]
+        if code_sandbox and code_sandbox.supports(language):
+            tests = self._verified_tests(problem, tests)
+            if tests is None:
+                # No working sandbox to check them: keep the problem, not its unchecked tests
+                tests = []
+            elif len(tests) < self.min_tests:
+                with self._cond:
+                    self._stats["rejected"] += 1
+                print(f"Problem pool: rejected '{problem.get('title')}' ({len(tests)} verified tests)")
+                return None
+        with self._cond:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) >= self.max_size:
+                return None
+            for existing in pool:
+                if _normalize(existing["title"]) == title or _normalize(existing["description"]) == description:
+                    self._stats["duplicates"] += 1
+                    return None
+            stored = {**problem, "tests": tests, "id": problem_id(problem), "added": time.time()}
+            pool.append(stored)
+            self._by_id[stored["id"]] = stored
+            self._stats["added"] += 1
+            return dict(stored)
+
+    def _verified_tests(self, problem, tests):
+        # Expected values come from the model; keep only those the
+        # reference solution it wrote alongside them actually produces
+        reference = problem.get("reference_solution")
+        if not reference or not tests:
+            return []
+        report = code_sandbox.run(reference, tests, problem.get("function_name"))
+        if report["status"] == "unavailable":
+            return None
+        if report["status"] != "ok":
+            return []
+        return [test for test, result in zip(tests, report["results"]) if result["passed"]]
+
+    def get(self, problem_id):
+        """Full stored problem, including hidden tests, or None."""
+        with self._cond:
+            problem = self._by_id.get(problem_id)
+            return dict(problem) if problem else None
+
+    def titles(self, language, topic, difficulty):
+        with self._cond:
+            return [p["title"] for p in self._pools.get(pool_key(language, topic, difficulty), [])]
+
+    def request_growth(self, language, topic, difficulty):
+        """Queues a background growth step for the key (no-op if already queued)."""
+        if not self.generator:
+            return
+        key = pool_key(language, topic, difficulty)
+        with self._cond:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            self._queue.append((key, language, topic, difficulty))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="problem-pool-growth", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+
+    def prewarm(self, spec=PROBLEM_POOL_PREWARM):
+        """Queues growth for "language|topic|difficulty;..." keys below the target size."""
+        for item in filter(None, (part.strip() for part in spec.split(";"))):
+            parts = [p.strip() for p in item.split("|")]
+            if len(parts) != 3:
+                print(f"Problem pool: ignoring prewarm entry '{item}'")
+                continue
+            with self._cond:
+                size = len(self._pools.get(pool_key(*parts), []))
+            if size < self.target_size:
+                self.request_growth(*parts)
+
+    def stats(self):
+        with self._cond:
+            sizes = {key: len(pool) for key, pool in self._pools.items()}
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "keys": len(sizes),
+                "problems": sum(sizes.values()),
+                "users": len(self._seen),
+                "growth_queue": len(self._queue),
+                "pools": sizes
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    # Callers must hold self._cond
+    def _seen_for(self, user_id, key):
+        if user_id is None:
+            return {}
+        per_user = self._seen.get(user_id)
+        if per_user is None:
+            per_user = self._seen[user_id] = {}
+        self._seen.move_to_end(user_id)
+        while len(self._seen) > self.max_users:
+            self._seen.popitem(last=False)
+        return per_user.setdefault(key, {})
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, language, topic, difficulty = self._queue.pop(0)
+
+            added = 0
+            try:
+                for _ in range(self.batch_size):
+                    with self._cond:
+                        if len(self._pools.get(key, [])) >= self.max_size:
+                            break
+                    problem = self.generator(language, topic, difficulty, self.titles(language, topic, difficulty))
+                    if problem and self.add(language, topic, difficulty, problem):
+                        added += 1
+                with self._cond:
+                    self._stats["growths"] += 1
+                print(f"Problem pool: added {added} problems for '{key}'")
+            except Exception as e:
+                with self._cond:
+                    self._stats["growth_failures"] += 1
+                print(f"Problem pool growth failed for '{key}': {e}")
+            finally:
+                if added:
+                    self._save()
+                with self._cond:
+                    self._queued.discard(key)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Files from before the provider was recorded were written live
+            if data.get("provider", "live") != self.provider:
+                print(f"Problem pool: ignoring {self.path}, written by the '{data.get('provider')}' provider")
+                return
+            self._pools = data.get("pools", {})
+            self._by_id = {p["id"]: p for pool in self._pools.values() for p in pool}
+        except (OSError, ValueError) as e:
+            print(f"Problem pool: could not load {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._cond:
+            data = json.dumps({"provider": self.provider, "pools": self._pools})
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Problem pool: could not save {self.path}: {e}")
+
+
+problem_pool = ProblemPool() if PROBLEM_POOL_ENABLED else None
@@ -0,0 +1,319 @@
+import os
+import time
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+from services.scheduler import llm_scheduler, QueueTimeout
+
+load_dotenv()
+
+# "ordered" keeps LLM_PROVIDER_ORDER; "latency" prefers the provider with the
+# lowest recent median latency, penalising recent errors.
+LLM_ROUTING_POLICY = os.getenv("LLM_ROUTING_POLICY", "ordered")
+LLM_PROVIDER_ORDER = [p.strip() for p in os.getenv("LLM_PROVIDER_ORDER", "groq,gemini").split(",") if p.strip()]
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 1.0))
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", 50))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5))
+LLM_BREAKER_MIN_SAMPLES = int(os.getenv("LLM_BREAKER_MIN_SAMPLES", 10))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+
+
+def retry_after_seconds(error):
+    """Reads a Retry-After header (seconds) off a provider SDK exception."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider."""
+
+    def __init__(self, name, window=LLM_ROUTER_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self.consecutive_failures = 0
+        self.state = "closed"  # closed -> open -> half_open -> closed
+        self.open_until = 0.0
+        self.retry_after_until = 0.0
+        self.probe_in_flight = False
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency(self, pct):
+        return _percentile([latency for latency, ok in self.samples if ok], pct)
+
+
+class ProviderRouter:
+    """
+    Decides which LLM provider serves a call, and in what order the others
+    are tried. Tracks rolling latency and error rates per provider, opens a
+    circuit breaker on providers that keep failing, honours Retry-After and
+    can optionally hedge a slow call by also sending it to the next provider
+    once the first has been running longer than its recent p95 latency.
+    """
+
+    def __init__(self, order=None, policy=LLM_ROUTING_POLICY, hedge=LLM_HEDGE_ENABLED, scheduler=llm_scheduler):
+        self.order = order or LLM_PROVIDER_ORDER
+        self.scheduler = scheduler
+        self.policy = policy
+        self.hedge = hedge
+        self._health = {}
+        self._counters = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    def plan(self, names, prefer=None):
+        """
+        Returns the providers to try, best first, skipping unavailable ones.
+        `prefer` puts specific providers ahead of the configured order.
+        """
+        order = list(prefer or []) + [n for n in self.order if n not in (prefer or [])]
+        names = sorted(names, key=lambda n: order.index(n) if n in order else len(order))
+
+        with self._lock:
+            if self.policy == "latency" and not prefer:
+                names.sort(key=self._latency_score)
+
+            now = time.monotonic()
+            available = []
+            for name in names:
+                health = self._get_health(name)
+                if health.retry_after_until > now:
+                    self._count(name, "skipped_retry_after")
+                elif health.state == "open" and health.open_until > now:
+                    self._count(name, "skipped_open")
+                elif health.state in ("open", "half_open"):
+                    # Cooldown over: let exactly one probe through
+                    if health.probe_in_flight:
+                        self._count(name, "skipped_open")
+                    else:
+                        health.state = "half_open"
+                        health.probe_in_flight = True
+                        available.append(name)
+                else:
+                    available.append(name)
+
+        # Every provider is cooling down; trying beats failing outright
+        return available or names
+
+    def call(self, calls, tokens=0, priority="standard", prefer=None):
+        """
+        Runs the first provider callable that succeeds. `calls` maps a
+        provider name to a zero-argument function returning the response
+        text (and raising on failure). Each attempt first queues with the
+        scheduler for `tokens` of capacity at the given priority.
+        Returns None if every provider fails.
+        """
+        plan = self.plan(list(calls), prefer)
+        if not plan:
+            return None
+
+        self._count(plan[0], "routed_primary")
+        attempted = set()
+        cost = (tokens, priority)
+        try:
+            if self.hedge and len(plan) > 1:
+                return self._call_hedged(plan, calls, attempted, cost)
+            return self._call_in_order(plan, calls, attempted, cost)
+        finally:
+            self.release_probes(set(plan) - attempted)
+
+    def _call_in_order(self, plan, calls, attempted, cost, count_first=False):
+        for i, name in enumerate(plan):
+            if i > 0 or count_first:
+                self._count(name, "fallbacks")
+            attempted.add(name)
+            try:
+                return self._timed(name, calls[name], cost)
+            except Exception as e:
+                print(f"{name} Error (trying next provider): {e}")
+        return None
+
+    def _call_hedged(self, plan, calls, attempted, cost):
+        primary, backup = plan[0], plan[1]
+        attempted.add(primary)
+        futures = {self._submit(primary, calls[primary], cost): primary}
+
+        done, _ = wait(set(futures), timeout=self.hedge_delay(primary))
+        winner, result = self._first_success(done, futures)
+        if winner:
+            return result
+
+        # Primary either failed (plain fallback) or is slow (hedge)
+        hedged = not done
+        self._count(backup, "hedged" if hedged else "fallbacks")
+        attempted.add(backup)
+        futures[self._submit(backup, calls[backup], cost)] = backup
+
+        pending = {f for f in futures if not f.done()}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner, result = self._first_success(done, futures)
+            if winner:
+                if hedged and winner == backup:
+                    self._count(backup, "hedge_wins")
+                return result
+
+        # Both failed; let the rest of the plan have a go in order
+        return self._call_in_order(plan[2:], calls, attempted, cost, count_first=True)
+
+    def _submit(self, name, fn, cost):
+        # Keep the caller's context so per-request metrics see hedged calls
+        return self._executor.submit(contextvars.copy_context().run, self._timed, name, fn, cost)
+
+    def _first_success(self, done, futures):
+        for future in done:
+            error = future.exception()
+            if error is None:
+                return futures[future], future.result()
+            print(f"{futures[future]} Error (trying next provider): {error}")
+        return None, None
+
+    def release_probes(self, names):
+        with self._lock:
+            for name in names:
+                health = self._get_health(name)
+                if health.state == "half_open" and health.probe_in_flight:
+                    health.probe_in_flight = False
+
+    def hedge_delay(self, name):
+        with self._lock:
+            latency = self._get_health(name).latency(LLM_HEDGE_PERCENTILE)
+        return max(LLM_HEDGE_MIN_DELAY, latency or 0.0)
+
+    # ------------------------------------------------------------------
+    # Health tracking
+    # ------------------------------------------------------------------
+    def _timed(self, name, fn, cost=None):
+        if self.scheduler and cost:
+            try:
+                self.scheduler.acquire(name, *cost)
+            except QueueTimeout:
+                # Local back-pressure, not a provider fault: no breaker change,
+                # but a half-open probe that never ran must be handed back
+                self._count(name, "queue_timeouts")
+                self.release_probes([name])
+                raise
+
+        # Queue time is not provider latency, so the clock starts here
+        start = time.monotonic()
+        try:
+            result = fn()
+            if not result:
+                raise RuntimeError("empty response")
+        except Exception as e:
+            self.record_failure(name, time.monotonic() - start, retry_after_seconds(e))
+            raise
+        self.record_success(name, time.monotonic() - start)
+        return result
+
+    def record_success(self, name, latency):
+        with self._lock:
+            health = self._get_health(name)
+            health.samples.append((latency, True))
+            health.consecutive_failures = 0
+            if health.state != "closed":
+                print(f"{name}: circuit closed")
+            health.state = "closed"
+            health.probe_in_flight = False
+            self._count(name, "successes")
+
+    def record_failure(self, name, latency, retry_after=None):
+        with self._lock:
+            health = self._get_health(name)
+            health.samples.append((latency, False))
+            health.consecutive_failures += 1
+            self._count(name, "failures")
+
+            now = time.monotonic()
+            if retry_after:
+                health.retry_after_until = now + retry_after
+                self._count(name, "retry_after")
+
+            tripped = (
+                health.state == "half_open"
+                or health.consecutive_failures >= LLM_BREAKER_FAILURES
+                or (len(health.samples) >= LLM_BREAKER_MIN_SAMPLES
+                    and health.error_rate() >= LLM_BREAKER_ERROR_RATE)
+            )
+            if tripped and health.state != "open":
+                print(f"{name}: circuit opened for {LLM_BREAKER_COOLDOWN}s")
+                self._count(name, "circuit_opened")
+            if tripped:
+                health.state = "open"
+                health.open_until = now + LLM_BREAKER_COOLDOWN
+            health.probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            providers = {}
+            for name, health in self._health.items():
+                providers[name] = {
+                    "state": health.state,
+                    "samples": len(health.samples),
+                    "error_rate": round(health.error_rate(), 3),
+                    "p50_latency_s": _round(health.latency(50)),
+                    "p95_latency_s": _round(health.latency(95)),
+                    "consecutive_failures": health.consecutive_failures,
+                    "open_for_s": _round(max(0.0, health.open_until - now)) if health.state == "open" else 0.0,
+                    "retry_after_s": _round(max(0.0, health.retry_after_until - now)),
+                    "decisions": dict(self._counters.get(name, {}))
+                }
+            return {
+                "policy": self.policy,
+                "order": list(self.order),
+                "hedge": self.hedge,
+                "providers": providers
+            }
+
+    # Callers must hold self._lock
+    def _get_health(self, name):
+        if name not in self._health:
+            self._health[name] = ProviderHealth(name)
+        return self._health[name]
+
+    def _latency_score(self, name):
+        health = self._get_health(name)
+        latency = health.latency(50)
+        if latency is None:
+            return 0.0  # unknown providers get a chance to build a history
+        return latency * (1 + 4 * health.error_rate())
+
+    def _count(self, name, field):
+        with self._lock:
+            counts = self._counters.setdefault(name, {})
+            counts[field] = counts.get(field, 0) + 1
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+provider_router = ProviderRouter()
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from dotenv import load_dotenv
+
+from services.providers import LLM_PROVIDER
+
+load_dotenv()
+
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+# Stub runs keep their own file so their canned questions never reach live users
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+        "question_bank.stub.json" if LLM_PROVIDER == "stub" else "question_bank.json"
+    )
+)
+QUESTION_BANK_MIN_SERVE = int(os.getenv("QUESTION_BANK_MIN_SERVE", 10))  # pool size needed before serving from it
+QUESTION_BANK_REFILL_BELOW = int(os.getenv("QUESTION_BANK_REFILL_BELOW", 20))
+QUESTION_BANK_MAX_PER_KEY = int(os.getenv("QUESTION_BANK_MAX_PER_KEY", 60))
+QUESTION_BANK_BATCH = int(os.getenv("QUESTION_BANK_BATCH", 10))
+QUESTION_BANK_MIN_REQUESTS = int(os.getenv("QUESTION_BANK_MIN_REQUESTS", 2))  # starts before a role counts as common
+# Keys to fill at startup, e.g. "Software Engineer|Technical|Medium;Data Analyst|Behavioral|Easy"
+QUESTION_BANK_PREWARM = os.getenv("QUESTION_BANK_PREWARM", "")
+
+STOPWORDS = {
+    "the", "and", "for", "with", "you", "your", "that", "this", "have", "how", "what", "when", "why",
+    "would", "could", "about", "from", "into", "are", "was", "were", "been", "did", "does", "describe",
+    "tell", "explain", "time", "experience", "work", "worked", "working", "using", "use", "used", "can"
+}
+_WORD = re.compile(r"[a-z][a-z0-9+#.]{2,}")
+
+
+def _normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+def _keywords(text):
+    return {w.rstrip(".") for w in _WORD.findall((text or "").lower()) if w.rstrip(".") not in STOPWORDS}
+
+
+def bank_key(job_role, category, difficulty):
+    return "|".join(_normalize(part) for part in (job_role, category, difficulty))
+
+
+class QuestionBank:
+    """
+    Local pool of generic interview questions per (job role, category,
+    difficulty), persisted as JSON.
+
+    pick() serves an interview from the pool, re-ranked by overlap with the
+    candidate's resume and rotated by how often each question was served.
+    A single background worker tops pools up through `generator` when they
+    run low, but only for keys requested at least min_requests times, so
+    one-off roles don't grow pools nobody reuses.
+    """
+
+    def __init__(self, path=QUESTION_BANK_PATH, generator=None, min_serve=QUESTION_BANK_MIN_SERVE,
+                 refill_below=QUESTION_BANK_REFILL_BELOW, max_per_key=QUESTION_BANK_MAX_PER_KEY,
+                 batch_size=QUESTION_BANK_BATCH, min_requests=QUESTION_BANK_MIN_REQUESTS, provider=LLM_PROVIDER):
+        self.path = path
+        self.provider = provider
+        self.generator = generator
+        self.min_serve = min_serve
+        self.refill_below = refill_below
+        self.max_per_key = max_per_key
+        self.batch_size = batch_size
+        self.min_requests = min_requests
+        self._pools = {}
+        self._requests = {}
+        self._stats = {"hits": 0, "misses": 0, "refills": 0, "refill_failures": 0, "added": 0}
+        self._queue = []
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._load()
+
+    def pick(self, job_role, category, difficulty, resume_text="", count=5):
+        """
+        Returns `count` questions for the key, or None if the pool is too
+        small to serve from (the caller then generates synchronously).
+        """
+        key = bank_key(job_role, category, difficulty)
+        with self._cond:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            pool = self._pools.get(key, [])
+            if len(pool) < max(count, self.min_serve):
+                self._stats["misses"] += 1
+                chosen = None
+            else:
+                self._stats["hits"] += 1
+                chosen = self._rank(pool, _keywords(resume_text))[:count]
+                for entry in chosen:
+                    entry["served"] += 1
+                chosen = [entry["question"] for entry in chosen]
+            needs_refill = len(pool) < self.refill_below and self._requests[key] >= self.min_requests
+
+        if needs_refill:
+            self.request_refill(job_role, category, difficulty)
+        return chosen
+
+    def add(self, job_role, category, difficulty, questions):
+        """Adds questions to a pool, skipping near-verbatim duplicates. Returns how many were new."""
+        key = bank_key(job_role, category, difficulty)
+        with self._cond:
+            pool = self._pools.setdefault(key, [])
+            seen = {_normalize(entry["question"]) for entry in pool}
+            added = 0
+            for question in questions:
+                if not isinstance(question, str) or not question.strip():
+                    continue
+                normalized = _normalize(question)
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+                pool.append({
+                    "question": question.strip(),
+                    "keywords": sorted(_keywords(question)),
+                    "served": 0,
+                    "added": time.time()
+                })
+                added += 1
+
+            # Keep the least-served questions when over the cap
+            if len(pool) > self.max_per_key:
+                pool.sort(key=lambda entry: entry["served"])
+                del pool[self.max_per_key:]
+            self._stats["added"] += added
+        return added
+
+    def request_refill(self, job_role, category, difficulty):
+        """Queues a background top-up for the key (no-op if already queued)."""
+        if not self.generator:
+            return
+        key = bank_key(job_role, category, difficulty)
+        with self._cond:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            self._queue.append((key, job_role, category, difficulty))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="question-bank-refill", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+
+    def prewarm(self, spec=QUESTION_BANK_PREWARM):
+        """Queues refills for "role|category|difficulty;..." keys below the refill threshold."""
+        for item in filter(None, (part.strip() for part in spec.split(";"))):
+            parts = [p.strip() for p in item.split("|")]
+            if len(parts) != 3:
+                print(f"Question bank: ignoring prewarm entry '{item}'")
+                continue
+            with self._cond:
+                size = len(self._pools.get(bank_key(*parts), []))
+            if size < self.refill_below:
+                self.request_refill(*parts)
+
+    def stats(self):
+        with self._cond:
+            sizes = {key: len(pool) for key, pool in self._pools.items()}
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "keys": len(sizes),
+                "questions": sum(sizes.values()),
+                "refill_queue": len(self._queue),
+                "pools": sizes
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _rank(self, pool, resume_keywords):
+        def score(entry):
+            relevance = len(resume_keywords.intersection(entry["keywords"]))
+            # Relevance first; among equals, rotate towards less-served
+            # questions, with a little noise so interviews differ
+            return relevance - 0.3 * entry["served"] + random.random() * 0.5
+
+        return sorted(pool, key=score, reverse=True)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, job_role, category, difficulty = self._queue.pop(0)
+
+            try:
+                with self._cond:
+                    existing = [entry["question"] for entry in self._pools.get(key, [])]
+                questions = self.generator(job_role, category, difficulty, self.batch_size, existing)
+                added = self.add(job_role, category, difficulty, questions or [])
+                with self._cond:
+                    self._stats["refills"] += 1
+                print(f"Question bank: added {added} questions for '{key}'")
+                if added:
+                    self._save()
+            except Exception as e:
+                with self._cond:
+                    self._stats["refill_failures"] += 1
+                print(f"Question bank refill failed for '{key}': {e}")
+            finally:
+                with self._cond:
+                    self._queued.discard(key)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Files from before the provider was recorded were written live
+            if data.get("provider", "live") != self.provider:
+                print(f"Question bank: ignoring {self.path}, written by the '{data.get('provider')}' provider")
+                return
+            self._pools = data.get("pools", {})
+            self._requests = data.get("requests", {})
+        except (OSError, ValueError) as e:
+            print(f"Question bank: could not load {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._cond:
+            data = json.dumps({"provider": self.provider, "pools": self._pools, "requests": self._requests})
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Question bank: could not save {self.path}: {e}")
+
+
+question_bank = QuestionBank() if QUESTION_BANK_ENABLED else None
@@ -1,14 +1,41 @@
 import pdfplumber
 import os
+import time
 import traceback
 import io
-from PIL import Image
-from google import genai
-from google.genai import types
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps
 from dotenv import load_dotenv
 
+from services.metrics import metrics
+from services.uploads import UploadRejected, UPLOAD_MAX_BYTES
+
 load_dotenv()
 
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 30))  # later pages are ignored
+PDF_EXTRACT_BUDGET = float(os.getenv("PDF_EXTRACT_BUDGET", 20))  # seconds per document
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))  # 0 parses inline, with no hard time limit
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 4))  # shorter PDFs are parsed as a single task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 2))
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", 2000))  # longest side sent to OCR, in pixels
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", 80))
+OCR_MAX_DECODE_MB = int(os.getenv("OCR_MAX_DECODE_MB", 64))  # decoded pixel memory allowed per image
+
+OCR_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+# Leading bytes each accepted extension must start with
+UPLOAD_SIGNATURES = {
+    ".pdf": (b"%PDF-",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",)
+}
+
+
 def extract_text(file):
     """
     Main entry point for extracting text from a resume file (PDF or Image).
@@ -21,74 +48,254 @@ def extract_text(file):
     return {"pages": []}
 
 
+def iter_pages(file):
+    """
+    Streaming form of extract_text(): yields {"page_no", "text"} dicts in
+    page order as soon as each one is parsed, so callers can start chunking
+    before the last page of a long PDF is done.
+    """
+    if file.filename.lower().endswith('.pdf'):
+        with metrics.span("pdf_extract"):
+            yield from _iter_pdf_pages(file)
+    elif file.filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+        yield from _extract_text_from_image(file)["pages"]
+
+
+def inspect_upload(file, max_bytes=UPLOAD_MAX_BYTES, block_size=64 * 1024):
+    """
+    Single pass over an uploaded resume: hashes it block by block, checks
+    the leading bytes match the file extension and enforces the size limit.
+    Rewinds the file afterwards. Returns the SHA-256 fingerprint; raises
+    UploadRejected.
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in UPLOAD_SIGNATURES:
+        raise UploadRejected("Unsupported file type, upload a PDF, PNG or JPEG resume")
+
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    head = file.read(block_size)
+    # PDF readers accept junk before the header, so look a little further in
+    window = head[:1024] if extension == ".pdf" else head[:16]
+    if not any(
+        (signature in window) if extension == ".pdf" else window.startswith(signature)
+        for signature in UPLOAD_SIGNATURES[extension]
+    ):
+        file.seek(0)
+        raise UploadRejected(f"File content does not match its {extension} extension")
+
+    block = head
+    while block:
+        size += len(block)
+        if size > max_bytes:
+            file.seek(0)
+            raise UploadRejected(f"Upload too large (limit {max_bytes // (1024 * 1024)} MB)", status=413)
+        digest.update(block)
+        block = file.read(block_size)
+    file.seek(0)
+    return digest.hexdigest()
+
+
 # ===============================
 # PDF HANDLING
 # ===============================
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+_pdf_pool_users = {}  # pool -> documents currently parsing on it
+_retired_pdf_pools = set()  # pools to terminate once their last document is done
+
+
+def _acquire_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # forkserver children start from a clean interpreter with only this
+            # module preloaded, instead of forking the threaded server process
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+        _pdf_pool_users[_pdf_pool] = _pdf_pool_users.get(_pdf_pool, 0) + 1
+        return _pdf_pool
+
+
+def _release_pdf_pool(pool, retire=False):
+    """
+    Called once per _acquire_pdf_pool() when a document is done with the
+    pool. With retire=True (a page range ran past its budget, or a worker
+    died) new documents get a fresh pool straight away, while this one is
+    only terminated after the last document still parsing on it finishes,
+    so those documents are not cut short. A runaway range is therefore
+    stopped within one more budget at most.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if retire:
+            _retired_pdf_pools.add(pool)
+            if _pdf_pool is pool:
+                _pdf_pool = None
+        _pdf_pool_users[pool] -= 1
+        if _pdf_pool_users[pool] or pool not in _retired_pdf_pools:
+            return
+        del _pdf_pool_users[pool]
+        _retired_pdf_pools.discard(pool)
+    _terminate_pdf_pool(pool)
+
+
+def _terminate_pdf_pool(pool):
+    # Cancelling a future cannot stop a page range that is already running
+    if hasattr(pool, "terminate_workers"):  # Python 3.14+
+        pool.terminate_workers()
+        return
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _page_entry(index, page_text):
+    if not page_text:
+        return None
+    return {"page_no": index + 1, "text": page_text.strip()}
+
+
+def _pdf_source(stream):
+    """
+    What the worker processes open: the path of a spooled upload, or the
+    bytes of a small in-memory one.
+    """
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        stream.flush()
+        return name
+    stream.seek(0)
+    return stream.read()
+
+
+def _extract_page_range(source, start, stop):
+    """Runs in a worker process: parses pages [start, stop) of one PDF."""
+    pages = []
+    with pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source)) as pdf:
+        for i in range(start, stop):
+            entry = _page_entry(i, pdf.pages[i].extract_text())
+            if entry:
+                pages.append(entry)
+    return pages
+
+
+@metrics.timed("pdf_extract")
 def _extract_text_from_pdf(pdf_file):
+    return {"pages": list(_iter_pdf_pages(pdf_file))}
+
+
+def _iter_pdf_pages(pdf_file, max_pages=PDF_MAX_PAGES, budget=PDF_EXTRACT_BUDGET):
+    """
+    Yields the text of each page in order. Pages are parsed on a process
+    pool, long PDFs split into small page ranges across its workers
+    (pdfminer is pure Python and holds the GIL). Pages past max_pages are
+    skipped, and once the document has used its time budget the pages
+    parsed so far are all that is returned. With PDF_WORKERS=0 pages are
+    parsed inline and the budget is only checked between pages, so one
+    pathological page can run past it.
+    """
+    deadline = time.monotonic() + budget
     try:
-        pages_data = []
+        # Parse the upload's own stream (memory or spooled file), not a copy
+        stream = getattr(pdf_file, "stream", pdf_file)
+        stream.seek(0)
+
+        with pdfplumber.open(stream) as pdf:
+            page_count = len(pdf.pages)
+            if page_count > max_pages:
+                print(f"PDF has {page_count} pages, only the first {max_pages} are parsed")
+                page_count = max_pages
 
-        with pdfplumber.open(pdf_file) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    pages_data.append({
-                        "page_no": i + 1,
-                        "text": page_text.strip()
-                    })
+            if PDF_WORKERS < 1:
+                for i in range(page_count):
+                    if time.monotonic() > deadline:
+                        print(f"PDF extraction over its {budget}s budget after {i} pages")
+                        return
+                    entry = _page_entry(i, pdf.pages[i].extract_text())
+                    if entry:
+                        yield entry
+                return
 
-        return {"pages": pages_data}
+        split = page_count >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS >= 2
+        pages_per_task = PDF_PAGES_PER_TASK if split else page_count
+        yield from _iter_pdf_pages_parallel(_pdf_source(stream), page_count, pages_per_task, deadline, budget)
 
     except Exception as e:
         print(f"Error parsing PDF: {e}")
-        return {"pages": []}
+
+
+def _iter_pdf_pages_parallel(source, page_count, pages_per_task, deadline, budget):
+    pool = _acquire_pdf_pool()
+    pages_per_task = max(1, pages_per_task)
+    retire = False
+    futures = []
+    try:
+        futures = [
+            pool.submit(_extract_page_range, source, start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+        for future in futures:
+            try:
+                yield from future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                print(f"PDF extraction over its {budget}s budget, returning the pages parsed so far")
+                retire = True
+                return
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        retire = True
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+        _release_pdf_pool(pool, retire)
 
 
 # ===============================
 # IMAGE OCR (Gemini)
 # ===============================
+@metrics.timed("ocr")
 def _extract_text_from_image(image_file):
     try:
-        from services.ai_engine import AIEngine
-        ai = AIEngine()
+        from services.ai_engine import get_engine
+        ai = get_engine()
 
-        if not ai.gemini_client:
-            print("Gemini client not initialized. Check GEMINI_API_KEY.")
+        if not any(p.supports_ocr for p in ai.providers.values()):
+            print("No OCR provider initialized. Check GEMINI_API_KEY.")
             return {"pages": []}
 
-        image_file.seek(0)
-        image_bytes = image_file.read()
-
-        if not image_bytes:
+        # Read from the upload's own stream; only the shrunk image is held in memory
+        stream = getattr(image_file, "stream", image_file)
+        stream.seek(0, os.SEEK_END)
+        if not stream.tell():
             return {"pages": []}
+        stream.seek(0)
 
-        # Validate image
+        # Validate and shrink the image
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            img.verify()
+            image_bytes, mime_type = prepare_image_for_ocr(stream)
         except Exception as img_err:
             print(f"Invalid image file: {img_err}")
             return {"pages": []}
 
-        print(f"DEBUG: Sending image OCR request to Gemini (flash-latest)")
+        print(f"DEBUG: Sending image OCR request ({len(image_bytes)} bytes, {mime_type})")
 
-        response = ai.gemini_client.models.generate_content(
-            model='gemini-flash-latest',
-            contents=[
-                "Extract all text from this resume image accurately. Maintain the structure as much as possible.",
-                types.Part.from_bytes(
-                    data=image_bytes,
-                    mime_type="image/jpeg" if image_file.filename.lower().endswith(('.jpg', '.jpeg')) else "image/png"
-                )
-            ]
-        )
+        text = ai.ocr_image(image_bytes, mime_type)
 
-        if response and response.text:
+        if text:
             return {
                 "pages": [
                     {
                         "page_no": 1,
-                        "text": response.text.strip()
+                        "text": text.strip()
                     }
                 ]
             }
@@ -102,6 +309,62 @@ def _extract_text_from_image(image_file):
         return {"pages": []}
 
 
+@metrics.timed("image_prep")
+def prepare_image_for_ocr(image, max_dimension=OCR_MAX_DIMENSION, max_decode_mb=OCR_MAX_DECODE_MB):
+    """
+    Turns an uploaded photo or scan into a small grayscale JPEG that is
+    still sharp enough for OCR: EXIF orientation applied, transparency
+    flattened onto white, longest side at most max_dimension. The format
+    comes from the bytes, not the file name.
+    JPEGs are decoded at reduced scale, and images whose decoded pixels
+    would need more than max_decode_mb are rejected. `image` is bytes or a
+    seekable binary file. Returns (bytes, mime_type); raises ValueError for
+    anything unusable.
+    """
+    stream = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+    stream.seek(0, os.SEEK_END)
+    source_bytes = stream.tell()
+    stream.seek(0)
+
+    img = Image.open(stream)
+    if img.format not in OCR_FORMATS:
+        raise ValueError(f"unsupported image format {img.format}")
+
+    source_format = img.format
+    orientation = img.getexif().get(0x0112, 1)
+
+    # JPEG can decode straight to grayscale at 1/2, 1/4 or 1/8 scale
+    if img.format == "JPEG":
+        img.draft("L", (max_dimension, max_dimension))
+
+    decoded_bytes = img.size[0] * img.size[1] * len(img.getbands())
+    if decoded_bytes > max_decode_mb * 1024 * 1024:
+        raise ValueError(f"image too large to decode ({img.size[0]}x{img.size[1]})")
+
+    img.load()
+    needs_resize = max(img.size) > max_dimension
+
+    img = ImageOps.exif_transpose(img)
+    # Transparent pixels are black underneath; text on them would vanish
+    transparent = "A" in img.getbands() or "transparency" in img.info
+    if transparent:
+        img = img.convert("RGBA")
+        img = Image.alpha_composite(Image.new("RGBA", img.size, "white"), img)
+    img = img.convert("L")
+    if needs_resize:
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    prepared = output.getvalue()
+
+    # Re-encoding a small, upright screenshot can make it bigger
+    if len(prepared) >= source_bytes and not needs_resize and orientation == 1 and not transparent:
+        stream.seek(0)
+        return stream.read(), OCR_FORMATS[source_format]
+    return prepared, "image/jpeg"
+
+
 # For backward compatibility
 def extract_text_from_pdf(pdf_file):
     return extract_text(pdf_file)
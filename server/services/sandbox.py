@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import time
+import signal
+import secrets
+import tempfile
+import threading
+import subprocess
+from dotenv import load_dotenv
+
+from services.metrics import metrics
+
+load_dotenv()
+
+SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "true").lower() == "true"
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", 4))  # concurrent submissions
+SANDBOX_QUEUE_WAIT = float(os.getenv("SANDBOX_QUEUE_WAIT", 10))  # seconds to wait for a free slot
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", 5))  # wall-clock seconds per submission
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", 3))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", 256))
+SANDBOX_MAX_OUTPUT = 1024 * 1024
+
+SUPPORTED_LANGUAGES = {"python", "python3", "py"}
+
+# "namespaces" jails every submission (Linux only, see HARNESS); "none" runs
+# it as the server's own user with only rlimits, for trusted local use
+SANDBOX_ISOLATION = os.getenv("SANDBOX_ISOLATION", "namespaces")
+JAIL_UNAVAILABLE_EXIT = 97
+
+# What a submission's failures look like to the client. The child reports
+# one of these codes; anything else it sends is treated as "runtime error",
+# so no exception text, traceback or file content can leave the sandbox.
+VERDICTS = {
+    "wrong_answer": "wrong answer",
+    "runtime_error": "runtime error",
+    "memory_limit": "memory limit exceeded",
+    "recursion_limit": "recursion limit exceeded",
+    "output_too_large": "output too large"
+}
+
+# Runs inside the child interpreter as `python -I -c HARNESS <cpu seconds>
+# <memory MB> <isolation>`. Before it reads anything it jails itself: new
+# mount, network, IPC and UTS namespaces (plus a user namespace when the
+# server is not root), a read-only tmpfs root holding nothing but the Python
+# standard library, the old root detached, no_new_privs and, when started
+# as root, uid/gid 65534. Then come the rlimits. If the jail cannot be set
+# up it exits with JAIL_UNAVAILABLE_EXIT rather than run the code unjailed.
+#
+# It then reads {token, code, function_name, inputs} from stdin, calls the
+# function on each input and prints one JSON line of serialized outputs and
+# verdict codes prefixed with the per-run token. The token only separates
+# that line from whatever the submission prints; it is not a secret, since
+# the submission runs in the same interpreter. Expected values never reach
+# the child and the parent only trusts outputs and known verdict codes, so
+# a forged report can claim nothing the submission could not return anyway.
+HARNESS = r'''
+import os, sys
+
+def _jail(root, readable):
+    import ctypes, platform
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mount.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_char_p]
+
+    def check(result, what):
+        if result != 0:
+            raise OSError(ctypes.get_errno(), what)
+
+    MS_RDONLY, MS_NOSUID, MS_NODEV, MS_NOEXEC, MS_REMOUNT = 1, 2, 4, 8, 32
+    MS_NOATIME, MS_NODIRATIME, MS_BIND, MS_REC, MS_PRIVATE, MS_RELATIME = 1024, 2048, 4096, 16384, 1 << 18, 1 << 21
+    LOCKED = MS_NOSUID | MS_NODEV | MS_NOEXEC | MS_NOATIME | MS_NODIRATIME | MS_RELATIME
+    uid, gid = os.getuid(), os.getgid()
+
+    flags = 0x20000 | 0x40000000 | 0x8000000 | 0x4000000  # NEWNS | NEWNET | NEWIPC | NEWUTS
+    if uid != 0:
+        flags |= 0x10000000  # NEWUSER: root inside, the server's own user outside
+    check(libc.unshare(flags), "unshare")
+    if uid != 0:
+        for name, content in (("setgroups", "deny"), ("uid_map", f"0 {uid} 1"), ("gid_map", f"0 {gid} 1")):
+            with open(f"/proc/self/{name}", "w") as f:
+                f.write(content)
+
+    check(libc.mount(None, b"/", None, MS_REC | MS_PRIVATE, None), "private mounts")
+    check(libc.mount(b"tmpfs", root.encode(), b"tmpfs", MS_NOSUID | MS_NODEV, b"size=64k,mode=755"), "tmpfs")
+    for path in readable:
+        target = (root + path).encode()
+        os.makedirs(target, mode=0o755, exist_ok=True)
+        check(libc.mount(path.encode(), target, None, MS_BIND | MS_REC, None), f"bind {path}")
+        # A bind mount keeps its source's locked flags; remounting must repeat them
+        locked = os.statvfs(path).f_flag & LOCKED
+        check(libc.mount(None, target, None, MS_REMOUNT | MS_BIND | MS_RDONLY | MS_NOSUID | MS_NODEV | locked, None),
+              f"read-only {path}")
+    check(libc.mount(None, root.encode(), None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV, None), "read-only root")
+
+    os.chdir(root)
+    pivot_root = {"x86_64": 155, "aarch64": 41}.get(platform.machine())
+    if pivot_root is not None:
+        check(libc.syscall(pivot_root, b".", b"."), "pivot_root")
+        check(libc.umount2(b".", 2), "detach old root")  # MNT_DETACH
+    else:
+        os.chroot(".")
+    os.chdir("/")
+    check(libc.prctl(38, 1, 0, 0, 0), "no_new_privs")  # PR_SET_NO_NEW_PRIVS
+    if uid == 0:
+        os.setgroups([])
+        os.setgid(65534)
+        os.setuid(65534)
+
+if sys.argv[3] != "none":
+    try:
+        if not sys.platform.startswith("linux"):
+            raise OSError("namespaces need Linux")
+        _jail(os.getcwd(), [os.path.dirname(os.__file__)])
+    except OSError as e:
+        sys.stderr.write(f"sandbox jail unavailable: {e}\n")
+        sys.stderr.flush()
+        os._exit(97)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource:
+    _cpu, _memory = int(sys.argv[1]), int(sys.argv[2]) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_CPU, (_cpu, _cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (_memory, _memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if hasattr(resource, "RLIMIT_NPROC"):
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))  # no forking
+
+import io, json, time
+
+MAX_OUTPUT_CHARS = 16 * 1024
+
+def _verdict(error):
+    if isinstance(error, MemoryError):
+        return "memory_limit"
+    if isinstance(error, RecursionError):
+        return "recursion_limit"
+    return "runtime_error"
+
+def _resolve(namespace, name):
+    if name and callable(namespace.get(name)):
+        return namespace[name]
+    solution = namespace.get("Solution")
+    if isinstance(solution, type):
+        instance = solution()
+        if name and hasattr(instance, name):
+            return getattr(instance, name)
+        methods = [m for m in vars(solution) if not m.startswith("_") and callable(getattr(instance, m))]
+        if len(methods) == 1:
+            return getattr(instance, methods[0])
+    if callable(namespace.get("solution")):
+        return namespace["solution"]
+    return None
+
+def _main():
+    job = json.loads(sys.stdin.read())
+    out = sys.stdout
+    sys.stdout = io.StringIO()
+    report = {"status": "ok", "results": []}
+    namespace = {"__name__": "__solution__"}
+    try:
+        code = compile(job["code"], "solution.py", "exec")
+    except SyntaxError as e:
+        report["status"] = "compile_error"
+        report["error"] = "syntax_error"
+        report["line"] = e.lineno
+    except BaseException:
+        report["status"] = "compile_error"
+        report["error"] = "syntax_error"
+    else:
+        try:
+            exec(code, namespace)
+            fn = _resolve(namespace, job.get("function_name"))
+        except BaseException as e:
+            report["status"] = "compile_error"
+            report["error"] = _verdict(e)
+        else:
+            if fn is None:
+                report["status"] = "compile_error"
+                report["error"] = "missing_function"
+            else:
+                for args in job["inputs"]:
+                    start = time.perf_counter()
+                    try:
+                        if isinstance(args, dict):
+                            actual = fn(**args)
+                        else:
+                            actual = fn(*args) if isinstance(args, list) else fn(args)
+                        elapsed = time.perf_counter() - start
+                        output = json.dumps(actual, default=repr)
+                        if len(output) > MAX_OUTPUT_CHARS:
+                            result = {"error": "output_too_large"}
+                        else:
+                            result = {"output": json.loads(output)}
+                    except BaseException as e:
+                        elapsed = time.perf_counter() - start
+                        result = {"error": _verdict(e)}
+                    result["time_ms"] = round(elapsed * 1000, 3)
+                    report["results"].append(result)
+    # Start on a fresh line, whatever the submission left unterminated
+    out.write("\n" + job["token"] + json.dumps(report) + "\n")
+    out.flush()
+
+_main()
+'''
+
+
+def _equal(actual, expected):
+    if isinstance(actual, float) or isinstance(expected, float):
+        try:
+            return abs(float(actual) - float(expected)) <= 1e-6 * max(1.0, abs(float(expected)))
+        except (TypeError, ValueError):
+            return False
+    if isinstance(actual, list) and isinstance(expected, list):
+        return len(actual) == len(expected) and all(_equal(a, e) for a, e in zip(actual, expected))
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        return actual.keys() == expected.keys() and all(_equal(actual[k], expected[k]) for k in actual)
+    return actual == expected
+
+
+def _time_ms(result):
+    value = result.get("time_ms") if isinstance(result, dict) else None
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+
+def _grade(results, tests):
+    # Child results carry outputs; what leaves the sandbox carries verdicts only
+    results = results if isinstance(results, list) else []
+    graded = []
+    for result, test in zip(results, tests):
+        if not isinstance(result, dict) or "output" not in result:
+            error = result.get("error") if isinstance(result, dict) else None
+            graded.append({"passed": False, "time_ms": _time_ms(result),
+                           "error": VERDICTS.get(error, VERDICTS["runtime_error"])})
+            continue
+        passed = _equal(result["output"], test.get("expected"))
+        graded.append({"passed": passed, "time_ms": _time_ms(result)})
+        if not passed:
+            graded[-1]["error"] = VERDICTS["wrong_answer"]
+    return graded
+
+
+def _compile_error(report, function_name):
+    error = report.get("error")
+    line = report.get("line")
+    if error == "missing_function":
+        return f"function '{function_name or 'solution'}' is not defined"
+    if error == "syntax_error":
+        if isinstance(line, int) and not isinstance(line, bool):
+            return f"syntax error on line {line}"
+        return "syntax error"
+    return VERDICTS.get(error, VERDICTS["runtime_error"]) + " while loading the code"
+
+
+class CodeSandbox:
+    """
+    Runs Python submissions against a problem's hidden tests in a fresh
+    interpreter per submission (`python -I`, stripped environment), jailed
+    in its own namespaces with no network, no view of the host filesystem
+    beyond a read-only standard library and no privileges (see HARNESS),
+    with CPU, memory, file-size and process rlimits and a wall-clock
+    timeout. Clients only ever see fixed verdicts such as "wrong answer" or
+    "runtime error", never exception messages or output.
+
+    Where the jail cannot be set up (no namespace support, not Linux) runs
+    report "unavailable" and callers fall back to an LLM review, unless
+    SANDBOX_ISOLATION=none. At most `workers` submissions run at once;
+    others wait up to `queue_wait` seconds for a slot.
+    """
+
+    def __init__(self, workers=SANDBOX_WORKERS, queue_wait=SANDBOX_QUEUE_WAIT, timeout=SANDBOX_TIMEOUT,
+                 isolation=SANDBOX_ISOLATION):
+        self.timeout = timeout
+        self.queue_wait = queue_wait
+        self.isolation = isolation
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "passed": 0, "failed": 0, "timeouts": 0, "errors": 0, "busy": 0, "unavailable": 0}
+
+    def supports(self, language):
+        return (language or "").strip().lower() in SUPPORTED_LANGUAGES
+
+    def run(self, code, tests, function_name=None):
+        """
+        Returns {"status", "passed", "total", "all_passed", "duration_ms",
+        "results"[, "error"]}. Test inputs and expected values are never
+        included, so hidden tests stay hidden.
+        """
+        if not self._slots.acquire(timeout=self.queue_wait):
+            self._count("busy")
+            return self._report("busy", tests, error="All sandbox workers are busy, try again shortly")
+        self._count("runs")
+        try:
+            with metrics.span("sandbox"):
+                report = self._execute(code, tests, function_name)
+        finally:
+            self._slots.release()
+
+        if report["status"] == "timeout":
+            self._count("timeouts")
+        elif report["status"] == "unavailable":
+            self._count("unavailable")
+        elif report["status"] not in ("ok", "compile_error"):
+            self._count("errors")
+        else:
+            self._count("passed" if report["all_passed"] else "failed")
+        return report
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _execute(self, code, tests, function_name):
+        token = f"@@{secrets.token_hex(8)}@@"
+        inputs = [test.get("input", []) for test in tests]
+        job = json.dumps({"token": token, "code": code, "function_name": function_name, "inputs": inputs})
+        posix = os.name == "posix"
+        start = time.perf_counter()
+
+        with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+            process = subprocess.Popen(
+                [sys.executable, "-I", "-c", HARNESS, str(SANDBOX_CPU_SECONDS), str(SANDBOX_MEMORY_MB), self.isolation],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cwd=workdir,
+                env={"PATH": os.defpath, "PYTHONHASHSEED": "0", "PYTHONDONTWRITEBYTECODE": "1"},
+                start_new_session=posix
+            )
+            try:
+                stdout, stderr = process.communicate(job.encode(), timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(process, posix)
+                process.communicate()
+                return self._report("timeout", tests, time.perf_counter() - start,
+                                    error=f"Time limit exceeded ({self.timeout:g}s)")
+        elapsed = time.perf_counter() - start
+
+        if process.returncode == JAIL_UNAVAILABLE_EXIT:
+            # Server-side only: the reason may name host paths
+            print(f"Sandbox: {stderr[-500:].decode('utf-8', 'replace').strip()}")
+            return self._report("unavailable", tests, elapsed, error="The code sandbox is not available")
+
+        stdout = stdout[-SANDBOX_MAX_OUTPUT:].decode("utf-8", "replace")
+        for line in reversed(stdout.splitlines()):
+            if line.startswith(token):
+                try:
+                    report = json.loads(line[len(token):])
+                except ValueError:
+                    break
+                if not isinstance(report, dict):
+                    break
+                if report.get("status") == "compile_error":
+                    return self._report("compile_error", tests, elapsed,
+                                        error=_compile_error(report, function_name))
+                results = _grade(report.get("results"), tests)
+                return self._report("ok", tests, elapsed, results)
+
+        if process.returncode in (-signal.SIGKILL, -getattr(signal, "SIGXCPU", signal.SIGKILL)):
+            return self._report("cpu_limit", tests, elapsed, error="CPU time limit exceeded")
+        # Whatever reached stderr came from the submission; it is only used to classify
+        if b"MemoryError" in stderr[-SANDBOX_MAX_OUTPUT:]:
+            return self._report("memory_limit", tests, elapsed, error="Memory limit exceeded")
+        return self._report("error", tests, elapsed, error="Runtime error")
+
+    @staticmethod
+    def _kill(process, posix):
+        try:
+            if posix:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _report(status, tests, elapsed=0.0, results=None, error=None):
+        results = results or []
+        passed = sum(1 for r in results if r.get("passed"))
+        report = {
+            "status": status,
+            "passed": passed,
+            "total": len(tests),
+            "all_passed": status == "ok" and bool(tests) and passed == len(tests),
+            "duration_ms": round(elapsed * 1000, 1),
+            "results": results
+        }
+        if error:
+            report["error"] = error
+        return report
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+code_sandbox = CodeSandbox() if SANDBOX_ENABLED else None
@@ -0,0 +1,241 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lower number = served first
+PRIORITIES = {"interactive": 0, "standard": 1, "batch": 2}
+
+CALL_TYPE_PRIORITY = {
+    "chat": "interactive",
+    "chat_summary": "interactive",
+    "evaluate_answer": "interactive",
+    "generate_questions": "standard",
+    "resume_chat": "standard",
+    "resume_merge": "standard",
+    "coding_problem": "standard",
+    "review_code": "standard",
+    "review_style": "standard",
+    "chunk_analysis": "batch",
+    "question_bank": "batch",
+    "problem_pool": "batch",
+    "interview_analysis": "batch",
+    "interview_segment": "batch"
+}
+
+# Longest a caller will queue for capacity before giving up on a provider
+MAX_WAIT = {
+    "interactive": float(os.getenv("LLM_QUEUE_MAX_WAIT_INTERACTIVE", 5)),
+    "standard": float(os.getenv("LLM_QUEUE_MAX_WAIT_STANDARD", 15)),
+    "batch": float(os.getenv("LLM_QUEUE_MAX_WAIT_BATCH", 30))
+}
+
+# Requests and tokens per minute per provider; 0 means unlimited
+PROVIDER_LIMITS = {
+    "groq": {
+        "rpm": int(os.getenv("GROQ_RPM", 30)),
+        "tpm": int(os.getenv("GROQ_TPM", 12000))
+    },
+    "gemini": {
+        "rpm": int(os.getenv("GEMINI_RPM", 15)),
+        "tpm": int(os.getenv("GEMINI_TPM", 1000000))
+    }
+}
+
+# Completion tokens we reserve up front; settled against real usage later
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", 512))
+
+
+class QueueTimeout(Exception):
+    """Raised when a call could not get provider capacity in time."""
+
+
+def priority_for(call_type):
+    return CALL_TYPE_PRIORITY.get(call_type, "standard")
+
+
+def estimate_request_tokens(messages):
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + EXPECTED_COMPLETION_TOKENS
+
+
+def estimate_stream_tokens(messages, streamed_text):
+    """Usage of a streamed call, which reports none: prompt plus what was streamed."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return (prompt_chars + len(streamed_text)) // 4
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self):
+        return self.capacity <= 0
+
+    def refill(self, now):
+        if self.unlimited:
+            return
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        if self.unlimited:
+            return 0.0
+        self.refill(now)
+        # A single request larger than the whole bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    """
+    Central admission control for outbound LLM calls.
+
+    Each provider has a requests/min and a tokens/min token bucket. Callers
+    queue per provider in priority order (interactive chat ahead of batch
+    resume analysis), only the head of the queue may take capacity, and
+    nobody waits longer than their max_wait.
+    """
+
+    def __init__(self, limits=None):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._providers = {}
+        for name, limit in (limits or PROVIDER_LIMITS).items():
+            self._add_provider(name, limit)
+
+    def _add_provider(self, name, limit):
+        self._providers[name] = {
+            "requests": TokenBucket(limit.get("rpm", 0)),
+            "tokens": TokenBucket(limit.get("tpm", 0)),
+            "queue": [],
+            "stats": {
+                "admitted": 0,
+                "timeouts": 0,
+                "total_wait_s": 0.0,
+                "max_wait_s": 0.0,
+                "by_priority": {p: {"admitted": 0, "timeouts": 0, "total_wait_s": 0.0} for p in PRIORITIES}
+            }
+        }
+
+    def acquire(self, provider, tokens, priority="standard", max_wait=None):
+        """Blocks until the call may go out. Raises QueueTimeout otherwise."""
+        if max_wait is None:
+            max_wait = MAX_WAIT.get(priority, MAX_WAIT["standard"])
+
+        with self._cond:
+            if provider not in self._providers:
+                self._add_provider(provider, {})
+            state = self._providers[provider]
+
+            start = time.monotonic()
+            deadline = start + max_wait
+            entry = (PRIORITIES.get(priority, 1), next(self._seq))
+            heapq.heappush(state["queue"], entry)
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    if state["queue"][0] == entry:
+                        delay = max(
+                            state["requests"].wait_time(1, now),
+                            state["tokens"].wait_time(tokens, now)
+                        )
+                        if delay == 0:
+                            state["requests"].take(1)
+                            state["tokens"].take(tokens)
+                            self._record(state, priority, "admitted", now - start)
+                            return
+                    else:
+                        delay = None
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._record(state, priority, "timeouts", now - start)
+                        raise QueueTimeout(
+                            f"{provider}: no capacity within {max_wait}s ({priority} priority)"
+                        )
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+            finally:
+                state["queue"].remove(entry)
+                heapq.heapify(state["queue"])
+                self._cond.notify_all()
+
+    def settle(self, provider, reserved_tokens, used_tokens):
+        """Corrects the token bucket once the real usage of a call is known."""
+        if used_tokens is None:
+            return
+        with self._cond:
+            state = self._providers.get(provider)
+            if not state:
+                return
+            difference = reserved_tokens - used_tokens
+            if difference > 0:
+                state["tokens"].give_back(difference)
+            else:
+                state["tokens"].take(-difference)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            snapshot = {}
+            for name, state in self._providers.items():
+                depth = {p: 0 for p in PRIORITIES}
+                for level, _ in state["queue"]:
+                    for p, value in PRIORITIES.items():
+                        if value == level:
+                            depth[p] += 1
+                for bucket in (state["requests"], state["tokens"]):
+                    bucket.refill(now)
+
+                stats = state["stats"]
+                admitted = stats["admitted"]
+                snapshot[name] = {
+                    "queue_depth": len(state["queue"]),
+                    "queue_depth_by_priority": depth,
+                    "requests_available": None if state["requests"].unlimited else round(state["requests"].level, 1),
+                    "tokens_available": None if state["tokens"].unlimited else round(state["tokens"].level),
+                    "admitted": admitted,
+                    "timeouts": stats["timeouts"],
+                    "avg_wait_s": round(stats["total_wait_s"] / admitted, 3) if admitted else 0.0,
+                    "max_wait_s": round(stats["max_wait_s"], 3),
+                    "by_priority": {
+                        p: {**v, "total_wait_s": round(v["total_wait_s"], 3)}
+                        for p, v in stats["by_priority"].items()
+                    }
+                }
+            return snapshot
+
+    # Callers must hold self._cond
+    def _record(self, state, priority, outcome, waited):
+        stats = state["stats"]
+        stats[outcome] += 1
+        bucket = stats["by_priority"].setdefault(priority, {"admitted": 0, "timeouts": 0, "total_wait_s": 0.0})
+        bucket[outcome] += 1
+        if outcome == "admitted":
+            stats["total_wait_s"] += waited
+            stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+            bucket["total_wait_s"] += waited
+
+
+llm_scheduler = LLMScheduler()
@@ -1,8 +1,86 @@
-# Temporary in-memory store
-temp_store = {}
-
-def save_ocr(session_id, ocr_json):
-    temp_store[session_id] = ocr_json
-
-def get_ocr(session_id):
-    return temp_store.get(session_id)
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Temporary in-memory store
+temp_store = {}
+
+def save_ocr(session_id, ocr_json):
+    temp_store[session_id] = ocr_json
+
+def get_ocr(session_id):
+    return temp_store.get(session_id)
+
+
+# ===============================
+# RESUME FINGERPRINT STORE
+# ===============================
+RESUME_STORE_MAX_BYTES = int(os.getenv("RESUME_STORE_MAX_BYTES", 50 * 1024 * 1024))
+RESUME_STORE_MAX_AGE = int(os.getenv("RESUME_STORE_MAX_AGE", 3600))
+
+
+class ResumeStore:
+    """
+    Bounded map from an upload's content hash to everything derived from it
+    (OCR JSON, chunks, resume analysis, ...). Entries expire after max_age
+    seconds and the least recently used ones are evicted once the estimated
+    size goes over max_bytes.
+    """
+
+    def __init__(self, max_bytes=RESUME_STORE_MAX_BYTES, max_age=RESUME_STORE_MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.max_age:
+                self._drop(fingerprint)
+                return None
+            self._entries.move_to_end(fingerprint)
+            return dict(entry["data"])
+
+    def update(self, fingerprint, **fields):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None or time.time() - entry["created_at"] > self.max_age:
+                if entry is not None:
+                    self._drop(fingerprint)
+                entry = {"created_at": time.time(), "data": {}}
+                self._entries[fingerprint] = entry
+                self._sizes[fingerprint] = 0
+
+            entry["data"].update(fields)
+            self._entries.move_to_end(fingerprint)
+
+            size = len(json.dumps(entry["data"], default=str))
+            self._total_bytes += size - self._sizes[fingerprint]
+            self._sizes[fingerprint] = size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    # Callers must hold self._lock
+    def _drop(self, fingerprint):
+        self._entries.pop(fingerprint, None)
+        self._total_bytes -= self._sizes.pop(fingerprint, 0)
+
+
+resume_store = ResumeStore()
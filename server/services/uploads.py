@@ -0,0 +1,33 @@
+import io
+import os
+import tempfile
+from flask import Request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))  # whole request body
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 512 * 1024))  # larger uploads go to disk
+
+
+class UploadRejected(ValueError):
+    """An uploaded file that is too large or not what its name claims."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class SpooledRequest(Request):
+    """
+    Request class whose uploaded files stay in memory only when the body is
+    small. Anything larger is written straight to a named temporary file as
+    it is received, so a big resume costs disk rather than worker memory and
+    can be reopened by path (e.g. from the PDF worker processes). Werkzeug
+    closes, and so deletes, the file when the request ends.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is None or total_content_length > UPLOAD_SPOOL_BYTES:
+            return tempfile.NamedTemporaryFile("wb+", prefix="upload_")
+        return io.BytesIO()
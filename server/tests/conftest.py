@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Tests import the server's modules the way app.py does, from server/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never reach a real provider or write into the real data files
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("STUB_LATENCY_MS", "0")
+os.environ.setdefault("STUB_TOKEN_DELAY_MS", "0")
+os.environ.setdefault("QUESTION_BANK_PATH", "")
+os.environ.setdefault("PROBLEM_POOL_PATH", "")
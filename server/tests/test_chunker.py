@@ -0,0 +1,89 @@
+import os
+import json
+import random
+
+import pytest
+
+from services.chunker import chunk_text, iter_chunks, CHARS_PER_TOKEN
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data")
+HEADINGS = ["EXPERIENCE", "Education", "Technical Skills:", "Projects & Research", "Certifications", "SUMMARY"]
+WORDS = "built led designed shipped scaled python kafka postgres latency users team api service cloud".split()
+
+
+def fixture_pages():
+    with open(os.path.join(DATA_DIR, "resume_12_pages.json")) as f:
+        return json.load(f)["pages"]
+
+
+def random_pages(rng):
+    pages = []
+    for page_no in range(1, rng.randint(1, 6) + 1):
+        lines = []
+        for _ in range(rng.randint(1, 25)):
+            roll = rng.random()
+            if roll < 0.15:
+                lines.append(rng.choice(HEADINGS))
+            elif roll < 0.2:
+                # OCR output often has one very long line and no newlines
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(200, 600))))
+            elif roll < 0.25:
+                lines.append("")
+            else:
+                lines.append("- " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20))))
+        pages.append({"page_no": page_no, "text": "\n".join(lines)})
+    return pages
+
+
+def joined(pages):
+    return "\n".join(page["text"] for page in pages)
+
+
+@pytest.mark.parametrize("budget, overlap", [(1500, 0), (300, 0), (300, 50), (40, 10)])
+def test_streaming_matches_chunk_text_on_fixture(budget, overlap):
+    pages = fixture_pages()
+    assert list(iter_chunks(pages, budget, overlap)) == chunk_text(joined(pages), budget, overlap)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_streaming_matches_chunk_text_on_random_resumes(seed):
+    rng = random.Random(seed)
+    pages = random_pages(rng)
+    budget = rng.choice([20, 60, 150, 400, 1500])
+    overlap = rng.choice([0, 0, 10, budget // 2])
+    assert list(iter_chunks(pages, budget, overlap)) == chunk_text(joined(pages), budget, overlap)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunks_respect_the_budget(seed):
+    rng = random.Random(seed)
+    text = joined(random_pages(rng))
+    budget = rng.choice([20, 60, 150, 400])
+    for chunk in chunk_text(text, budget, 0):
+        assert len(chunk) <= budget * CHARS_PER_TOKEN
+
+
+def test_chunks_cover_every_word_in_order():
+    text = joined(fixture_pages())
+    chunks = chunk_text(text, 200, 0)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_sections_are_not_split_when_they_fit():
+    text = "EXPERIENCE\n- led a team\n- shipped an api\nEDUCATION\n- BSc computer science"
+    chunks = chunk_text(text, 10, 0)
+    assert chunks == ["EXPERIENCE\n- led a team\n- shipped an api", "EDUCATION\n- BSc computer science"]
+
+
+def test_overlap_repeats_the_tail_of_the_previous_chunk():
+    text = "SKILLS\n" + "\n".join(f"- skill number {i}" for i in range(40))
+    chunks = chunk_text(text, 50, 10)
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        head = chunk.split()[0]
+        assert head in previous.split()
+
+
+def test_empty_input():
+    assert chunk_text("") == []
+    assert list(iter_chunks([])) == []
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from services.json_repair import extract_json, SCHEMAS
+
+EVALUATION = SCHEMAS["evaluate_answer"]
+
+
+def test_plain_json_needs_no_repairs():
+    result = extract_json('{"feedback": "Good", "score": 8}', EVALUATION)
+    assert result.ok
+    assert result.value["score"] == 8
+    assert result.repairs == ["default:ideal_answer", "default:qualified"]
+
+
+@pytest.mark.parametrize("text, repair", [
+    ('```json\n{"a": 1}\n```', "code_fence"),
+    ('Here you go: {"a": 1} hope it helps', "surrounding_text"),
+    ("{'a': 1}", "single_quotes"),
+    ('{"a": True, "b": None}', "python_literals"),
+    ('{a: 1}', "unquoted_keys"),
+    ('{"a": 1, // note\n "b": 2}', "comments"),
+    ('{"a": [1, 2,], "b": 3,}', "trailing_comma"),
+    ('{"a": "line one\nline two"}', "control_characters"),
+    ('{"a": [1, 2}', "mismatched_bracket"),
+])
+def test_repairs_common_defects(text, repair):
+    result = extract_json(text)
+    assert result.ok, result.error
+    assert repair in result.repairs
+    # The repaired value must round-trip as real JSON
+    json.dumps(result.value)
+
+
+def test_truncated_string_is_closed():
+    result = extract_json('{"feedback": "Solid answ')
+    assert result.ok
+    assert result.truncated
+    assert result.value == {"feedback": "Solid answ"}
+
+
+def test_truncated_number_is_dropped_not_kept():
+    # "1" may have been "10": the partial digits must not become the score
+    result = extract_json('{"feedback": "Solid", "score": 1', EVALUATION)
+    assert not result.ok
+    assert result.truncated
+    assert "score" in result.error
+
+
+def test_truncated_number_in_array_is_dropped():
+    result = extract_json('{"scores": [7, 8, 1')
+    assert result.value == {"scores": [7, 8]}
+    assert result.truncated
+
+
+def test_truncated_literal_becomes_null():
+    result = extract_json('{"a": 1, "b": tr')
+    assert result.value == {"a": 1, "b": None}
+
+
+def test_complete_number_at_end_of_closed_object_is_kept():
+    result = extract_json('{"score": 10}')
+    assert result.value == {"score": 10}
+    assert not result.truncated
+
+
+@pytest.mark.parametrize("raw, expected", [("7", 7), ("7.5", 7.5), ("7/10", 7), ("80%", 80)])
+def test_numbers_are_coerced_from_strings(raw, expected):
+    result = extract_json(json.dumps({"feedback": "ok", "score": raw}), EVALUATION)
+    assert result.ok
+    assert result.value["score"] == expected
+    assert "coerced:score" in result.repairs
+
+
+@pytest.mark.parametrize("raw, expected", [(1, True), (0, False), ("yes", True), ("False", False)])
+def test_booleans_are_coerced(raw, expected):
+    result = extract_json(json.dumps({"feedback": "ok", "score": 5, "qualified": raw}), EVALUATION)
+    assert result.ok
+    assert result.value["qualified"] is expected
+
+
+def test_bool_is_not_a_number():
+    result = extract_json('{"feedback": "ok", "score": true}', EVALUATION)
+    assert not result.ok
+
+
+def test_missing_required_field_fails():
+    result = extract_json('{"score": 5}', EVALUATION)
+    assert not result.ok
+    assert "feedback" in result.error
+
+
+def test_non_object_fails_schema():
+    assert not extract_json("[1, 2]", EVALUATION).ok
+
+
+def test_empty_and_json_free_text():
+    assert extract_json("").error == "empty response"
+    assert not extract_json("no json here").ok
+
+
+def test_braces_in_prose_before_the_json():
+    result = extract_json('Use {curly} braces like this: {"a": 1}')
+    assert result.ok
+    assert result.value == {"a": 1}
+
+
+def test_truncated_responses_are_not_cacheable():
+    from services.ai_engine import AIEngine
+    engine = AIEngine(provider_mode="stub")
+    assert engine._is_valid_json('{"strengths": ["a"]}', "chunk_analysis")
+    assert not engine._is_valid_json('{"strengths": ["a"', "chunk_analysis")
+
+
+def test_truncated_scored_response_fails_the_provider_call():
+    from services.ai_engine import AIEngine
+
+    class Truncating:
+        name = "fake"
+        model = "fake"
+
+        def complete(self, messages, temperature, json_mode, reserved_tokens):
+            return '{"feedback": "Good", "score": 8, "ideal_answer": "cut'
+
+    engine = AIEngine(provider_mode="stub")
+    with pytest.raises(ValueError):
+        engine._complete(Truncating(), "evaluate_answer", [], 0.3, True, 10)
+    # Unscored call types still get the repaired value
+    assert engine._complete(Truncating(), "chunk_analysis", [], 0.3, True, 10).startswith("{")
+
+
+def test_answer_cache_skips_truncated_evaluations():
+    from services.answer_cache import AnswerCache
+    cache = AnswerCache()
+    question = "Tell me about a project you led"
+    answer = "I led a team of five engineers to rebuild our billing pipeline end to end"
+    cache.store(question, answer, "SWE", {"score": 7}, truncated=True)
+    assert cache.lookup(question, answer, "SWE") is None
+    cache.store(question, answer, "SWE", {"score": 7})
+    assert cache.lookup(question, answer, "SWE") == {"score": 7}
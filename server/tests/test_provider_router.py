@@ -0,0 +1,147 @@
+import pytest
+
+from services.provider_router import ProviderRouter, LLM_BREAKER_FAILURES
+from services.scheduler import QueueTimeout
+
+
+def fails(message="boom"):
+    def call():
+        raise RuntimeError(message)
+    return call
+
+
+def returns(value):
+    return lambda: value
+
+
+@pytest.fixture
+def router():
+    return ProviderRouter(order=["a", "b"], policy="ordered", hedge=False, scheduler=None)
+
+
+def open_circuit(router, name):
+    for _ in range(LLM_BREAKER_FAILURES):
+        router.record_failure(name, 0.1)
+
+
+def end_cooldown(router, name):
+    router._health[name].open_until = 0.0
+
+
+def test_first_provider_that_succeeds_wins(router):
+    assert router.call({"a": fails(), "b": returns("from b")}) == "from b"
+    assert router.call({"a": returns("from a"), "b": returns("from b")}) == "from a"
+
+
+def test_every_provider_failing_returns_none(router):
+    assert router.call({"a": fails(), "b": fails()}) is None
+
+
+def test_empty_response_counts_as_failure(router):
+    assert router.call({"a": returns(""), "b": returns("ok")}) == "ok"
+    assert router.snapshot()["providers"]["a"]["consecutive_failures"] == 1
+
+
+def test_consecutive_failures_open_the_circuit(router):
+    open_circuit(router, "a")
+    assert router.snapshot()["providers"]["a"]["state"] == "open"
+    assert router.plan(["a", "b"]) == ["b"]
+
+
+def test_half_open_lets_exactly_one_probe_through(router):
+    open_circuit(router, "a")
+    end_cooldown(router, "a")
+    assert router.plan(["a", "b"]) == ["a", "b"]
+    assert router._health["a"].state == "half_open"
+    # The probe is still in flight: nobody else gets "a"
+    assert router.plan(["a", "b"]) == ["b"]
+
+
+def test_successful_probe_closes_the_circuit(router):
+    open_circuit(router, "a")
+    end_cooldown(router, "a")
+    assert router.call({"a": returns("ok"), "b": returns("b")}) == "ok"
+    assert router._health["a"].state == "closed"
+    assert not router._health["a"].probe_in_flight
+
+
+def test_failed_probe_reopens_the_circuit(router):
+    open_circuit(router, "a")
+    end_cooldown(router, "a")
+    assert router.call({"a": fails(), "b": returns("b")}) == "b"
+    assert router._health["a"].state == "open"
+    assert not router._health["a"].probe_in_flight
+    assert router.plan(["a", "b"]) == ["b"]
+
+
+def test_unused_probe_is_released(router):
+    open_circuit(router, "b")
+    end_cooldown(router, "b")
+    # "a" answers, so the probe planned for "b" never runs
+    assert router.call({"a": returns("a"), "b": returns("b")}) == "a"
+    assert not router._health["b"].probe_in_flight
+    assert router.plan(["a", "b"]) == ["a", "b"]
+
+
+def test_retry_after_skips_the_provider(router):
+    router.record_failure("a", 0.1, retry_after=60)
+    assert router.plan(["a", "b"]) == ["b"]
+
+
+def test_everything_unavailable_still_tries_something(router):
+    router.record_failure("a", 0.1, retry_after=60)
+    router.record_failure("b", 0.1, retry_after=60)
+    assert router.plan(["a", "b"]) == ["a", "b"]
+
+
+def test_prefer_reorders_the_plan(router):
+    assert router.plan(["a", "b"], prefer=["b"]) == ["b", "a"]
+
+
+def test_hedged_call_falls_back_when_primary_fails():
+    router = ProviderRouter(order=["a", "b"], hedge=True, scheduler=None)
+    assert router.call({"a": fails(), "b": returns("b")}) == "b"
+
+
+class FullScheduler:
+    """Every provider's queue is full."""
+
+    def acquire(self, provider, tokens, priority="standard", max_wait=None):
+        raise QueueTimeout(f"{provider} queue full")
+
+    def settle(self, provider, reserved_tokens, used_tokens):
+        pass
+
+
+def test_queue_timeout_releases_a_half_open_probe():
+    router = ProviderRouter(order=["a", "b"], hedge=False, scheduler=FullScheduler())
+    open_circuit(router, "a")
+    end_cooldown(router, "a")
+    assert router.call({"a": returns("a"), "b": returns("b")}, tokens=10) is None
+    # Local back-pressure is not the provider's fault and must not strand the probe
+    assert not router._health["a"].probe_in_flight
+    assert router._health["a"].consecutive_failures == LLM_BREAKER_FAILURES
+    assert router.plan(["a", "b"]) == ["a", "b"]
+
+
+def test_chat_stream_queue_timeout_releases_a_half_open_probe(monkeypatch):
+    from services import ai_engine
+
+    class Streaming:
+        name = "a"
+
+        def stream(self, messages, temperature=0.5):
+            yield "hello"
+
+    router = ProviderRouter(order=["a"], hedge=False, scheduler=None)
+    monkeypatch.setattr(ai_engine, "provider_router", router)
+    monkeypatch.setattr(ai_engine, "llm_scheduler", FullScheduler())
+    engine = ai_engine.AIEngine(provider_mode="stub")
+    engine._providers = {"a": Streaming()}
+    open_circuit(router, "a")
+    end_cooldown(router, "a")
+
+    reply = "".join(engine.chat_stream([{"role": "user", "content": "hi"}]))
+    assert reply == ai_engine.CHAT_ERROR_MESSAGE
+    assert not router._health["a"].probe_in_flight
+    assert router.plan(["a"]) == ["a"]
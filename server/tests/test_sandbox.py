@@ -0,0 +1,133 @@
+import os
+
+import pytest
+
+from services.sandbox import CodeSandbox
+
+ADD_TESTS = [{"input": [1, 2], "expected": 3}, {"input": [2, 2], "expected": 4}]
+
+
+@pytest.fixture(scope="module")
+def sandbox():
+    sandbox = CodeSandbox(workers=2, timeout=10)
+    if sandbox.run("def add(a, b): return a + b", ADD_TESTS[:1], "add")["status"] == "unavailable":
+        pytest.skip("namespace jail not available on this host")
+    return sandbox
+
+
+def errors(report):
+    return [result.get("error") for result in report["results"]]
+
+
+def test_passing_submission(sandbox):
+    report = sandbox.run("def add(a, b): return a + b", ADD_TESTS, "add")
+    assert report["status"] == "ok"
+    assert report["all_passed"]
+    assert report["passed"] == report["total"] == 2
+
+
+def test_wrong_answer(sandbox):
+    report = sandbox.run("def add(a, b): return a - b", ADD_TESTS, "add")
+    assert not report["all_passed"]
+    assert errors(report) == ["wrong answer", "wrong answer"]
+
+
+def test_exception_text_never_returned(sandbox):
+    code = "def add(a, b): raise Exception(open('/etc/hostname').read())"
+    report = sandbox.run(code, ADD_TESTS, "add")
+    assert errors(report) == ["runtime error", "runtime error"]
+
+
+def test_module_level_error_text_never_returned(sandbox):
+    report = sandbox.run("raise ValueError('secret-value')", ADD_TESTS, "add")
+    assert report["status"] == "compile_error"
+    assert "secret-value" not in report["error"]
+
+
+def test_syntax_error_reports_only_the_line(sandbox):
+    report = sandbox.run("x = 1\ndef add(a, b) return", ADD_TESTS, "add")
+    assert report["status"] == "compile_error"
+    assert report["error"] == "syntax error on line 2"
+
+
+def test_host_filesystem_is_not_visible(sandbox):
+    # Only the directory tree holding the standard library is mounted
+    code = "import os\ndef visible(path): return os.path.exists(path)"
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tests = [{"input": [path], "expected": False} for path in ("/etc/passwd", "/proc", server_dir)]
+    report = sandbox.run(code, tests, "visible")
+    assert report["all_passed"]
+    report = sandbox.run("def read(): return open('/etc/passwd').read()", [{"input": [], "expected": ""}], "read")
+    assert errors(report) == ["runtime error"]
+
+
+def test_filesystem_is_read_only(sandbox):
+    code = "def write(): open('/x', 'w').write('x'); return 1"
+    report = sandbox.run(code, [{"input": [], "expected": 1}], "write")
+    assert errors(report) == ["runtime error"]
+
+
+def test_no_network(sandbox):
+    code = (
+        "import socket\n"
+        "def connect():\n"
+        "    socket.create_connection(('1.1.1.1', 80), timeout=1)\n"
+        "    return 1\n"
+    )
+    report = sandbox.run(code, [{"input": [], "expected": 1}], "connect")
+    assert errors(report) == ["runtime error"]
+
+
+def test_runs_unprivileged(sandbox):
+    # Root servers drop to nobody; others are only root inside their own user namespace
+    expected = 65534 if os.getuid() == 0 else 0
+    report = sandbox.run("import os\ndef uid(): return os.getuid()", [{"input": [], "expected": expected}], "uid")
+    assert report["all_passed"]
+
+
+def test_cannot_fork(sandbox):
+    code = "import os\ndef spawn(): return os.fork()"
+    report = sandbox.run(code, [{"input": [], "expected": 0}], "spawn")
+    assert errors(report) == ["runtime error"]
+
+
+def test_expected_values_never_reach_the_child(sandbox):
+    code = (
+        "import sys\n"
+        "def add(a, b):\n"
+        "    frame = sys._getframe(1)\n"
+        "    while frame:\n"
+        "        for value in frame.f_locals.values():\n"
+        "            if isinstance(value, dict) and 'expected' in value:\n"
+        "                return value['expected']\n"
+        "        frame = frame.f_back\n"
+        "    return None\n"
+    )
+    report = sandbox.run(code, ADD_TESTS, "add")
+    assert report["passed"] == 0
+
+
+def test_forged_report_is_sanitized(sandbox):
+    code = (
+        "import sys, json\n"
+        "def add(a, b):\n"
+        "    job = sys._getframe(1).f_locals['job']\n"
+        "    report = {'status': 'ok', 'results': [{'error': 'leaked text', 'time_ms': 0}] * 2}\n"
+        "    sys.__stdout__.write('\\n' + job['token'] + json.dumps(report) + '\\n')\n"
+        "    sys.__stdout__.flush()\n"
+        "    import os; os._exit(0)\n"
+    )
+    report = sandbox.run(code, ADD_TESTS, "add")
+    assert errors(report) == ["runtime error", "runtime error"]
+
+
+def test_memory_limit(sandbox):
+    report = sandbox.run("def add(a, b): return len(bytearray(10 ** 9))", ADD_TESTS[:1], "add")
+    assert errors(report) == ["memory limit exceeded"]
+
+
+def test_timeout():
+    sandbox = CodeSandbox(workers=1, timeout=0.5)
+    report = sandbox.run("def add(a, b):\n    while True: pass", ADD_TESTS, "add")
+    assert report["status"] in ("timeout", "unavailable")
+    assert not report["all_passed"]